@@ -0,0 +1,99 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+
+from api.models import Cafe, User
+
+REQUIRED_CLAIMS = ('role', 'cafe_id')
+
+
+def _user_cache_key(user_id):
+  return f'auth:user:{user_id}'
+
+
+def get_cached_user(user_id):
+  """
+  User lengkap (beserta cafe) dari cache, TTL JWT_USER_CACHE_SECONDS.
+  Hanya dengan cache bersama (SHARED_CACHE): invalidate_cached_user() harus sampai ke semua instance,
+  kalau tidak instance lain tetap memakai user lama (role, is_active) sampai TTL habis.
+  """
+  if not settings.SHARED_CACHE or not settings.JWT_USER_CACHE_SECONDS:
+    return User.objects.select_related('cafe').get(id=user_id)
+
+  key = _user_cache_key(user_id)
+  user = cache.get(key)
+  if user is None:
+    user = User.objects.select_related('cafe').get(id=user_id)
+    cache.set(key, user, settings.JWT_USER_CACHE_SECONDS)
+  return user
+
+
+def invalidate_cached_user(user_id):
+  cache.delete(_user_cache_key(user_id))
+
+
+class ClaimsUser:
+  """
+  User hasil klaim JWT yang sudah diverifikasi (user_id, role, cafe_id, is_superuser).
+  Tidak ada query untuk otorisasi & tenant scoping; atribut lain (username, email, ...)
+  diambil dari user lengkap lewat get_cached_user() saat benar-benar dibutuhkan.
+  """
+  is_authenticated = True
+  is_anonymous = False
+
+  def __init__(self, token):
+    self.token = token
+    self.id = self.pk = uuid.UUID(str(token[api_settings.USER_ID_CLAIM]))
+    self.role = token['role']
+    self.cafe_id = token['cafe_id']
+    self.is_superuser = token.get('is_superuser', False)
+
+  @cached_property
+  def cafe(self):
+    if self.cafe_id is None:
+      return None
+    # Instance tanpa query: cukup untuk filter(cafe=...), FK assignment, dan cafe.id
+    cafe = Cafe(id=self.cafe_id)
+    cafe._state.adding = False
+    return cafe
+
+  @cached_property
+  def instance(self):
+    return get_cached_user(self.id)
+
+  def __getattr__(self, name):
+    if name.startswith('_'):
+      raise AttributeError(name)
+    return getattr(self.instance, name)
+
+  def __str__(self):
+    return str(self.id)
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+  """
+  JWTAuthentication tanpa load User per request.
+  Token lama yang belum membawa klaim role/cafe_id jatuh ke user lengkap dari cache.
+  Revokasi tetap lewat blacklist refresh token (access token berumur pendek).
+  """
+
+  def get_user(self, validated_token):
+    if api_settings.USER_ID_CLAIM not in validated_token:
+      raise AuthenticationFailed('Token contained no recognizable user identification', code='token_not_valid')
+
+    if all(claim in validated_token for claim in REQUIRED_CLAIMS):
+      return ClaimsUser(validated_token)
+
+    try:
+      user = get_cached_user(validated_token[api_settings.USER_ID_CLAIM])
+    except User.DoesNotExist:
+      raise AuthenticationFailed('User not found', code='user_not_found')
+
+    if not user.is_active:
+      raise AuthenticationFailed('User is inactive', code='user_inactive')
+    return user
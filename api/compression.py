@@ -0,0 +1,99 @@
+import gzip
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+  import brotli
+except ImportError:  # dependensi opsional: tanpa brotli hanya gzip
+  brotli = None
+
+# Kompresi response sesuai Accept-Encoding (br > gzip, mengikuti q-value) untuk body >= COMPRESSION_MIN_SIZE.
+# Hanya tipe teks/JSON; response streaming (SSE, file WhiteNoise) dan yang sudah ber-Content-Encoding dilewati.
+# API memakai JWT di header (bukan cookie), jadi body tidak membawa secret yang bisa ditebak lewat ukuran (BREACH).
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/', 'application/javascript', 'application/xml')
+
+
+def accepted_encodings(header):
+  """{'gzip': 1.0, 'br': 0.5, ...} dari header Accept-Encoding; q=0 berarti ditolak."""
+  accepted = {}
+  for part in header.split(','):
+    name, _, params = part.strip().partition(';')
+    name = name.strip().lower()
+    if not name:
+      continue
+    quality = 1.0
+    params = params.strip()
+    if params.startswith('q='):
+      try:
+        quality = float(params[2:])
+      except ValueError:
+        quality = 0.0
+    accepted[name] = quality
+  return accepted
+
+
+def choose_encoding(header):
+  accepted = accepted_encodings(header)
+  available = ['br', 'gzip'] if brotli is not None else ['gzip']
+  best, best_quality = None, 0.0
+  for encoding in available:
+    quality = accepted.get(encoding, accepted.get('*', 0.0))
+    if quality > best_quality:
+      best, best_quality = encoding, quality
+  return best
+
+
+def compress(content, encoding):
+  if encoding == 'br':
+    return brotli.compress(content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+  # mtime=0: output deterministik untuk body yang sama
+  return gzip.compress(content, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+  sync_capable = True
+  async_capable = True
+
+  def __init__(self, get_response):
+    self.get_response = get_response
+    if iscoroutinefunction(get_response):
+      markcoroutinefunction(self)
+
+  def __call__(self, request):
+    if iscoroutinefunction(self):
+      return self.__acall__(request)
+    return self.process_response(request, self.get_response(request))
+
+  async def __acall__(self, request):
+    return self.process_response(request, await self.get_response(request))
+
+  def process_response(self, request, response):
+    if not settings.COMPRESSION_ENABLED or response.streaming or response.has_header('Content-Encoding'):
+      return response
+    if not response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES):
+      return response
+
+    # Body kecil tetap bervariasi per Accept-Encoding bila body lain di URL yang sama dikompres
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+      return response
+
+    encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    if encoding is None:
+      return response
+
+    compressed = compress(response.content, encoding)
+    if len(compressed) >= len(response.content):
+      return response
+
+    response.content = compressed
+    response['Content-Length'] = str(len(compressed))
+    response['Content-Encoding'] = encoding
+    # Representasi berubah: ETag kuat jadi lemah (sama seperti GZipMiddleware Django)
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+      response['ETag'] = 'W/' + etag
+    return response
@@ -0,0 +1,141 @@
+import contextvars
+import functools
+import random
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+
+# Alias database untuk read di request ini. None = primary ('default').
+_read_db = contextvars.ContextVar('read_db', default=None)
+# True bila request ini sudah menulis data yang harus langsung terbaca
+_pinned = contextvars.ContextVar('read_db_pinned', default=False)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def _sticky_key(user_id):
+  return f'db:sticky:{user_id}'
+
+
+class ReplicaRouter:
+  """
+  Write selalu ke primary. Read ke replica hanya di view yang memakai @use_replica.
+  """
+
+  def db_for_read(self, model, **hints):
+    alias = _read_db.get()
+    if alias is None or _pinned.get():
+      return 'default'
+    return alias
+
+  def db_for_write(self, model, **hints):
+    return 'default'
+
+  def allow_relation(self, obj1, obj2, **hints):
+    # Replica adalah salinan primary, jadi relasi antar alias selalu valid
+    return True
+
+  def allow_migrate(self, db, app_label, model_name=None, **hints):
+    return db == 'default'
+
+
+def use_replica(view):
+  """
+  Jalankan read di view pada salah satu replica.
+  Dipasang di bawah @api_view supaya request sudah ter-autentikasi.
+  User yang baru saja menulis (REPLICA_STICKY_SECONDS) tetap dibaca dari primary.
+  """
+  @functools.wraps(view)
+  def wrapper(request, *args, **kwargs):
+    alias = None
+    if settings.DATABASE_REPLICAS and not cache.get(_sticky_key(request.user.id)):
+      alias = random.choice(settings.DATABASE_REPLICAS)
+
+    token = _read_db.set(alias)
+    pinned_token = _pinned.set(False)
+    try:
+      return view(request, *args, **kwargs)
+    finally:
+      _pinned.reset(pinned_token)
+      _read_db.reset(token)
+  return wrapper
+
+
+@contextmanager
+def use_primary():
+  """
+  Paksa read di dalam blok ke primary (mis. sebelum menulis berdasarkan hasil read).
+  Bisa dipakai sebagai context manager atau decorator: @use_primary()
+  """
+  token = _read_db.set(None)
+  try:
+    yield
+  finally:
+    _read_db.reset(token)
+
+
+def pin_primary():
+  """
+  Sisa request ini membaca dari primary (data baru saja ditulis).
+  """
+  _pinned.set(True)
+
+
+def reset_routing():
+  """Context ini kembali membaca dari primary tanpa pin; view di dalamnya memilih replica sendiri."""
+  _read_db.set(None)
+  _pinned.set(False)
+
+
+def stick_to_primary(user_id):
+  """
+  Read user ini ke primary selama REPLICA_STICKY_SECONDS (read-your-writes lintas request).
+  Penanda di cache bersama (CACHE_URL, diwajibkan settings bila ada replica) supaya terbaca
+  oleh instance mana pun yang melayani request berikutnya.
+  """
+  cache.set(_sticky_key(user_id), True, settings.REPLICA_STICKY_SECONDS)
+
+
+class ReplicaStickinessMiddleware:
+  """
+  Setelah request tulis berhasil, read user tsb diarahkan ke primary selama
+  REPLICA_STICKY_SECONDS supaya perubahan langsung terlihat (read-your-writes).
+  Sync & async: di ASGI middleware ini tidak memaksa view async berjalan di thread.
+  """
+  sync_capable = True
+  async_capable = True
+
+  def __init__(self, get_response):
+    self.get_response = get_response
+    if iscoroutinefunction(get_response):
+      markcoroutinefunction(self)
+
+  def _sticky_user_id(self, request, response):
+    # replica_sticky_handled: view (mis. batch) sudah menandai sendiri hanya bila ada sub-request tulis
+    if getattr(request, 'replica_sticky_handled', False):
+      return None
+    if settings.DATABASE_REPLICAS and request.method not in SAFE_METHODS and response.status_code < 400:
+      # DRF menyalin user hasil JWT ke HttpRequest asli saat autentikasi
+      user = getattr(request, 'user', None)
+      if user is not None and user.is_authenticated:
+        return user.id
+    return None
+
+  def __call__(self, request):
+    if iscoroutinefunction(self):
+      return self.__acall__(request)
+
+    response = self.get_response(request)
+    user_id = self._sticky_user_id(request, response)
+    if user_id is not None:
+      stick_to_primary(user_id)
+    return response
+
+  async def __acall__(self, request):
+    response = await self.get_response(request)
+    user_id = self._sticky_user_id(request, response)
+    if user_id is not None:
+      await cache.aset(_sticky_key(user_id), True, settings.REPLICA_STICKY_SECONDS)
+    return response
@@ -0,0 +1,178 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+# Event status pembayaran & transaksi per cafe, untuk SSE / long-poll (api/views/events.py).
+# publish_*() menunggu commit (on_commit), jadi terminal tidak pernah melihat status yang di-rollback.
+# Backend (EVENTS_BACKEND):
+# - 'local': ring buffer in-process; cukup untuk satu worker / dev lokal
+# - 'cache': buffer di Django cache bersama (CACHE_URL) supaya event terlihat lintas worker.
+#   Tanpa CACHE_URL broker jatuh ke 'local' (satu warning di log).
+# Id event = milidetik epoch (naik terus per cafe), sehingga Last-Event-ID tetap valid setelah restart.
+
+_CACHE_PREFIX = 'events'
+
+
+def _next_id(last_id):
+  return max(last_id + 1, int(time.time() * 1000))
+
+
+class LocalBroker:
+  def __init__(self, buffer_size):
+    self.buffer_size = buffer_size
+    self.lock = threading.Lock()
+    self.buffers = {}  # cafe_id -> deque event
+    self.waiters = {}  # cafe_id -> set (loop, asyncio.Event)
+
+  def publish(self, cafe_id, event_type, data):
+    with self.lock:
+      buffer = self.buffers.setdefault(cafe_id, deque(maxlen=self.buffer_size))
+      event = {'id': _next_id(buffer[-1]['id'] if buffer else 0), 'type': event_type, 'data': data}
+      buffer.append(event)
+    self.notify(cafe_id)
+    return event
+
+  def notify(self, cafe_id):
+    with self.lock:
+      waiters = list(self.waiters.get(cafe_id, ()))
+    for loop, flag in waiters:
+      loop.call_soon_threadsafe(flag.set)
+
+  def since(self, cafe_id, last_id):
+    with self.lock:
+      return [event for event in self.buffers.get(cafe_id, ()) if event['id'] > last_id]
+
+  async def asince(self, cafe_id, last_id):
+    return self.since(cafe_id, last_id)
+
+  def latest(self, cafe_id):
+    """Id event terakhir; titik awal subscriber baru yang tidak butuh riwayat."""
+    with self.lock:
+      buffer = self.buffers.get(cafe_id)
+      return buffer[-1]['id'] if buffer else 0
+
+  async def alatest(self, cafe_id):
+    return self.latest(cafe_id)
+
+  async def wait(self, cafe_id, last_id, timeout, poll_interval=None):
+    """Event setelah last_id; menunggu paling lama `timeout` detik. [] bila tidak ada."""
+    flag = asyncio.Event()
+    waiter = (asyncio.get_running_loop(), flag)
+    with self.lock:
+      self.waiters.setdefault(cafe_id, set()).add(waiter)
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    try:
+      while True:
+        # Flag di-reset & dicek setelah waiter terdaftar supaya publish di antaranya tidak terlewat
+        flag.clear()
+        events = await self.asince(cafe_id, last_id)
+        remaining = deadline - loop.time()
+        if events or remaining <= 0:
+          return events
+        try:
+          await asyncio.wait_for(flag.wait(), min(remaining, poll_interval or remaining))
+        except asyncio.TimeoutError:
+          pass
+    finally:
+      with self.lock:
+        self.waiters.get(cafe_id, set()).discard(waiter)
+
+
+class CacheBroker(LocalBroker):
+  """
+  Buffer di cache bersama: counter id + satu key per event. Subscriber di worker lain
+  polling cache tiap EVENTS_POLL_INTERVAL; subscriber di worker yang sama dibangunkan langsung.
+  """
+
+  def _seq_key(self, cafe_id):
+    return f'{_CACHE_PREFIX}:{cafe_id}:last'
+
+  def _event_key(self, cafe_id, event_id):
+    return f'{_CACHE_PREFIX}:{cafe_id}:{event_id}'
+
+  def publish(self, cafe_id, event_type, data):
+    seq_key = self._seq_key(cafe_id)
+    # Nilai awal berbasis waktu; incr atomic di Redis/Memcached
+    cache.add(seq_key, _next_id(0) - 1, settings.EVENTS_TTL_SECONDS)
+    try:
+      event_id = cache.incr(seq_key)
+    except ValueError:  # counter ter-evict di antara add dan incr
+      event_id = _next_id(0)
+      cache.set(seq_key, event_id, settings.EVENTS_TTL_SECONDS)
+    event = {'id': event_id, 'type': event_type, 'data': data}
+    cache.set(self._event_key(cafe_id, event_id), event, settings.EVENTS_TTL_SECONDS)
+    self.notify(cafe_id)
+    return event
+
+  def _keys(self, cafe_id, last_id, current):
+    if not current or current <= last_id:
+      return []
+    first = max(last_id + 1, current - self.buffer_size + 1)
+    return [self._event_key(cafe_id, event_id) for event_id in range(first, current + 1)]
+
+  def since(self, cafe_id, last_id):
+    keys = self._keys(cafe_id, last_id, cache.get(self._seq_key(cafe_id)))
+    return sorted(cache.get_many(keys).values(), key=lambda event: event['id']) if keys else []
+
+  async def asince(self, cafe_id, last_id):
+    keys = self._keys(cafe_id, last_id, await cache.aget(self._seq_key(cafe_id)))
+    return sorted((await cache.aget_many(keys)).values(), key=lambda event: event['id']) if keys else []
+
+  def latest(self, cafe_id):
+    return cache.get(self._seq_key(cafe_id)) or 0
+
+  async def alatest(self, cafe_id):
+    return await cache.aget(self._seq_key(cafe_id)) or 0
+
+  async def wait(self, cafe_id, last_id, timeout, poll_interval=None):
+    return await super().wait(cafe_id, last_id, timeout, poll_interval or settings.EVENTS_POLL_INTERVAL)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def broker():
+  global _broker
+  if _broker is None:
+    with _broker_lock:
+      if _broker is None:
+        backend = LocalBroker
+        if settings.EVENTS_BACKEND == 'cache' and settings.SHARED_CACHE:
+          backend = CacheBroker
+        elif not settings.DEBUG:
+          # Bukan error: satu worker tetap jalan, tapi subscriber di instance lain tidak melihat event
+          logger.warning(
+            'Events use the in-process broker (EVENTS_BACKEND=%s, shared cache: %s); subscribers on other '
+            'workers will not see them. Set EVENTS_BACKEND=cache and CACHE_URL.',
+            settings.EVENTS_BACKEND, settings.SHARED_CACHE
+          )
+        _broker = backend(settings.EVENTS_BUFFER_SIZE)
+  return _broker
+
+
+def publish(cafe_id, event_type, data):
+  """Kirim event setelah transaksi DB saat ini commit (langsung bila autocommit)."""
+  if cafe_id is None:
+    return
+  transaction.on_commit(lambda: broker().publish(cafe_id, event_type, data), robust=True)
+
+
+def publish_payment(cafe_id, payment_id, transaction_id, payment_status):
+  publish(cafe_id, f'payment.{payment_status}', {
+    'payment_id': payment_id, 'transaction_id': transaction_id, 'status': payment_status,
+  })
+
+
+def publish_transaction(cafe_id, transaction_id, transaction_status):
+  publish(cafe_id, 'transaction.status', {'transaction_id': transaction_id, 'status': transaction_status})
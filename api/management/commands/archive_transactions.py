@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from api.models import Transaction
+from api.utils.dates import local_bounds
+from api.utils_archive import archive_month, month_start
+
+class Command(BaseCommand):
+    help = 'Moves finished transactions older than N months into compressed monthly archives'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-months', type=int, default=12, help='Months of history kept in the hot tables (default: 12)')
+        parser.add_argument('--cafe', type=int, help='Only archive this cafe id')
+        parser.add_argument('--dry-run', action='store_true', help='List the months that would be archived')
+
+    def handle(self, *args, **options):
+        keep_months = options['keep_months']
+        if keep_months < 1:
+            raise CommandError('--keep-months must be at least 1')
+
+        # Bulan pertama yang tetap disimpan di tabel hot (waktu lokal)
+        today = month_start(timezone.localdate())
+        months = today.year * 12 + today.month - 1 - keep_months
+        cutoff = today.replace(year=months // 12, month=months % 12 + 1)
+
+        cutoff_at, _ = local_bounds(cutoff, cutoff)
+        query = Transaction.objects.filter(created_at__lt=cutoff_at)
+        if options['cafe']:
+            query = query.filter(cafe_id=options['cafe'])
+
+        periods = (
+            query.annotate(period=TruncMonth('created_at'))
+            .values_list('cafe_id', 'period')
+            .distinct()
+            .order_by('cafe_id', 'period')
+        )
+
+        archived = 0
+        for cafe_id, period in periods:
+            period = timezone.localtime(period).date()
+            if options['dry_run']:
+                self.stdout.write(f'Would archive cafe {cafe_id} {period:%Y-%m}')
+                continue
+
+            archive = archive_month(cafe_id, period)
+            if archive is None:
+                self.stdout.write(self.style.WARNING(
+                    f'Skipped cafe {cafe_id} {period:%Y-%m}: has pending or processing transactions'
+                ))
+                continue
+
+            archived += 1
+            self.stdout.write(f'Archived cafe {cafe_id} {period:%Y-%m}: {archive.transaction_count} transactions')
+
+        self.stdout.write(self.style.SUCCESS(f'Successfully archived {archived} cafe-months older than {cutoff:%Y-%m}.'))
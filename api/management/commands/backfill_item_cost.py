@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+class Command(BaseCommand):
+    help = 'Backfills TransactionItem.cost from the current Product.cost in bounded batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows updated per batch (default: 1000)')
+        parser.add_argument('--sleep', type=float, default=0, help='Seconds to pause between batches')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        pause = options['sleep']
+        last_id = 0
+        updated = 0
+
+        self.stdout.write(self.style.WARNING('Starting cost backfill...'))
+
+        while True:
+            # Keyset pagination: each batch is a short transaction, so the backfill
+            # never holds row locks on the whole table.
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT id FROM transaction_item WHERE id > %s AND cost IS NULL ORDER BY id LIMIT %s",
+                    [last_id, batch_size]
+                )
+                ids = [row[0] for row in cursor.fetchall()]
+                if not ids:
+                    break
+
+                # Items whose product was deleted stay NULL (unknown cost)
+                cursor.execute("""
+                    UPDATE transaction_item
+                    SET cost = product.cost
+                    FROM product
+                    WHERE transaction_item.product_id = product.id AND transaction_item.id = ANY(%s)
+                """, [ids])
+                updated += cursor.rowcount
+
+            last_id = ids[-1]
+            self.stdout.write(f'Backfilled up to item {last_id} ({updated} rows)')
+
+            if pause:
+                time.sleep(pause)
+
+        self.stdout.write(self.style.SUCCESS(f'Successfully backfilled cost on {updated} transaction items.'))
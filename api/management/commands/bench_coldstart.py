@@ -0,0 +1,101 @@
+import json
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Dijalankan di proses Python baru supaya benar-benar cold (tanpa modul ter-cache)
+PROBE = r"""
+import io, json, os, sys, time
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'kasirgo.settings')
+
+t0 = time.perf_counter()
+import kasirgo.wsgi
+t1 = time.perf_counter()
+
+path = sys.argv[1]
+environ = {
+    'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '', 'SERVER_NAME': 'kasirgo.vercel.app',
+    'SERVER_PORT': '443', 'HTTP_HOST': 'kasirgo.vercel.app', 'SERVER_PROTOCOL': 'HTTP/1.1',
+    'wsgi.url_scheme': 'https', 'wsgi.input': io.BytesIO(b''), 'wsgi.errors': sys.stderr,
+    'wsgi.version': (1, 0), 'wsgi.multithread': False, 'wsgi.multiprocess': True, 'wsgi.run_once': False,
+}
+status = []
+body = b''.join(kasirgo.wsgi.application(environ, lambda s, h, e=None: status.append(s)))
+t2 = time.perf_counter()
+
+print(json.dumps({
+    'import_ms': (t1 - t0) * 1000,
+    'first_request_ms': (t2 - t1) * 1000,
+    'status': status[0] if status else None,
+    'modules': len(sys.modules),
+}))
+"""
+
+class Command(BaseCommand):
+    help = 'Measures cold-start cost (import kasirgo.wsgi + first request) in fresh interpreters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters to start (default: 5)')
+        parser.add_argument('--path', default='/api/products/', help='Path of the first request (default: /api/products/)')
+        parser.add_argument('--import-budget-ms', type=float, help='Fail if median import time exceeds this')
+        parser.add_argument('--request-budget-ms', type=float, help='Fail if median first-request time exceeds this')
+        parser.add_argument('--baseline', help='JSON file from a previous --save run to compare against')
+        parser.add_argument('--max-regression', type=float, default=20.0,
+                            help='Allowed slowdown vs --baseline in percent (default: 20)')
+        parser.add_argument('--save', help='Write the result summary to this JSON file')
+
+    def probe(self, path):
+        result = subprocess.run(
+            [sys.executable, '-c', PROBE, path],
+            cwd=settings.BASE_DIR, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            raise CommandError(f'Probe failed:\n{result.stderr}')
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    def handle(self, *args, **options):
+        runs = [self.probe(options['path']) for _ in range(options['runs'])]
+
+        summary = {
+            'path': options['path'],
+            'runs': len(runs),
+            'import_ms': statistics.median(run['import_ms'] for run in runs),
+            'first_request_ms': statistics.median(run['first_request_ms'] for run in runs),
+            'modules': statistics.median(run['modules'] for run in runs),
+            'status': runs[-1]['status'],
+        }
+
+        self.stdout.write(
+            f"import kasirgo.wsgi: {summary['import_ms']:.1f} ms (median of {summary['runs']})\n"
+            f"first request {summary['path']}: {summary['first_request_ms']:.1f} ms -> {summary['status']}\n"
+            f"modules loaded: {summary['modules']:.0f}"
+        )
+
+        if options['save']:
+            with open(options['save'], 'w') as f:
+                json.dump(summary, f, indent=2)
+
+        failures = []
+        if options['import_budget_ms'] is not None and summary['import_ms'] > options['import_budget_ms']:
+            failures.append(f"import {summary['import_ms']:.1f} ms > budget {options['import_budget_ms']} ms")
+        if options['request_budget_ms'] is not None and summary['first_request_ms'] > options['request_budget_ms']:
+            failures.append(f"first request {summary['first_request_ms']:.1f} ms > budget {options['request_budget_ms']} ms")
+
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+            limit = 1 + options['max_regression'] / 100
+            for key in ('import_ms', 'first_request_ms'):
+                if summary[key] > baseline[key] * limit:
+                    failures.append(
+                        f"{key} regressed {summary[key]:.1f} ms vs baseline {baseline[key]:.1f} ms "
+                        f"(> {options['max_regression']}%)"
+                    )
+
+        if failures:
+            raise CommandError('Cold-start budget exceeded: ' + '; '.join(failures))
+
+        self.stdout.write(self.style.SUCCESS('Cold start within budget.'))
@@ -0,0 +1,130 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import dj_database_url
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.utils import load_backend
+
+from api.utils.bench import percentile
+from kasirgo.db import POOL_MODES, apply_pool_mode
+
+# Query ringan yang mewakili request API: satu read kecil per "request"
+DEFAULT_QUERY = 'SELECT id FROM cafe ORDER BY id LIMIT 1'
+
+
+class Command(BaseCommand):
+    help = 'Compares connection setup overhead and request latency across DATABASE_POOL_MODE values'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help='Postgres URL (default: DATABASE_URL / DB_* settings)')
+        parser.add_argument('--pgbouncer-url', help='PgBouncer URL for the pgbouncer mode (skipped when omitted)')
+        parser.add_argument('--modes', default='none,' + ','.join(POOL_MODES),
+                            help='Comma separated modes; "none" closes the connection after every request')
+        parser.add_argument('--requests', type=int, default=500, help='Simulated requests per mode (default: 500)')
+        parser.add_argument('--concurrency', type=int, default=8, help='Worker threads (default: 8)')
+        parser.add_argument('--query', default=DEFAULT_QUERY, help='SQL executed once per request')
+        parser.add_argument('--no-ssl', action='store_true', help='Do not require SSL (local Postgres)')
+
+    def database_settings(self, mode, options):
+        url = options['pgbouncer_url'] if mode == 'pgbouncer' else options['url']
+        if url:
+            db = dj_database_url.parse(url, ssl_require=not options['no_ssl'])
+        else:
+            db = {key: value for key, value in settings.DATABASES['default'].items() if key != 'OPTIONS'}
+            db['OPTIONS'] = {
+                key: value for key, value in settings.DATABASES['default'].get('OPTIONS', {}).items()
+                if key not in ('pool', 'prepare_threshold')
+            }
+
+        if mode == 'none':
+            apply_pool_mode(db, 'persistent', conn_max_age=0, **self.pool_options())
+        else:
+            apply_pool_mode(db, mode, conn_max_age=600, **self.pool_options())
+        return db
+
+    def pool_options(self):
+        pool = settings.DATABASE_POOL_OPTIONS
+        return {
+            'pool_min_size': pool['pool_min_size'],
+            'pool_max_size': max(pool['pool_max_size'], self.concurrency),
+            'pool_timeout': pool['pool_timeout'],
+        }
+
+    def run_mode(self, mode, options):
+        alias = f'bench_{mode}'
+        db = connections.configure_settings({alias: self.database_settings(mode, options)})[alias]
+        backend = load_backend(db['ENGINE'])
+        local = threading.local()
+        wrappers = []
+        lock = threading.Lock()
+
+        def wrapper():
+            # Satu DatabaseWrapper per thread, sama seperti connections[alias] di worker Django
+            if not hasattr(local, 'db'):
+                local.db = backend.DatabaseWrapper(db, alias)
+                local.db.inc_thread_sharing()  # ditutup dari main thread setelah benchmark
+                with lock:
+                    wrappers.append(local.db)
+            return local.db
+
+        def request(_):
+            conn = wrapper()
+            start = time.perf_counter()
+            conn.close_if_unusable_or_obsolete()  # request_started
+            connected = conn.connection is None
+            conn.ensure_connection()
+            setup = time.perf_counter() - start
+            with conn.cursor() as cursor:
+                cursor.execute(options['query'])
+                cursor.fetchall()
+            conn.close_if_unusable_or_obsolete()  # request_finished
+            return connected, setup, time.perf_counter() - start
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            results = list(executor.map(request, range(options['requests'])))
+        elapsed = time.perf_counter() - started
+
+        connects = sum(1 for connected, _, _ in results if connected)
+        for conn in wrappers:
+            conn.close()
+        if mode == 'pool':
+            # Checkout dari pool juga lewat connect(); yang dihitung adalah koneksi fisik pool
+            connects = wrappers[0].pool.get_stats().get('connections_num', 0)
+            wrappers[0].close_pool()
+
+        setups = [setup * 1000 for _, setup, _ in results]
+        latencies = [total * 1000 for _, _, total in results]
+        return {
+            'mode': mode,
+            'connects': connects,
+            'setup_avg': statistics.mean(setups),
+            'p50': statistics.median(latencies),
+            'p99': percentile(latencies, 99),
+            'rps': len(results) / elapsed,
+        }
+
+    def handle(self, *args, **options):
+        modes = [mode.strip() for mode in options['modes'].split(',') if mode.strip()]
+        unknown = [mode for mode in modes if mode != 'none' and mode not in POOL_MODES]
+        if unknown:
+            raise CommandError(f"Unknown mode(s): {', '.join(unknown)}")
+        if 'pgbouncer' in modes and not options['pgbouncer_url']:
+            self.stdout.write(self.style.WARNING('Skipping pgbouncer mode (no --pgbouncer-url)'))
+            modes.remove('pgbouncer')
+
+        self.concurrency = options['concurrency']
+        self.stdout.write(
+            f"{options['requests']} requests per mode, {self.concurrency} threads\n"
+            f"{'mode':<12}{'connects':>10}{'setup avg':>12}{'p50':>10}{'p99':>10}{'req/s':>10}"
+        )
+        for mode in modes:
+            result = self.run_mode(mode, options)
+            self.stdout.write(
+                f"{result['mode']:<12}{result['connects']:>10}{result['setup_avg']:>10.2f}ms"
+                f"{result['p50']:>8.2f}ms{result['p99']:>8.2f}ms{result['rps']:>10.0f}"
+            )
@@ -0,0 +1,213 @@
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from api.management.commands.seed_cafe import SEED_EMAIL_DOMAIN
+from api.models import Cafe, Payment, Product, Transaction, User
+from api.serializer import KasirGoTokenObtainPairSerializer
+from api.utils import duitku
+from api.utils.bench import load_results, save_results, summarize
+
+SCENARIOS = ('product_list', 'product_search', 'transaction_list', 'checkout', 'callback')
+# Skenario ini menulis permanen (transaksi, payment, stok); hanya untuk cafe hasil seed_cafe
+WRITE_SCENARIOS = ('checkout', 'callback')
+SEARCH_TERMS = ('kopi', 'latte', 'teh', 'nasi', 'goreng', 'es', 'roti', 'matcha')
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks the main POS endpoints (throughput, p50/p95/p99) against a seeded cafe'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cafe', type=int, help='Cafe id to benchmark (default: the cafe with the most transactions)')
+        parser.add_argument('--base-url',
+                            help='Hit a running server over HTTP (e.g. http://127.0.0.1:8000) instead of in-process')
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS), help=f"Comma separated, from: {', '.join(SCENARIOS)}")
+        parser.add_argument('--requests', type=int, default=200, help='Requests per scenario (default: 200)')
+        parser.add_argument('--concurrency', type=int, default=4, help='Concurrent clients (default: 4)')
+        parser.add_argument('--warmup', type=int, default=10, help='Untimed requests per scenario (default: 10)')
+        parser.add_argument('--label', default='', help='Suffix for the saved result file (e.g. before-index)')
+        parser.add_argument('--no-save', action='store_true', help='Do not write bench_results/*.json')
+        parser.add_argument('--compare', help='Previous result JSON to compare against')
+        parser.add_argument('--max-regression', type=float,
+                            help='Fail when a scenario p95 is this many percent slower than --compare')
+
+    def handle(self, *args, **options):
+        scenarios = [name.strip() for name in options['scenarios'].split(',') if name.strip()]
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+        cafe = self.pick_cafe(options['cafe'])
+        owner = User.objects.filter(cafe=cafe, role='owner').order_by('date_joined').first()
+        if owner is None:
+            raise CommandError(f'Cafe {cafe.id} has no owner account')
+        # Request dijalankan paralel di banyak koneksi (atau lewat HTTP), jadi tidak bisa di-rollback
+        writes = [name for name in scenarios if name in WRITE_SCENARIOS]
+        if writes and not owner.email.endswith(f'@{SEED_EMAIL_DOMAIN}'):
+            raise CommandError(
+                f"Cafe {cafe.id} was not created by seed_cafe; {', '.join(writes)} would write real data. "
+                f"Pick a seeded cafe with --cafe or leave them out of --scenarios"
+            )
+        self.token = str(KasirGoTokenObtainPairSerializer.get_token(owner).access_token)
+        self.products = list(Product.objects.filter(cafe=cafe, is_available=True).values_list('id', 'name'))
+        if not self.products:
+            raise CommandError(f'Cafe {cafe.id} has no products; run seed_cafe first')
+        self.base_url = options['base_url']
+        self.local = threading.local()
+
+        self.stdout.write(
+            f"Benchmarking cafe {cafe.id} ({cafe.name}), {options['requests']} requests x "
+            f"{options['concurrency']} clients, {'HTTP ' + self.base_url if self.base_url else 'in-process'}"
+        )
+
+        results = {}
+        # In-process: satu user menembak ribuan request, rate limit akan menolak sebagian besar
+        with override_settings(THROTTLE_ENABLED=False) if not self.base_url else nullcontext():
+            for name in scenarios:
+                requests = self.build_requests(name, cafe, owner, options['requests'] + options['warmup'])
+                results[name] = self.run(requests[:options['warmup']], requests[options['warmup']:], options['concurrency'])
+                self.report(name, results[name])
+
+        meta = {
+            'cafe_id': cafe.id, 'mode': 'http' if self.base_url else 'in-process',
+            'concurrency': options['concurrency'], 'requests': options['requests'],
+            'pool_mode': settings.DATABASE_POOL_MODE,
+        }
+        if not options['no_save']:
+            path = save_results('endpoints', options['label'], {'meta': meta, 'scenarios': results})
+            self.stdout.write(f'Saved {path}')
+
+        if options['compare']:
+            self.compare(results, load_results(options['compare'])['scenarios'], options['max_regression'])
+
+    def pick_cafe(self, cafe_id):
+        cafes = Cafe.objects.all()
+        if cafe_id is not None:
+            cafe = cafes.filter(id=cafe_id).first()
+        else:
+            # Cafe dengan riwayat terbanyak (biasanya hasil seed_cafe)
+            busiest = Transaction.objects.values('cafe_id').order_by().annotate(n=Count('id')).order_by('-n').first()
+            cafe = cafes.filter(id=busiest['cafe_id']).first() if busiest else None
+        if cafe is None:
+            raise CommandError('No cafe to benchmark; run seed_cafe first')
+        return cafe
+
+    def build_requests(self, name, cafe, owner, count):
+        """List of (method, path, body) untuk satu skenario."""
+        rng = random.Random(name)
+
+        if name == 'product_list':
+            return [('GET', reverse('get_all_products'), None)] * count
+        if name == 'product_search':
+            return [('GET', reverse('search_products') + f'?name={rng.choice(SEARCH_TERMS)}', None) for _ in range(count)]
+        if name == 'transaction_list':
+            return [('GET', reverse('list_transactions') + f'?page={rng.randint(1, 5)}', None) for _ in range(count)]
+        if name == 'checkout':
+            requests = []
+            for _ in range(count):
+                items = [
+                    {'product': product_id, 'product_name': product_name, 'quantity': rng.randint(1, 2),
+                     'price': '0', 'subtotal': '0'}
+                    for product_id, product_name in rng.sample(self.products, min(len(self.products), rng.randint(1, 3)))
+                ]
+                requests.append(('POST', reverse('create_transaction'), {
+                    'items': items, 'payment_method': 'cash', 'paid_amount': '1000000',
+                    'subtotal': '0', 'total': '0',
+                }))
+            return requests
+
+        # callback: satu transaksi + payment pending per request, dibuat langsung di DB
+        requests = []
+        now = timezone.now()
+        for i in range(count):
+            trx = Transaction.objects.create(
+                cafe=cafe, cashier=owner, subtotal=25000, total=25000, payment_method='qris',
+                paid_amount=0, status='pending', notes='bench_endpoints'
+            )
+            merchant_order_id = f'{cafe.id}-{trx.transaction_number}-bench{i}'
+            Payment.objects.create(
+                transaction=trx, merchant_order_id=merchant_order_id, payment_method='SP',
+                amount=25000, status='pending', expired_at=now + timedelta(hours=1)
+            )
+            requests.append(('POST', reverse('payment_callback'), {
+                'merchantOrderId': merchant_order_id, 'resultCode': '00', 'amount': '25000',
+                'reference': f'BENCH{i}',
+                'signature': duitku.signature(settings.DUITKU_MERCHANT_CODE, '25000', merchant_order_id,
+                                              settings.DUITKU_API_KEY),
+            }))
+        return requests
+
+    def client(self):
+        # Satu client (dan satu koneksi DB untuk mode in-process) per thread
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            if self.base_url:
+                import httpx
+
+                client = httpx.Client(base_url=self.base_url, headers={'Authorization': f'Bearer {self.token}'},
+                                      timeout=30)
+            else:
+                client = Client(HTTP_HOST='kasirgo.vercel.app', HTTP_AUTHORIZATION=f'Bearer {self.token}')
+            self.local.client = client
+        return client
+
+    def send(self, request):
+        method, path, body = request
+        client = self.client()
+        start = time.perf_counter()
+        if self.base_url:
+            response = client.request(method, path, json=body)
+        else:
+            response = client.generic(method, path, json.dumps(body) if body is not None else '',
+                                      content_type='application/json')
+        return time.perf_counter() - start, response.status_code
+
+    def run(self, warmup, requests, concurrency):
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(self.send, warmup))
+            start = time.perf_counter()
+            outcomes = list(pool.map(self.send, requests))
+            elapsed = time.perf_counter() - start
+
+        latencies = [seconds for seconds, status_code in outcomes]
+        errors = sum(1 for _, status_code in outcomes if status_code >= 400)
+        return summarize(latencies, elapsed, errors)
+
+    def report(self, name, result):
+        line = (
+            f"{name:<17} {result['rps']:8.1f} req/s  p50 {result.get('p50_ms', 0):7.1f} ms  "
+            f"p95 {result.get('p95_ms', 0):7.1f} ms  p99 {result.get('p99_ms', 0):7.1f} ms"
+        )
+        if result['errors']:
+            self.stdout.write(self.style.WARNING(f"{line}  ({result['errors']} errors)"))
+        else:
+            self.stdout.write(line)
+
+    def compare(self, results, baseline, max_regression):
+        regressions = []
+        self.stdout.write('\nvs baseline (p95 / req/s):')
+        for name, result in results.items():
+            before = baseline.get(name)
+            if not before or not before.get('p95_ms') or not result.get('p95_ms'):
+                continue
+            change = (result['p95_ms'] / before['p95_ms'] - 1) * 100
+            self.stdout.write(
+                f"{name:<17} p95 {before['p95_ms']:.1f} -> {result['p95_ms']:.1f} ms ({change:+.1f}%)  "
+                f"{before['rps']:.1f} -> {result['rps']:.1f} req/s"
+            )
+            if max_regression is not None and change > max_regression:
+                regressions.append(f'{name} p95 {change:+.1f}%')
+
+        if regressions:
+            raise CommandError('Endpoint benchmark regressed: ' + '; '.join(regressions))
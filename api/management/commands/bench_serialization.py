@@ -0,0 +1,117 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+
+from api import compression, renderers
+from api.models import Cafe, Transaction, User
+from api.serializer import KasirGoTokenObtainPairSerializer
+from api.utils.bench import save_results
+
+
+class Command(BaseCommand):
+    help = 'Compares DRF JSONRenderer vs the orjson renderer and gzip/brotli sizes for catalog and transaction payloads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cafe', type=int, help='Cafe id (default: the cafe with the most transactions)')
+        parser.add_argument('--page-size', type=int, default=100, help='list_transactions page size (default: 100)')
+        parser.add_argument('--iterations', type=int, default=200, help='Renders per payload and renderer (default: 200)')
+        parser.add_argument('--label', default='', help='Suffix for the saved result file')
+        parser.add_argument('--no-save', action='store_true', help='Do not write bench_results/*.json')
+
+    def pick_cafe(self, cafe_id):
+        if cafe_id is None:
+            busiest = Transaction.objects.values('cafe_id').order_by().annotate(n=Count('id')).order_by('-n').first()
+            cafe_id = busiest['cafe_id'] if busiest else None
+        cafe = Cafe.objects.filter(id=cafe_id).first() if cafe_id is not None else None
+        if cafe is None:
+            raise CommandError('No cafe to benchmark; run seed_cafe first')
+        return cafe
+
+    def payloads(self, cafe, page_size):
+        owner = User.objects.filter(cafe=cafe, role='owner').order_by('date_joined').first()
+        if owner is None:
+            raise CommandError(f'Cafe {cafe.id} has no owner account')
+        token = KasirGoTokenObtainPairSerializer.get_token(owner).access_token
+        client = Client(HTTP_HOST='kasirgo.vercel.app', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+        # response.data = struktur Python sebelum di-render, persis yang diterima renderer
+        urls = {
+            'get_all_products': reverse('get_all_products'),
+            'list_transactions': reverse('list_transactions') + f'?page_size={page_size}',
+        }
+        payloads = {}
+        with override_settings(THROTTLE_ENABLED=False, COMPRESSION_ENABLED=False):
+            for name, url in urls.items():
+                response = client.get(url)
+                if response.status_code != 200:
+                    raise CommandError(f'{name} returned {response.status_code}')
+                payloads[name] = response.data
+        return payloads
+
+    def time_render(self, render, data, iterations):
+        content = render(data)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            render(data)
+        return (time.perf_counter() - start) / iterations * 1000, content
+
+    def time_compress(self, content, encoding, iterations):
+        compressed = compression.compress(content, encoding)
+        start = time.perf_counter()
+        for _ in range(max(iterations // 10, 1)):
+            compression.compress(content, encoding)
+        return (time.perf_counter() - start) / max(iterations // 10, 1) * 1000, len(compressed)
+
+    def handle(self, *args, **options):
+        if renderers.orjson is None:
+            self.stdout.write(self.style.WARNING('orjson is not installed; the fast renderer falls back to DRF'))
+
+        cafe = self.pick_cafe(options['cafe'])
+        iterations = options['iterations']
+        drf = JSONRenderer()
+        fast = renderers.FastJSONRenderer()
+
+        results = {}
+        with override_settings(JSON_BACKEND='orjson'):
+            for name, data in self.payloads(cafe, options['page_size']).items():
+                drf_ms, drf_content = self.time_render(drf.render, data, iterations)
+                fast_ms, fast_content = self.time_render(fast.render, data, iterations)
+                result = {
+                    'drf_ms': drf_ms, 'fast_ms': fast_ms, 'speedup': drf_ms / fast_ms if fast_ms else None,
+                    'identical': json.loads(drf_content) == json.loads(fast_content),
+                    'bytes': len(fast_content),
+                }
+                for encoding in ('gzip', 'br'):
+                    if encoding == 'br' and compression.brotli is None:
+                        continue
+                    result[f'{encoding}_ms'], result[f'{encoding}_bytes'] = self.time_compress(
+                        fast_content, encoding, iterations
+                    )
+                results[name] = result
+                self.report(name, result)
+
+        meta = {'cafe_id': cafe.id, 'page_size': options['page_size'], 'iterations': iterations,
+                'orjson': renderers.orjson is not None, 'brotli': compression.brotli is not None}
+        if not options['no_save']:
+            path = save_results('serialization', options['label'], {'meta': meta, 'payloads': results})
+            self.stdout.write(f'Saved {path}')
+
+    def report(self, name, result):
+        self.stdout.write(
+            f"{name:<18} render DRF {result['drf_ms']:7.2f} ms  orjson {result['fast_ms']:7.2f} ms "
+            f"({result['speedup'] or 0:.1f}x)  {result['bytes'] / 1024:8.1f} KB"
+        )
+        for encoding in ('gzip', 'br'):
+            if f'{encoding}_bytes' in result:
+                ratio = result[f'{encoding}_bytes'] / result['bytes'] * 100 if result['bytes'] else 0
+                self.stdout.write(
+                    f"{'':<18} {encoding:<4} {result[f'{encoding}_ms']:7.2f} ms  "
+                    f"{result[f'{encoding}_bytes'] / 1024:8.1f} KB on the wire ({ratio:.0f}%)"
+                )
+        if not result['identical']:
+            self.stdout.write(self.style.ERROR(f'{name}: orjson output differs from DRF JSONRenderer'))
@@ -0,0 +1,181 @@
+import json
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from api.models import Cafe, Category, Payment, Product, Transaction, TransactionItem, User
+from api.query_budget import IGNORED_PREFIXES, QueryBudgetExceeded
+from api.serializer import KasirGoTokenObtainPairSerializer
+from api.utils import duitku
+
+PASSWORD = 'budget-check-password'
+
+
+class Command(BaseCommand):
+    help = 'Calls every API endpoint against sample data and fails if a view exceeds its @query_budget'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--transactions', type=int, default=12, help='Sample transactions to create (default: 12)')
+        parser.add_argument('--items', type=int, default=3, help='Items per sample transaction (default: 3)')
+
+    def seed(self, options):
+        suffix = uuid.uuid4().hex[:8]
+        cafe = Cafe.objects.create(name=f'Budget Check {suffix}')
+        owner = User.objects.create_user(
+            username=f'budget-owner-{suffix}', email=f'owner-{suffix}@kasirgo.test',
+            password=PASSWORD, role='owner', cafe=cafe
+        )
+        staff = User.objects.create_user(
+            username=f'budget-staff-{suffix}', email=f'staff-{suffix}@kasirgo.test',
+            password=PASSWORD, role='staff', cafe=cafe
+        )
+        category = Category.objects.create(cafe=cafe, name='Minuman')
+        spare_category = Category.objects.create(cafe=cafe, name='Dihapus')
+        products = [
+            Product.objects.create(
+                cafe=cafe, category=category, name=f'Produk {i}', price=Decimal('15000'),
+                cost=Decimal('6000'), stock=1000
+            )
+            for i in range(max(options['items'], 2) + 1)
+        ]
+
+        transactions = []
+        for i in range(options['transactions']):
+            trx = Transaction.objects.create(
+                cafe=cafe, cashier=owner, subtotal=0, total=0, payment_method='cash',
+                paid_amount=Decimal('100000'), status='pending' if i == 0 else 'processing' if i == 4 else 'completed'
+            )
+            items = [
+                TransactionItem(
+                    transaction=trx, product=product, product_name=product.name, quantity=2,
+                    price=product.price, cost=product.cost, subtotal=product.price * 2
+                )
+                for product in products[:options['items']]
+            ]
+            TransactionItem.objects.bulk_create(items)
+            trx.subtotal = trx.total = sum(item.subtotal for item in items)
+            trx.save()
+            transactions.append(trx)
+
+        payment = Payment.objects.create(
+            transaction=transactions[0], merchant_order_id=f'{cafe.id}-{transactions[0].transaction_number}-000000',
+            payment_method='SP', amount=int(transactions[0].total), status='pending',
+            expired_at=timezone.now() + timedelta(hours=1)
+        )
+        return {
+            'cafe': cafe, 'owner': owner, 'staff': staff, 'category': category,
+            'spare_category': spare_category, 'products': products, 'transactions': transactions,
+            'payment': payment,
+        }
+
+    def cases(self, data, options):
+        products = data['products']
+        trx = data['transactions']
+        payment = data['payment']
+        owner_id = data['owner'].id
+        items = [{'product': product.id, 'product_name': product.name, 'quantity': 1, 'price': '0', 'subtotal': '0'}
+                 for product in products[:options['items']]]
+        new_transaction = {
+            'items': items, 'payment_method': 'cash', 'paid_amount': '500000', 'subtotal': '0', 'total': '0',
+        }
+        amount = str(int(payment.amount))
+
+        return [
+            ('GET', reverse('get_all_users'), None),
+            ('GET', reverse('get_update_delete_user', args=[owner_id]), None),
+            ('PATCH', reverse('get_update_delete_user', args=[data['staff'].id]), {'first_name': 'Budget'}),
+            ('POST', reverse('change_password', args=[owner_id]), {'old_password': PASSWORD, 'new_password': PASSWORD}),
+            ('DELETE', reverse('get_update_delete_user', args=[data['staff'].id]), None),
+            ('POST', reverse('create_user'), {
+                'first_name': 'Kasir', 'last_name': 'Baru', 'username': f"budget-new-{data['cafe'].id}",
+                'email': f"new-{data['cafe'].id}@kasirgo.test", 'password': PASSWORD,
+            }),
+
+            ('GET', reverse('get_all_categories'), None),
+            ('POST', reverse('create_category'), {'name': 'Snack'}),
+            ('GET', reverse('get_update_delete_category', args=[data['category'].id]), None),
+            ('PATCH', reverse('get_update_delete_category', args=[data['category'].id]), {'description': 'Dingin'}),
+            ('DELETE', reverse('get_update_delete_category', args=[data['spare_category'].id]), None),
+
+            ('GET', reverse('get_all_products'), None),
+            ('GET', reverse('search_products') + '?name=Produk', None),
+            ('POST', reverse('create_product'), {'name': 'Produk Baru', 'price': '10000', 'stock': 5,
+                                                 'category': data['category'].id}),
+            ('GET', reverse('get_update_delete_product', args=[products[0].id]), None),
+            ('PATCH', reverse('get_update_delete_product', args=[products[0].id]), {'price': '16000'}),
+            ('DELETE', reverse('get_update_delete_product', args=[products[-1].id]), None),
+
+            ('GET', reverse('list_transactions'), None),
+            ('GET', reverse('list_transactions') + '?status=completed&page_size=50', None),
+            ('POST', reverse('create_transaction'), new_transaction),
+            ('GET', reverse('get_update_delete_transaction', args=[trx[1].id]), None),
+            ('PATCH', reverse('get_update_delete_transaction', args=[trx[1].id]), {'items': items}),
+            ('GET', reverse('get_payment_status', args=[payment.id]), None),
+            ('POST', reverse('payment_callback'), {
+                'merchantOrderId': payment.merchant_order_id, 'resultCode': '00', 'amount': amount,
+                'reference': 'BUDGET-CHECK',
+                'signature': duitku.signature(settings.DUITKU_MERCHANT_CODE, amount, payment.merchant_order_id,
+                                              settings.DUITKU_API_KEY),
+            }),
+            ('POST', reverse('cancel_transaction', args=[trx[2].id]), None),
+            ('DELETE', reverse('get_update_delete_transaction', args=[trx[3].id]), None),
+
+            ('GET', reverse('get_margin_report'), None),
+            ('GET', reverse('get_cogs_report'), None),
+            ('GET', reverse('export_transactions'), None),
+            ('GET', reverse('get_dashboard'), None),
+            ('GET', reverse('kitchen_queue'), None),
+            ('GET', reverse('get_events') + '?since=0', None),
+            ('POST', reverse('update_kitchen_items'), {'transaction_ids': [trx[4].id], 'prep_status': 'served'}),
+            ('GET', reverse('list_profiles'), None),
+        ]
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Query budget checks require PostgreSQL')
+
+        failures = []
+        # Cache transaksi final dimatikan: budget diukur pada kondisi cache miss
+        with override_settings(QUERY_BUDGET_ENFORCE=True, DATABASE_REPLICAS=[], OUTBOX_ENABLED=True,
+                               THROTTLE_ENABLED=False, TRANSACTION_CACHE_SECONDS=0), transaction.atomic():
+            data = self.seed(options)
+            token = KasirGoTokenObtainPairSerializer.get_token(data['owner'])
+            client = Client(HTTP_HOST='kasirgo.vercel.app', HTTP_AUTHORIZATION=f'Bearer {token.access_token}')
+
+            cases = self.cases(data, options)
+            cases.append(('POST', reverse('logout'), {'refresh': str(token)}))
+
+            for method, url, body in cases:
+                label = f'{method} {url}'
+                with CaptureQueriesContext(connection) as queries:
+                    try:
+                        response = client.generic(
+                            method, url, json.dumps(body) if body is not None else '',
+                            content_type='application/json'
+                        )
+                    except QueryBudgetExceeded as e:
+                        failures.append(label)
+                        self.stdout.write(self.style.ERROR(f'FAIL {label}\n     {e}'))
+                        continue
+
+                count = sum(1 for query in queries if not query['sql'].lstrip().upper().startswith(IGNORED_PREFIXES))
+                if response.status_code >= 500:
+                    failures.append(label)
+                    self.stdout.write(self.style.ERROR(f'FAIL {label} -> {response.status_code}'))
+                else:
+                    self.stdout.write(self.style.SUCCESS(f'OK   {label} -> {response.status_code}, {count} queries'))
+
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError(f"{len(failures)} endpoints failed the query budget check: {', '.join(failures)}")
+
+        self.stdout.write(self.style.SUCCESS('All endpoints are within their query budgets.'))
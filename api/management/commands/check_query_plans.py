@@ -0,0 +1,77 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from api.models import Cafe, Product, Transaction, Payment
+from api.utils.dates import filter_created_between
+
+class Command(BaseCommand):
+    # Versi interaktif dari QueryPlanTests (api/tests.py), untuk dicek langsung ke database yang berjalan
+    help = 'Runs EXPLAIN on the hot API queries and fails if any of them needs a sequential scan'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cafe', type=int, help='Cafe id used in the sample queries (default: first cafe)')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print the full plan of every query')
+
+    def hot_queries(self, cafe):
+        today = timezone.localdate()
+        week_ago = (today - timedelta(days=7)).isoformat()
+        transactions = Transaction.objects.filter(cafe=cafe)
+
+        return {
+            # list_transactions (default page, date range, status filter)
+            'transactions: latest page': transactions.order_by('-created_at')[:10],
+            'transactions: date range': filter_created_between(transactions, week_ago, today.isoformat())
+                .order_by('-created_at')[:10],
+            'transactions: status': transactions.filter(status='processing').order_by('-created_at')[:10],
+            # kitchen_queue (partial index status='processing')
+            'transactions: kitchen queue': transactions.filter(status='processing').order_by('created_at')[:200],
+            # Transaction.save() numbering
+            'transactions: numbering': transactions.filter(transaction_number__startswith=f'TRX-{today:%Y%m%d}')
+                .order_by('-transaction_number')[:1],
+            # payment_callback
+            'payments: merchant order id': Payment.objects.filter(merchant_order_id=f'{cafe.id}-TRX-{today:%Y%m%d}-001'),
+            # cleanup_expired_transactions
+            'payments: expiry sweep': Payment.objects.filter(
+                status='pending', expired_at__lt=timezone.now(), transaction__cafe=cafe
+            ),
+            # get_all_products / search_products
+            'products: catalog': Product.objects.filter(cafe=cafe).order_by('name'),
+        }
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Query plan checks require PostgreSQL')
+
+        cafes = Cafe.objects.order_by('id')
+        cafe = cafes.filter(id=options['cafe']).first() if options['cafe'] else cafes.first()
+        if cafe is None:
+            raise CommandError('No cafe found, seed some data first')
+
+        failures = []
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                # Paksa planner memakai index bila ada. Di dataset kecil Postgres lebih memilih
+                # seq scan, jadi seq scan yang tersisa berarti memang tidak ada index yang cocok
+                # (mis. filter tidak sargable).
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+            for name, queryset in self.hot_queries(cafe).items():
+                plan = queryset.explain()
+                ok = 'Seq Scan' not in plan
+                if not ok:
+                    failures.append(name)
+
+                style = self.style.SUCCESS if ok else self.style.ERROR
+                self.stdout.write(style(f"{'OK  ' if ok else 'FAIL'} {name}"))
+                if options['verbose_plans'] or not ok:
+                    self.stdout.write(plan)
+
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError(f"{len(failures)} hot queries use a sequential scan: {', '.join(failures)}")
+
+        self.stdout.write(self.style.SUCCESS('All hot queries use an index.'))
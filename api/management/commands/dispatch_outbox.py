@@ -0,0 +1,92 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.db.models import Count, Min
+
+from api import outbox
+from api.models import OutboxEvent
+
+
+class Command(BaseCommand):
+    help = 'Sends committed outbox rows to Firebase Realtime Database as coalesced per-cafe multi-path updates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sink', choices=['firebase', 'fake'], default='firebase',
+                            help='firebase = FIREBASE_DATABASE_URL, fake = in-memory tree for local testing (default: firebase)')
+        parser.add_argument('--once', action='store_true', help='Dispatch until the outbox is drained, then exit (cron)')
+        parser.add_argument('--interval', type=float, default=1.0, help='Idle sleep between rounds in seconds (default: 1)')
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Max rows coalesced into one update per cafe (default: OUTBOX_BATCH_SIZE)')
+        parser.add_argument('--fail-rate', type=float, default=0.0, help='Fake sink: fraction of updates that fail (default: 0)')
+        parser.add_argument('--latency-ms', type=float, default=0.0, help='Fake sink: latency per update (default: 0)')
+        parser.add_argument('--dump', help='Fake sink: write the resulting tree to this JSON file after every update')
+        parser.add_argument('--status', action='store_true', help='Print pending/failed outbox counts and exit')
+        parser.add_argument('--retry-failed', action='store_true',
+                            help='Requeue rows that gave up after OUTBOX_MAX_ATTEMPTS, then exit')
+
+    def build_sink(self, options):
+        if options['sink'] == 'fake':
+            return outbox.FakeSink(
+                fail_rate=options['fail_rate'], latency=options['latency_ms'] / 1000, dump_path=options['dump']
+            )
+        try:
+            return outbox.FirebaseSink(settings.FIREBASE_DATABASE_URL)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+    def status(self):
+        pending = OutboxEvent.objects.filter(dispatched_at__isnull=True, failed_at__isnull=True)
+        summary = pending.aggregate(rows=Count('id'), cafes=Count('cafe_id', distinct=True), oldest=Min('created_at'))
+        retrying = pending.filter(attempts__gt=0).values('cafe_id').annotate(rows=Count('id'), attempts=Min('attempts'))
+        self.stdout.write(f"pending rows={summary['rows']} cafes={summary['cafes']} oldest={summary['oldest']}")
+        for row in retrying.order_by('cafe_id'):
+            self.stdout.write(self.style.WARNING(
+                f"cafe {row['cafe_id']}: {row['rows']} rows retrying (attempt >= {row['attempts']})"
+            ))
+        failed = OutboxEvent.objects.filter(dispatched_at__isnull=True, failed_at__isnull=False)
+        for row in failed.values('cafe_id').annotate(rows=Count('id')).order_by('cafe_id'):
+            self.stdout.write(self.style.ERROR(
+                f"cafe {row['cafe_id']}: {row['rows']} rows failed (requeue with --retry-failed)"
+            ))
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('The outbox dispatcher requires PostgreSQL (advisory locks)')
+        if options['status']:
+            return self.status()
+        if options['retry_failed']:
+            self.stdout.write(self.style.SUCCESS(f'Requeued {outbox.retry_failed()} failed outbox rows'))
+            return
+
+        sink = self.build_sink(options)
+        sent_total = 0
+        last_purge = 0.0
+        self.stdout.write(self.style.SUCCESS(f"Dispatching outbox to {options['sink']} sink"))
+
+        try:
+            while True:
+                close_old_connections()
+                sent, cafes = outbox.dispatch_pending(sink, options['batch_size'])
+                sent_total += sent
+                if sent:
+                    self.stdout.write(f'sent {sent} rows for {cafes} cafes (total {sent_total})')
+
+                if time.monotonic() - last_purge > 600:
+                    purged = outbox.purge_dispatched()
+                    if purged:
+                        self.stdout.write(f'purged {purged} dispatched rows')
+                    last_purge = time.monotonic()
+
+                if not sent:
+                    # Sisa baris hanya yang menunggu retry (atau kosong)
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f'Dispatched {sent_total} outbox rows'))
+        if isinstance(sink, outbox.FakeSink):
+            self.stdout.write(f'fake sink: {sink.calls} updates, {sink.failures} failed, {sink.paths} paths written')
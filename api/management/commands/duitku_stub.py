@@ -0,0 +1,63 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.utils.duitku_stub import DuitkuStub
+
+
+def add_stub_arguments(parser):
+    parser.add_argument('--stub-host', default='127.0.0.1', help='Stub bind address (default: 127.0.0.1)')
+    parser.add_argument('--stub-port', type=int, default=8765, help='Stub port (default: 8765)')
+    parser.add_argument('--latency-ms', type=float, default=50, help='Gateway response latency (default: 50)')
+    parser.add_argument('--jitter-ms', type=float, default=20, help='Random +/- latency jitter (default: 20)')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='Fraction of inquiries answered with HTTP 400/500 (default: 0)')
+    parser.add_argument('--fail-rate', type=float, default=0.0,
+                        help='Fraction of payments that end as failed (resultCode 02) (default: 0)')
+    parser.add_argument('--drop-callback-rate', type=float, default=0.0,
+                        help='Fraction of callbacks never delivered; only polling sees the result (default: 0)')
+    parser.add_argument('--callback-delay-ms', type=float, default=1500,
+                        help='Time between inquiry and callback, i.e. customer pays (default: 1500)')
+    parser.add_argument('--callback-jitter-ms', type=float, default=500, help='Random +/- callback jitter (default: 500)')
+
+
+def build_stub(options, callback_url):
+    return DuitkuStub(
+        callback_url=callback_url,
+        merchant_code=settings.DUITKU_MERCHANT_CODE,
+        api_key=settings.DUITKU_API_KEY,
+        host=options['stub_host'],
+        port=options['stub_port'],
+        latency_ms=options['latency_ms'],
+        jitter_ms=options['jitter_ms'],
+        error_rate=options['error_rate'],
+        fail_rate=options['fail_rate'],
+        drop_callback_rate=options['drop_callback_rate'],
+        callback_delay_ms=options['callback_delay_ms'],
+        callback_jitter_ms=options['callback_jitter_ms'],
+    )
+
+
+class Command(BaseCommand):
+    help = 'Runs a local Duitku stand-in (inquiry, transactionStatus, callbacks) for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--callback-url', default='http://127.0.0.1:8000/api/payment/callback/',
+                            help='Where to deliver payment callbacks (default: local runserver)')
+        add_stub_arguments(parser)
+
+    def handle(self, *args, **options):
+        stub = build_stub(options, options['callback_url'])
+        url = stub.start()
+        self.stdout.write(self.style.SUCCESS(f'Duitku stub listening on {url}'))
+        self.stdout.write(f'Start the app with DUITKU_BASE_URL={url} to route payments here. Ctrl+C to stop.')
+
+        try:
+            while True:
+                time.sleep(10)
+                self.stdout.write(' '.join(f'{key}={value}' for key, value in stub.stats.items()))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            stub.stop()
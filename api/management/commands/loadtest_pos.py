@@ -0,0 +1,368 @@
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.models import Count, Max, Sum
+from django.urls import reverse
+
+from api.management.commands.duitku_stub import add_stub_arguments, build_stub
+from api.models import Cafe, Product, Transaction, TransactionItem, User
+from api.utils.bench import percentile, save_results, summarize
+
+LOCK_WAITS_SQL = """
+    SELECT count(*) FROM pg_stat_activity
+    WHERE datname = current_database() AND wait_event_type = 'Lock'
+"""
+DEADLOCKS_SQL = 'SELECT deadlocks FROM pg_stat_database WHERE datname = current_database()'
+
+
+class Terminal(threading.Thread):
+    """Satu mesin kasir: login, ambil katalog, checkout, lalu tunggu pembayaran non-tunai."""
+
+    def __init__(self, harness, cafe_id, username, seed):
+        super().__init__(daemon=True)
+        self.harness = harness
+        self.cafe_id = cafe_id
+        self.username = username
+        self.rng = random.Random(seed)
+        self.catalog = []
+
+    def call(self, name, method, path, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = self.client.request(method, path, **kwargs)
+        except Exception as e:
+            self.harness.record(name, time.perf_counter() - start, f'error: {type(e).__name__}')
+            return None
+        self.harness.record(name, time.perf_counter() - start, response.status_code, response)
+        return response
+
+    def run(self):
+        import httpx
+
+        options = self.harness.options
+        with httpx.Client(base_url=options['base_url'], timeout=60) as self.client:
+            response = self.call('login', 'POST', reverse('token_obtain_pair'),
+                                 json={'username': self.username, 'password': options['password']})
+            if response is None or response.status_code != 200:
+                return
+            self.client.headers['Authorization'] = f"Bearer {response.json()['access']}"
+
+            for order in range(options['orders']):
+                if order % options['catalog_every'] == 0:
+                    self.refresh_catalog()
+                if not self.catalog:
+                    return
+                self.checkout()
+                time.sleep(self.rng.uniform(0, options['think_ms']) / 1000)
+
+    def refresh_catalog(self):
+        response = self.call('catalog', 'GET', reverse('get_all_products'))
+        if response is not None and response.status_code == 200:
+            self.catalog = [product for product in response.json()['data'] if product['is_available']]
+
+    def checkout(self):
+        options = self.harness.options
+        # Produk populer dipesan bersamaan oleh banyak terminal -> contention di baris product
+        hot = self.catalog[:options['hot_products']] or self.catalog
+        picked = {}
+        for _ in range(self.rng.choices([1, 2, 3, 4], [40, 30, 20, 10])[0]):
+            product = self.rng.choice(hot if self.rng.random() < 0.6 else self.catalog)
+            picked[product['id']] = picked.get(product['id'], 0) + 1
+
+        body = {
+            'items': [
+                {'product': product_id, 'product_name': '', 'quantity': quantity, 'price': '0', 'subtotal': '0'}
+                for product_id, quantity in picked.items()
+            ],
+            'subtotal': '0', 'total': '0',
+        }
+        cashless = self.rng.random() < options['cashless_ratio']
+        if cashless:
+            body.update(payment_method='qris', paid_amount='0', payment_method_code='SP')
+        else:
+            body.update(payment_method='cash', paid_amount='1000000')
+
+        name = 'checkout_qris' if cashless else 'checkout_cash'
+        response = self.call(name, 'POST', reverse('create_transaction'), json=body)
+        if response is None or response.status_code != 201:
+            return
+
+        data = response.json()
+        self.harness.sold(data['data']['id'], picked)
+        if cashless and 'payment' in data:
+            self.poll(data['payment']['payment_id'])
+
+    def poll(self, payment_id):
+        options = self.harness.options
+        path = reverse('get_payment_status', args=[payment_id])
+        started = time.perf_counter()
+        polls = 0
+        while time.perf_counter() - started < options['poll_timeout']:
+            time.sleep(options['poll_interval'])
+            polls += 1
+            # Sesekali minta cek realtime ke gateway, seperti tombol "cek status" di POS
+            realtime = polls % options['realtime_every'] == 0
+            response = self.call('payment_status', 'GET', path + ('?realtime=true' if realtime else ''))
+            if response is None or response.status_code != 200:
+                continue
+            payment_status = response.json()['data']['status']
+            if payment_status != 'pending':
+                self.harness.settled(payment_status, time.perf_counter() - started)
+                return
+        self.harness.settled('timeout', time.perf_counter() - started)
+
+
+class LockMonitor(threading.Thread):
+    """Sampling jumlah backend yang menunggu lock selama load test."""
+
+    def __init__(self, interval):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.samples = []
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            with connection.cursor() as cursor:
+                while not self.stopped.is_set():
+                    cursor.execute(LOCK_WAITS_SQL)
+                    self.samples.append(cursor.fetchone()[0])
+                    self.stopped.wait(self.interval)
+        finally:
+            connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Simulates concurrent POS terminals across cafes against a running server and a local Duitku stub'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000', help='Running app under test')
+        parser.add_argument('--cafes', default='3',
+                            help='Number of cafes (latest seeded first) or comma separated cafe ids (default: 3)')
+        parser.add_argument('--terminals', type=int, default=4, help='Terminals per cafe (default: 4)')
+        parser.add_argument('--orders', type=int, default=25, help='Checkouts per terminal (default: 25)')
+        parser.add_argument('--password', default='password123', help='Password of the seeded staff accounts')
+        parser.add_argument('--cashless-ratio', type=float, default=0.4,
+                            help='Fraction of checkouts paid by QRIS via payment_method_code (default: 0.4)')
+        parser.add_argument('--hot-products', type=int, default=3,
+                            help='Products most carts share, to provoke row contention (default: 3)')
+        parser.add_argument('--catalog-every', type=int, default=10, help='Refresh the catalog every N orders')
+        parser.add_argument('--think-ms', type=float, default=200, help='Max pause between orders (default: 200)')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Payment status poll interval (seconds)')
+        parser.add_argument('--poll-timeout', type=float, default=30, help='Give up waiting for payment after N seconds')
+        parser.add_argument('--realtime-every', type=int, default=3, help='Every Nth poll asks ?realtime=true')
+        parser.add_argument('--external-stub', action='store_true',
+                            help='Do not start the embedded stub (one from `manage.py duitku_stub` is running)')
+        parser.add_argument('--label', default='', help='Suffix for the saved result file')
+        parser.add_argument('--no-save', action='store_true', help='Do not write bench_results/*.json')
+        add_stub_arguments(parser)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('loadtest_pos requires PostgreSQL (lock monitoring uses pg_stat_activity)')
+        self.options = options
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.errors = Counter()
+        self.sold_quantities = Counter()
+        self.transaction_ids = []
+        self.settlements = Counter()
+        self.settle_times = []
+
+        cafes = self.pick_cafes(options['cafes'])
+        cafe_ids = [cafe.id for cafe in cafes]
+        terminals = []
+        for cafe in cafes:
+            staff = list(User.objects.filter(cafe=cafe, is_active=True).order_by('role', 'username')
+                         .values_list('username', flat=True))
+            if not staff:
+                raise CommandError(f'Cafe {cafe.id} has no users; run seed_cafe first')
+            terminals += [
+                Terminal(self, cafe.id, staff[i % len(staff)], seed=f'{cafe.id}-{i}')
+                for i in range(options['terminals'])
+            ]
+
+        # Snapshot sebelum load: stok, transaksi pending lama (bisa di-expire & restore stok), deadlock
+        stock_before = dict(Product.objects.filter(cafe_id__in=cafe_ids).values_list('id', 'stock'))
+        last_id = Transaction.objects.aggregate(last=Max('id'))['last'] or 0
+        pending_before = set(Transaction.objects.filter(cafe_id__in=cafe_ids, status='pending')
+                             .values_list('id', flat=True))
+        with connection.cursor() as cursor:
+            cursor.execute(DEADLOCKS_SQL)
+            deadlocks_before = cursor.fetchone()[0]
+
+        stub = None
+        if not options['external_stub']:
+            stub = build_stub(options, options['base_url'].rstrip('/') + reverse('payment_callback'))
+            url = stub.start()
+            self.stdout.write(f'Duitku stub on {url}; the server must run with DUITKU_BASE_URL={url}')
+
+        self.stdout.write(f"{len(terminals)} terminals across {len(cafes)} cafes -> {options['base_url']}")
+        monitor = LockMonitor(interval=0.1)
+        monitor.start()
+        start = time.perf_counter()
+        for terminal in terminals:
+            terminal.start()
+        for terminal in terminals:
+            terminal.join()
+        elapsed = time.perf_counter() - start
+
+        # Callback terakhir mungkin masih di jalan
+        if stub is not None:
+            time.sleep((options['callback_delay_ms'] + options['callback_jitter_ms']) / 1000 + 1)
+        monitor.stopped.set()
+        monitor.join()
+        if stub is not None:
+            stub.stop()
+
+        with connection.cursor() as cursor:
+            cursor.execute(DEADLOCKS_SQL)
+            deadlocks = cursor.fetchone()[0] - deadlocks_before
+
+        report = {
+            'meta': {
+                'cafes': cafe_ids, 'terminals': len(terminals), 'orders_per_terminal': options['orders'],
+                'cashless_ratio': options['cashless_ratio'], 'elapsed_s': elapsed,
+            },
+            'endpoints': {
+                name: {**summarize(values, elapsed), 'statuses': dict(self.statuses[name])}
+                for name, values in sorted(self.latencies.items())
+            },
+            'payments': {
+                'outcomes': dict(self.settlements),
+                'settle_p50_s': percentile(self.settle_times, 50) if self.settle_times else None,
+            },
+            'contention': {
+                'lock_wait_samples': len(monitor.samples),
+                'lock_wait_max': max(monitor.samples, default=0),
+                'lock_wait_busy_pct': 100 * sum(1 for s in monitor.samples if s) / max(len(monitor.samples), 1),
+                'deadlocks': deadlocks,
+                'duplicate_transaction_numbers': self.duplicate_numbers(cafe_ids, last_id),
+                'stock_drift': self.stock_drift(cafe_ids, stock_before, last_id, pending_before),
+            },
+            'errors': dict(self.errors.most_common(20)),
+            'stub': stub.stats if stub is not None else None,
+        }
+        self.print_report(report)
+
+        if not options['no_save']:
+            self.stdout.write(f"Saved {save_results('loadtest', options['label'], report)}")
+
+    def pick_cafes(self, value):
+        # Satu angka = jumlah cafe (seed terbaru dulu); daftar berkoma = id cafe
+        if value.isdigit():
+            cafes = list(Cafe.objects.annotate(n=Count('products')).filter(n__gt=0).order_by('-id')[:int(value)])
+        else:
+            try:
+                ids = [int(part) for part in value.split(',') if part.strip()]
+            except ValueError:
+                raise CommandError(f'Invalid --cafes value: {value}')
+            cafes = list(Cafe.objects.filter(id__in=ids))
+        if not cafes:
+            raise CommandError('No cafes with products found; run seed_cafe first')
+        return cafes
+
+    def record(self, name, seconds, status_code, response=None):
+        with self.lock:
+            self.latencies[name].append(seconds)
+            self.statuses[name][status_code] += 1
+            if response is None and isinstance(status_code, str):
+                self.errors[f'{name} {status_code}'] += 1
+            elif response is not None and response.status_code >= 400:
+                try:
+                    message = response.json().get('message') or response.json().get('detail')
+                except ValueError:
+                    message = response.text[:80]
+                self.errors[f'{name} {response.status_code}: {message}'] += 1
+
+    def sold(self, transaction_id, quantities):
+        with self.lock:
+            self.transaction_ids.append(transaction_id)
+            self.sold_quantities.update(quantities)
+
+    def settled(self, outcome, seconds):
+        with self.lock:
+            self.settlements[outcome] += 1
+            self.settle_times.append(seconds)
+
+    def duplicate_numbers(self, cafe_ids, last_id):
+        """Nomor transaksi ganda per cafe; tabrakan yang ditolak DB terlihat sebagai error checkout 5xx."""
+        duplicates = (
+            Transaction.objects.filter(cafe_id__in=cafe_ids, id__gt=last_id)
+            .values('cafe_id', 'transaction_number').order_by()
+            .annotate(n=Count('id')).filter(n__gt=1)
+        )
+        rejected = sum(
+            count for name in ('checkout_cash', 'checkout_qris')
+            for status_code, count in self.statuses[name].items()
+            if isinstance(status_code, int) and status_code >= 500
+        )
+        return {'in_database': duplicates.count(), 'checkout_5xx': rejected}
+
+    def stock_drift(self, cafe_ids, stock_before, last_id, pending_before):
+        """
+        Stok akhir vs stok yang seharusnya: stok awal - item transaksi baru yang tidak batal
+        + item transaksi pending lama yang dibatalkan (expired) selama test.
+        """
+        new_items = TransactionItem.objects.filter(
+            transaction__cafe_id__in=cafe_ids, transaction__id__gt=last_id, product__isnull=False
+        ).exclude(transaction__status='cancelled')
+        expired_items = TransactionItem.objects.filter(
+            transaction_id__in=pending_before, transaction__status='cancelled', product__isnull=False
+        )
+        sold = dict(new_items.values('product_id').order_by().annotate(q=Sum('quantity')).values_list('product_id', 'q'))
+        restored = dict(expired_items.values('product_id').order_by().annotate(q=Sum('quantity'))
+                        .values_list('product_id', 'q'))
+
+        drift = {}
+        for product_id, stock in Product.objects.filter(cafe_id__in=cafe_ids).values_list('id', 'stock'):
+            expected = stock_before.get(product_id, stock) - sold.get(product_id, 0) + restored.get(product_id, 0)
+            if stock != expected:
+                drift[product_id] = stock - expected
+        return {
+            'products_drifted': len(drift),
+            'units': sum(drift.values()),
+            'by_product': dict(sorted(drift.items(), key=lambda item: -abs(item[1]))[:10]),
+            'client_sold_units': sum(self.sold_quantities.values()),
+        }
+
+    def print_report(self, report):
+        self.stdout.write(f"\nFinished in {report['meta']['elapsed_s']:.1f}s")
+        for name, result in report['endpoints'].items():
+            statuses = ', '.join(f'{code}: {n}' for code, n in sorted(result['statuses'].items(), key=str))
+            self.stdout.write(
+                f"{name:<15} {result['requests']:6d} req  {result['rps']:7.1f} req/s  "
+                f"p50 {result.get('p50_ms', 0):7.1f} ms  p99 {result.get('p99_ms', 0):7.1f} ms  [{statuses}]"
+            )
+        self.stdout.write(f"payments: {report['payments']['outcomes']}")
+
+        contention = report['contention']
+        drift = contention['stock_drift']
+        duplicates = contention['duplicate_transaction_numbers']
+        self.stdout.write(
+            f"lock waits: max {contention['lock_wait_max']} backends, "
+            f"{contention['lock_wait_busy_pct']:.1f}% of samples; deadlocks: {contention['deadlocks']}"
+        )
+        for error, count in report['errors'].items():
+            self.stdout.write(self.style.WARNING(f'  {count}x {error}'))
+        if report['stub']:
+            self.stdout.write(f"stub: {report['stub']}")
+
+        problems = []
+        if duplicates['in_database'] or duplicates['checkout_5xx']:
+            problems.append(f"duplicate transaction numbers: {duplicates['in_database']} in DB, "
+                            f"{duplicates['checkout_5xx']} checkouts failed with 5xx")
+        if drift['products_drifted']:
+            problems.append(f"stock drift on {drift['products_drifted']} products ({drift['units']:+d} units): "
+                            f"{drift['by_product']}")
+        if contention['deadlocks']:
+            problems.append(f"{contention['deadlocks']} deadlocks")
+        for problem in problems:
+            self.stdout.write(self.style.ERROR(problem))
+        if not problems:
+            self.stdout.write(self.style.SUCCESS('No duplicate numbers, stock drift or deadlocks detected.'))
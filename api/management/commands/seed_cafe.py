@@ -0,0 +1,291 @@
+import json
+import random
+import time
+import uuid
+from datetime import datetime, time as dtime, timedelta, timezone as dt_timezone
+from decimal import ROUND_CEILING, Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from api.models import Cafe, Category, Payment, Product, Transaction, TransactionItem, User
+
+# Menu kafe: (kategori, [(nama, harga, persen modal, butuh dapur)])
+MENU = [
+    ('Kopi', [
+        ('Espresso', 18000, 0.30, True), ('Americano', 22000, 0.30, True),
+        ('Kopi Susu Gula Aren', 25000, 0.38, True), ('Cappuccino', 28000, 0.35, True),
+        ('Caffe Latte', 28000, 0.35, True), ('Vietnam Drip', 24000, 0.32, True),
+        ('Kopi Tubruk', 15000, 0.28, True), ('Mocha', 30000, 0.38, True),
+    ]),
+    ('Non Kopi', [
+        ('Es Teh Manis', 8000, 0.25, True), ('Lemon Tea', 15000, 0.30, True),
+        ('Matcha Latte', 30000, 0.40, True), ('Coklat Panas', 26000, 0.38, True),
+        ('Red Velvet Latte', 28000, 0.40, True), ('Jus Alpukat', 22000, 0.45, True),
+    ]),
+    ('Makanan', [
+        ('Nasi Goreng Kampung', 32000, 0.42, True), ('Mie Goreng Jawa', 30000, 0.40, True),
+        ('Ayam Geprek', 28000, 0.45, True), ('Nasi Ayam Sambal Matah', 35000, 0.45, True),
+        ('Spaghetti Carbonara', 42000, 0.40, True), ('Rice Bowl Teriyaki', 38000, 0.42, True),
+    ]),
+    ('Snack', [
+        ('Kentang Goreng', 22000, 0.35, True), ('Pisang Goreng Keju', 20000, 0.35, True),
+        ('Roti Bakar', 24000, 0.35, True), ('Cireng Rujak', 18000, 0.30, True),
+        ('Croissant', 25000, 0.50, False), ('Cookies', 15000, 0.45, False),
+    ]),
+    ('Botol', [
+        ('Air Mineral', 7000, 0.50, False), ('Kopi Susu 1L', 95000, 0.40, False),
+        ('Teh Botol', 8000, 0.60, False),
+    ]),
+]
+
+# Bobot order per jam (waktu lokal), jam buka 07:00-22:00
+HOUR_WEIGHTS = {
+    7: 4, 8: 7, 9: 6, 10: 5, 11: 7, 12: 10, 13: 9, 14: 6,
+    15: 6, 16: 7, 17: 7, 18: 8, 19: 9, 20: 8, 21: 5,
+}
+# Senin..Minggu
+WEEKDAY_FACTOR = [0.85, 0.85, 0.9, 0.9, 1.05, 1.3, 1.25]
+
+PAYMENT_METHODS = (['cash', 'qris', 'bca va'], [55, 38, 7])
+DUITKU_CODES = {'qris': 'SP', 'bca va': 'BC'}
+TAX_RATE = Decimal('0.11')
+CENT = Decimal('0.01')
+# Domain email akun hasil seed; bench_endpoints hanya mau menulis ke cafe dengan owner di domain ini
+SEED_EMAIL_DOMAIN = 'kasirgo.test'
+
+TRANSACTION_COLUMNS = (
+    'id', 'cafe_id', 'transaction_number', 'cashier_id', 'customer_name', 'order_type',
+    'subtotal', 'tax', 'discount', 'takeaway_charge', 'total', 'payment_method',
+    'paid_amount', 'change_amount', 'status', 'notes', 'stock_restored', 'created_at', 'updated_at',
+)
+ITEM_COLUMNS = (
+    'transaction_id', 'product_id', 'product_name', 'quantity', 'price', 'cost',
+    'subtotal', 'notes', 'needs_preparation', 'prep_status', 'created_at',
+)
+PAYMENT_COLUMNS = (
+    'transaction_id', 'merchant_order_id', 'reference', 'payment_method', 'amount', 'status',
+    'status_code', 'status_message', 'callback_data', 'expired_at', 'paid_at', 'created_at', 'updated_at',
+)
+
+
+class Command(BaseCommand):
+    help = 'Bulk-seeds cafes with a realistic menu, staff and months of transaction history (COPY-based)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cafes', type=int, default=5, help='Cafes to create (default: 5)')
+        parser.add_argument('--staff', type=int, default=4, help='Cashiers per cafe, besides the owner (default: 4)')
+        parser.add_argument('--months', type=int, default=3, help='Months of history per cafe (default: 3)')
+        parser.add_argument('--orders-per-day', type=int, default=200,
+                            help='Average orders per cafe per day (default: 200)')
+        parser.add_argument('--batch-size', type=int, default=20000,
+                            help='Transactions per COPY batch (default: 20000)')
+        parser.add_argument('--password', default='password123', help='Password for every seeded user')
+        parser.add_argument('--seed', type=int, help='Random seed for a reproducible dataset')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('seed_cafe requires PostgreSQL')
+        if connection.Database.__name__ != 'psycopg':
+            raise CommandError('seed_cafe uses COPY and requires psycopg 3')
+
+        from faker import Faker  # dev-only dependency, jangan dimuat saat startup
+
+        self.rng = random.Random(options['seed'])
+        self.fake = Faker('id_ID')
+        if options['seed'] is not None:
+            self.fake.seed_instance(options['seed'])
+        self.customer_names = [self.fake.first_name() for _ in range(500)]
+        self.password = make_password(options['password'])  # hash sekali, dipakai semua user
+        self.batch_size = options['batch_size']
+        self.counts = {'transactions': 0, 'items': 0, 'payments': 0}
+
+        start = time.perf_counter()
+        today = timezone.localdate()
+        first_day = today - timedelta(days=options['months'] * 30)
+
+        for _ in range(options['cafes']):
+            with transaction.atomic():
+                cafe, cashiers, products = self.seed_catalog(options)
+                self.seed_history(cafe, cashiers, products, first_day, today, options['orders_per_day'])
+            self.stdout.write(f'  {cafe.name} (id={cafe.id}) seeded, owner: {cashiers[0].username}')
+
+        with connection.cursor() as cursor:
+            for model in (Transaction, TransactionItem, Payment):
+                cursor.execute(f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
+
+        elapsed = time.perf_counter() - start
+        rows = sum(self.counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {options['cafes']} cafes: {self.counts['transactions']} transactions, "
+            f"{self.counts['items']} items, {self.counts['payments']} payments "
+            f"in {elapsed:.1f}s ({rows / elapsed:.0f} rows/s)"
+        ))
+
+    def seed_catalog(self, options):
+        suffix = uuid.uuid4().hex[:6]
+        cafe = Cafe.objects.create(
+            name=f'Kafe {self.fake.last_name()} {suffix}', address=self.fake.address(),
+            phone=self.fake.phone_number()[:20]
+        )
+
+        users = [User(
+            username=f'owner-{suffix}', email=f'owner-{suffix}@{SEED_EMAIL_DOMAIN}',
+            first_name=self.fake.first_name(), last_name=self.fake.last_name(), password=self.password,
+            role='owner', cafe=cafe
+        )]
+        users += [
+            User(
+                username=f'kasir{i}-{suffix}', email=f'kasir{i}-{suffix}@{SEED_EMAIL_DOMAIN}',
+                first_name=self.fake.first_name(), last_name=self.fake.last_name(),
+                password=self.password, role='staff', cafe=cafe
+            )
+            for i in range(1, options['staff'] + 1)
+        ]
+        User.objects.bulk_create(users)
+
+        categories = Category.objects.bulk_create([Category(cafe=cafe, name=name) for name, _ in MENU])
+        products = []
+        for category, (_, items) in zip(categories, MENU):
+            for name, price, cost_ratio, needs_preparation in items:
+                # Variasi harga antar kafe, dibulatkan ke Rp 500
+                price = Decimal(round(price * self.rng.uniform(0.9, 1.15) / 500) * 500)
+                products.append(Product(
+                    cafe=cafe, category=category, name=name, price=price,
+                    cost=(price * Decimal(str(cost_ratio))).quantize(Decimal('1')), stock=self.rng.randint(500, 5000),
+                    needs_preparation=needs_preparation, sku=f'{category.name[:3].upper()}-{len(products) + 1:03d}'
+                ))
+        Product.objects.bulk_create(products)
+        return cafe, users, products
+
+    def seed_history(self, cafe, cashiers, products, first_day, today, orders_per_day):
+        tz = timezone.get_current_timezone()
+        now = timezone.now()
+        hours, hour_weights = list(HOUR_WEIGHTS), list(HOUR_WEIGHTS.values())
+        # Menu favorit lebih sering dipesan
+        popularity = [self.rng.paretovariate(1.5) for _ in products]
+        sequence = {}  # tanggal (UTC, seperti Transaction.save) -> nomor terakhir
+        batch = []
+
+        day = first_day
+        while day <= today:
+            count = max(0, round(orders_per_day * WEEKDAY_FACTOR[day.weekday()] * self.rng.uniform(0.8, 1.2)))
+            moments = sorted(
+                datetime.combine(day, dtime(self.rng.choices(hours, hour_weights)[0], self.rng.randrange(60),
+                                            self.rng.randrange(60)), tz)
+                for _ in range(count)
+            )
+            for created_at in moments:
+                if created_at > now:
+                    break
+                key = created_at.astimezone(dt_timezone.utc).strftime('%Y%m%d')
+                sequence[key] = sequence.get(key, 0) + 1
+                batch.append(self.build_order(
+                    cafe, cashiers, products, popularity, created_at, f'TRX-{key}-{sequence[key]:03d}', now
+                ))
+                if len(batch) >= self.batch_size:
+                    self.flush(batch)
+                    batch = []
+            day += timedelta(days=1)
+
+        if batch:
+            self.flush(batch)
+
+    def build_order(self, cafe, cashiers, products, popularity, created_at, number, now):
+        rng = self.rng
+        picked = rng.choices(products, popularity, k=rng.choices([1, 2, 3, 4, 5], [35, 30, 18, 10, 7])[0])
+        lines = {}
+        for product in picked:
+            lines[product] = lines.get(product, 0) + rng.choices([1, 2, 3], [80, 15, 5])[0]
+
+        items = []
+        subtotal = Decimal('0')
+        for product, quantity in lines.items():
+            line_total = product.price * quantity
+            subtotal += line_total
+            items.append([
+                product.id, product.name, quantity, product.price, product.cost, line_total, None,
+                product.needs_preparation, None, created_at,
+            ])
+
+        tax = (subtotal * TAX_RATE).quantize(CENT)
+        total = subtotal + tax
+        method = rng.choices(*PAYMENT_METHODS)[0]
+        if now - created_at < timedelta(minutes=20):
+            status = rng.choice(['pending', 'processing']) if method != 'cash' else 'processing'
+        elif rng.random() < 0.03:
+            status = 'cancelled'
+        else:
+            status = 'completed'
+
+        # Order yang masih di dapur: sebagian item sudah dimasak
+        for item in items:
+            if status == 'processing':
+                item[8] = rng.choice(['pending', 'cooking', 'served'])
+            else:
+                item[8] = 'pending' if status == 'pending' else 'served'
+
+        if method == 'cash':
+            # Pelanggan membayar dengan pecahan bulat
+            paid = (total / 10000).to_integral_value(rounding=ROUND_CEILING) * 10000
+        else:
+            paid = total if status != 'cancelled' else Decimal('0')
+
+        order = [
+            None, cafe.id, number, rng.choice(cashiers).id,
+            rng.choice(self.customer_names) if rng.random() < 0.4 else None,
+            'take_away' if rng.random() < 0.3 else 'dine_in',
+            subtotal, tax, Decimal('0'), Decimal('0'), total, method, paid, max(paid - total, Decimal('0')),
+            status, None, status == 'cancelled', created_at, created_at + timedelta(minutes=rng.randint(5, 25)),
+        ]
+
+        payment = None
+        if method != 'cash':
+            merchant_order_id = f"{cafe.id}-{number}-{created_at.strftime('%H%M%S')}"
+            expired_at = created_at + timedelta(hours=1)
+            if status == 'pending':
+                payment_status, code, paid_at, callback = 'pending', None, None, None
+            elif status == 'cancelled':
+                payment_status, code, paid_at, callback = 'expired', '02', None, None
+            else:
+                paid_at = created_at + timedelta(seconds=rng.randint(20, 300))
+                payment_status, code = 'success', '00'
+                callback = json.dumps({'merchantOrderId': merchant_order_id, 'resultCode': '00', 'amount': str(int(total))})
+            payment = [
+                merchant_order_id, f'DS{uuid.uuid4().hex[:16].upper()}', DUITKU_CODES[method], int(total),
+                payment_status, code, None, callback, expired_at, paid_at, created_at, paid_at or created_at,
+            ]
+        return order, items, payment
+
+    def flush(self, batch):
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            # Ambil id dari sequence dulu supaya item & payment bisa di-COPY tanpa RETURNING
+            cursor.execute(
+                'SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)',
+                [quote(Transaction._meta.db_table), 'id', len(batch)]
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+
+            raw = cursor.cursor
+            copy_sql = 'COPY {} ({}) FROM STDIN'
+            with raw.copy(copy_sql.format(quote(Transaction._meta.db_table), ', '.join(TRANSACTION_COLUMNS))) as copy:
+                for trx_id, (order, _, _) in zip(ids, batch):
+                    order[0] = trx_id
+                    copy.write_row(order)
+
+            with raw.copy(copy_sql.format(quote(TransactionItem._meta.db_table), ', '.join(ITEM_COLUMNS))) as copy:
+                for trx_id, (_, items, _) in zip(ids, batch):
+                    for item in items:
+                        copy.write_row([trx_id] + item)
+                        self.counts['items'] += 1
+
+            with raw.copy(copy_sql.format(quote(Payment._meta.db_table), ', '.join(PAYMENT_COLUMNS))) as copy:
+                for trx_id, (_, _, payment) in zip(ids, batch):
+                    if payment is not None:
+                        copy.write_row([trx_id] + payment)
+                        self.counts['payments'] += 1
+
+        self.counts['transactions'] += len(batch)
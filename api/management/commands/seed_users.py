@@ -1,14 +1,14 @@
 from django.core.management.base import BaseCommand
-from faker import Faker
 from api.models import User  # sesuaikan dengan app kamu
 from django.contrib.auth.hashers import make_password
 
-fake = Faker()
-
 class Command(BaseCommand):
     help = "Seeding fake users"
 
     def handle(self, *args, **kwargs):
+        from faker import Faker  # dev-only dependency, jangan dimuat saat startup
+
+        fake = Faker()
         for _ in range(5):
             User.objects.create(
                 first_name=fake.first_name(),
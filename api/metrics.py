@@ -0,0 +1,246 @@
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.utils.functional import SimpleLazyObject, empty
+
+# Metrics in-process (per worker) dalam format teks Prometheus, tanpa dependensi tambahan.
+# Biaya per request: beberapa perf_counter + satu lock; per query: satu ContextVar.get.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+# Statistik request yang sedang berjalan; ikut ter-copy ke thread sync_to_async
+_current = contextvars.ContextVar('metrics_request', default=None)
+_lock = threading.Lock()
+
+
+class Histogram:
+  __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+  def __init__(self, buckets):
+    self.buckets = buckets
+    self.counts = [0] * (len(buckets) + 1)
+    self.sum = 0
+    self.count = 0
+
+  def observe(self, value):
+    self.counts[bisect_left(self.buckets, value)] += 1
+    self.sum += value
+    self.count += 1
+
+  def render(self, name, labels):
+    lines = []
+    cumulative = 0
+    for bound, count in zip(self.buckets, self.counts):
+      cumulative += count
+      lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+    lines.append(f'{name}_sum{{{labels}}} {self.sum}')
+    lines.append(f'{name}_count{{{labels}}} {self.count}')
+    return lines
+
+
+class ViewStats:
+  __slots__ = ('latency', 'queries', 'size', 'sql_seconds', 'statuses')
+
+  def __init__(self):
+    self.latency = Histogram(LATENCY_BUCKETS)
+    self.queries = Histogram(QUERY_BUCKETS)
+    self.size = Histogram(SIZE_BUCKETS)
+    self.sql_seconds = 0.0
+    self.statuses = {}
+
+
+class RequestStats:
+  __slots__ = ('queries', 'sql_seconds')
+
+  def __init__(self):
+    self.queries = 0
+    self.sql_seconds = 0.0
+
+
+_views = {}     # (view, method) -> ViewStats
+_outbound = {}  # (service, endpoint) -> [Histogram, errors]
+_cafes = {}     # cafe_id -> [requests, seconds]
+
+
+def _time_query(execute, sql, params, many, context):
+  stats = _current.get()
+  if stats is None:
+    return execute(sql, params, many, context)
+
+  start = time.perf_counter()
+  try:
+    return execute(sql, params, many, context)
+  finally:
+    stats.queries += 1
+    stats.sql_seconds += time.perf_counter() - start
+
+
+def _install_query_timer(sender, connection, **kwargs):
+  # Sekali per DatabaseWrapper; wrapper yang sama dipakai lagi setelah reconnect
+  if _time_query not in connection.execute_wrappers:
+    connection.execute_wrappers.append(_time_query)
+
+connection_created.connect(_install_query_timer, dispatch_uid='api.metrics.query_timer')
+
+
+def observe_outbound(service, endpoint, seconds, error=False):
+  """Catat durasi panggilan HTTP keluar (mis. Duitku)."""
+  with _lock:
+    entry = _outbound.get((service, endpoint))
+    if entry is None:
+      entry = _outbound[(service, endpoint)] = [Histogram(LATENCY_BUCKETS), 0]
+    entry[0].observe(seconds)
+    if error:
+      entry[1] += 1
+
+
+def _record(request, response, stats, seconds):
+  match = getattr(request, 'resolver_match', None)
+  view = match.url_name if match and match.url_name else 'unresolved'
+  size = len(response.content) if not response.streaming else 0
+  status_class = f'{response.status_code // 100}xx'
+
+  cafe_id = None
+  # Jangan memicu load user dari session hanya demi label metrics
+  user = request.__dict__.get('user')
+  if user is not None and not (isinstance(user, SimpleLazyObject) and user._wrapped is empty):
+    cafe_id = getattr(user, 'cafe_id', None)
+
+  with _lock:
+    entry = _views.get((view, request.method))
+    if entry is None:
+      entry = _views[(view, request.method)] = ViewStats()
+    entry.latency.observe(seconds)
+    entry.queries.observe(stats.queries)
+    entry.size.observe(size)
+    entry.sql_seconds += stats.sql_seconds
+    entry.statuses[status_class] = entry.statuses.get(status_class, 0) + 1
+
+    if cafe_id is not None:
+      cafe = _cafes.get(cafe_id)
+      if cafe is None:
+        cafe = _cafes[cafe_id] = [0, 0.0]
+      cafe[0] += 1
+      cafe[1] += seconds
+
+
+def _label(value):
+  return str(value).replace('\\', '\\\\').replace('"', '\\"')
+
+
+def render():
+  """Semua metrics dalam format teks Prometheus (text/plain; version=0.0.4)."""
+  with _lock:
+    lines = [
+      '# HELP kasirgo_http_request_duration_seconds Request latency per URL name.',
+      '# TYPE kasirgo_http_request_duration_seconds histogram',
+    ]
+    for (view, method), entry in sorted(_views.items()):
+      lines += entry.latency.render('kasirgo_http_request_duration_seconds', f'view="{view}",method="{method}"')
+
+    lines += [
+      '# HELP kasirgo_http_requests_total Requests per URL name and status class.',
+      '# TYPE kasirgo_http_requests_total counter',
+    ]
+    for (view, method), entry in sorted(_views.items()):
+      for status_class, count in sorted(entry.statuses.items()):
+        lines.append(f'kasirgo_http_requests_total{{view="{view}",method="{method}",status="{status_class}"}} {count}')
+
+    lines += [
+      '# HELP kasirgo_db_queries_per_request SQL queries executed per request.',
+      '# TYPE kasirgo_db_queries_per_request histogram',
+    ]
+    for (view, method), entry in sorted(_views.items()):
+      lines += entry.queries.render('kasirgo_db_queries_per_request', f'view="{view}",method="{method}"')
+
+    lines += [
+      '# HELP kasirgo_db_query_seconds_total Time spent in SQL per URL name.',
+      '# TYPE kasirgo_db_query_seconds_total counter',
+    ]
+    for (view, method), entry in sorted(_views.items()):
+      lines.append(f'kasirgo_db_query_seconds_total{{view="{view}",method="{method}"}} {entry.sql_seconds}')
+
+    lines += [
+      '# HELP kasirgo_http_response_size_bytes Response body size per URL name.',
+      '# TYPE kasirgo_http_response_size_bytes histogram',
+    ]
+    for (view, method), entry in sorted(_views.items()):
+      lines += entry.size.render('kasirgo_http_response_size_bytes', f'view="{view}",method="{method}"')
+
+    lines += [
+      '# HELP kasirgo_outbound_request_duration_seconds Outbound HTTP latency (payment gateway, etc).',
+      '# TYPE kasirgo_outbound_request_duration_seconds histogram',
+    ]
+    for (service, endpoint), (histogram, _) in sorted(_outbound.items()):
+      lines += histogram.render('kasirgo_outbound_request_duration_seconds', f'service="{service}",endpoint="{_label(endpoint)}"')
+
+    lines += [
+      '# HELP kasirgo_outbound_errors_total Outbound HTTP calls that failed (timeout, connection).',
+      '# TYPE kasirgo_outbound_errors_total counter',
+    ]
+    for (service, endpoint), (_, errors) in sorted(_outbound.items()):
+      lines.append(f'kasirgo_outbound_errors_total{{service="{service}",endpoint="{_label(endpoint)}"}} {errors}')
+
+    # cafe_id sebagai label hanya untuk top-N tenant supaya cardinality tetap kecil
+    top_n = settings.METRICS_TOP_CAFES
+    if top_n:
+      top = sorted(_cafes.items(), key=lambda item: item[1][0], reverse=True)[:top_n]
+      lines += [
+        '# HELP kasirgo_cafe_requests_total Requests of the busiest cafes.',
+        '# TYPE kasirgo_cafe_requests_total counter',
+      ]
+      lines += [f'kasirgo_cafe_requests_total{{cafe_id="{cafe_id}"}} {count}' for cafe_id, (count, _) in top]
+      lines += [
+        '# HELP kasirgo_cafe_request_seconds_total Request time of the busiest cafes.',
+        '# TYPE kasirgo_cafe_request_seconds_total counter',
+      ]
+      lines += [f'kasirgo_cafe_request_seconds_total{{cafe_id="{cafe_id}"}} {seconds}' for cafe_id, (_, seconds) in top]
+
+  return '\n'.join(lines) + '\n'
+
+
+class MetricsMiddleware:
+  """
+  Latency, jumlah & waktu SQL, dan ukuran response per url_name.
+  Pasang paling atas di MIDDLEWARE supaya seluruh request ikut terukur.
+  """
+  sync_capable = True
+  async_capable = True
+
+  def __init__(self, get_response):
+    self.get_response = get_response
+    if iscoroutinefunction(get_response):
+      markcoroutinefunction(self)
+
+  def __call__(self, request):
+    if iscoroutinefunction(self):
+      return self.__acall__(request)
+
+    stats = RequestStats()
+    token = _current.set(stats)
+    start = time.perf_counter()
+    try:
+      response = self.get_response(request)
+    finally:
+      _current.reset(token)
+    _record(request, response, stats, time.perf_counter() - start)
+    return response
+
+  async def __acall__(self, request):
+    stats = RequestStats()
+    token = _current.set(stats)
+    start = time.perf_counter()
+    try:
+      response = await self.get_response(request)
+    finally:
+      _current.reset(token)
+    _record(request, response, stats, time.perf_counter() - start)
+    return response
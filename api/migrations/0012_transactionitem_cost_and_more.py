@@ -0,0 +1,22 @@
+# Generated by Django 5.2.9 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_alter_category_cafe_alter_product_cafe_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transactionitem',
+            name='cost',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['cafe', 'status', 'created_at'], name='trx_cafe_status_created_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.9 on 2026-10-19 10:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_transactionitem_cost_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransactionArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateField()),
+                ('transaction_count', models.IntegerField(default=0)),
+                ('item_count', models.IntegerField(default=0)),
+                ('total_sales', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('data', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('cafe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transaction_archives', to='api.cafe')),
+            ],
+            options={
+                'db_table': 'transaction_archive',
+                'ordering': ['-period'],
+                'unique_together': {('cafe', 'period')},
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.9 on 2026-10-19 11:20
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY tidak boleh berjalan di dalam transaksi
+    atomic = False
+
+    dependencies = [
+        ('api', '0013_transactionarchive'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='product',
+            index=models.Index(fields=['cafe', 'name'], name='product_cafe_name_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='transaction',
+            index=models.Index(fields=['cafe', '-created_at'], name='trx_cafe_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='payment',
+            index=models.Index(fields=['merchant_order_id'], name='payment_merchant_order_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='payment',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['expired_at'], name='payment_pending_expiry_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.9 on 2026-10-19 13:05
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY tidak boleh berjalan di dalam transaksi
+    atomic = False
+
+    dependencies = [
+        ('api', '0014_hot_path_indexes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('status', 'processing')), fields=['cafe', 'created_at'], include=('updated_at',), name='trx_kitchen_queue_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.9 on 2026-10-19 13:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_kitchen_queue_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transactionitem',
+            name='needs_preparation',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='transactionitem',
+            name='prep_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('cooking', 'Cooking'), ('served', 'Served')], default='pending', max_length=20),
+        ),
+        # Backfill: snapshot dari produk saat ini, dan item order yang sudah selesai/batal dianggap served
+        migrations.RunSQL(
+            sql="""
+                UPDATE transaction_item AS ti
+                SET needs_preparation = p.needs_preparation
+                FROM product AS p
+                WHERE ti.product_id = p.id AND ti.needs_preparation <> p.needs_preparation;
+
+                UPDATE transaction_item AS ti
+                SET prep_status = 'served'
+                FROM "transaction" AS t
+                WHERE ti.transaction_id = t.id AND t.status IN ('completed', 'cancelled');
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.9 on 2026-10-19 15:12
+
+import django.core.serializers.json
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_transactionitem_prep_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('updates', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('dispatched_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('cafe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='outbox_events', to='api.cafe')),
+            ],
+            options={
+                'db_table': 'outbox_event',
+                'indexes': [models.Index(condition=models.Q(('dispatched_at__isnull', True)), fields=['cafe', 'id'], name='outbox_pending_idx'), models.Index(condition=models.Q(('dispatched_at__isnull', False)), fields=['dispatched_at'], name='outbox_dispatched_idx')],
+            },
+        ),
+    ]
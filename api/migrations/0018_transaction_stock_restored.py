@@ -0,0 +1,25 @@
+# Generated by Django 5.2.9 on 2026-10-19 17:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_outboxevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='stock_restored',
+            field=models.BooleanField(default=False),
+        ),
+        # Backfill: transaksi yang sudah batal stoknya sudah dikembalikan oleh alur lama
+        migrations.RunSQL(
+            sql="""
+                UPDATE "transaction" SET stock_restored = TRUE WHERE status = 'cancelled';
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
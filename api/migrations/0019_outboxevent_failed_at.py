@@ -0,0 +1,26 @@
+# Generated by Django 5.2.9 on 2026-10-19 18:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_transaction_stock_restored'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxevent',
+            name='failed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RemoveIndex(
+            model_name='outboxevent',
+            name='outbox_pending_idx',
+        ),
+        migrations.AddIndex(
+            model_name='outboxevent',
+            index=models.Index(condition=models.Q(('dispatched_at__isnull', True), ('failed_at__isnull', True)), fields=['cafe', 'id'], name='outbox_pending_idx'),
+        ),
+    ]
@@ -1,8 +1,11 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 import uuid
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
 
+from api.stock import restore_stock
+
 
 class Cafe(models.Model):
     """Entitas Bisnis / Tenant (Toko)"""
@@ -79,6 +82,9 @@ class Product(models.Model):
         db_table = "product"
         ordering = ['name']
         unique_together = [['cafe', 'sku']] # SKU unique per cafe
+        indexes = [
+            models.Index(fields=['cafe', 'name'], name='product_cafe_name_idx'), # Katalog per cafe
+        ]
 
     def save(self, *args, **kwargs):
         # Auto-update status based on stock
@@ -131,6 +137,7 @@ class Transaction(models.Model):
     
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     notes = models.TextField(blank=True, null=True)
+    stock_restored = models.BooleanField(default=False) # Stok item sudah dikembalikan (batal/expired/void), lihat api/stock.py
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -139,6 +146,12 @@ class Transaction(models.Model):
         db_table = "transaction"
         ordering = ['-created_at']
         unique_together = [['cafe', 'transaction_number']] # Transaction Number unique per cafe
+        indexes = [
+            models.Index(fields=['cafe', 'status', 'created_at'], name='trx_cafe_status_created_idx'), # Reports
+            models.Index(fields=['cafe', '-created_at'], name='trx_cafe_created_idx'), # Riwayat transaksi
+            models.Index(fields=['cafe', 'created_at'], include=['updated_at'], condition=models.Q(status='processing'),
+                         name='trx_kitchen_queue_idx'), # Antrian dapur + versi (index-only)
+        ]
 
     def save(self, *args, **kwargs):
         if not self.transaction_number:
@@ -146,8 +159,8 @@ class Transaction(models.Model):
             today = timezone.now().strftime('%Y%m%d')
             # Filter by Cafe for numbering continuity per tenant
             query = Transaction.objects.filter(transaction_number__startswith=f'TRX-{today}')
-            if self.cafe:
-                query = query.filter(cafe=self.cafe)
+            if self.cafe_id:
+                query = query.filter(cafe_id=self.cafe_id)
                 
             last_transaction = query.order_by('-transaction_number').first()
             
@@ -162,18 +175,20 @@ class Transaction(models.Model):
                 new_number = 1
             
             self.transaction_number = f'TRX-{today}-{new_number:03d}'
-        
+
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            # stock_restored hanya ditulis restore_stock() (klaim atomic di SQL). save() penuh dari instance
+            # yang dibaca sebelum klaim itu tidak boleh mengembalikannya ke False (stok kembali dua kali).
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'stock_restored'
+            ]
         super().save(*args, **kwargs)
 
     def delete(self, *args, **kwargs):
-        # Restore stock before deleting
-        for item in self.items.all():
-            if item.product:
-                product = item.product
-                product.stock += item.quantity
-                product.save()
-        
-        super().delete(*args, **kwargs)
+        # Restore stock before deleting (sekali saja: transaksi batal stoknya sudah kembali)
+        self.restored_products = restore_stock([self.id]) # Untuk outbox (stok terbaru)
+        return super().delete(*args, **kwargs)
 
     def __str__(self):
         return f"{self.transaction_number} - Rp {self.total}"
@@ -181,13 +196,22 @@ class Transaction(models.Model):
 
 class TransactionItem(models.Model):
     """Detail item dalam transaksi"""
+    PREP_STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('cooking', 'Cooking'),
+        ('served', 'Served'),
+    ]
+
     transaction = models.ForeignKey(Transaction, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True)
     product_name = models.CharField(max_length=200)  # Simpan nama untuk history
     quantity = models.IntegerField(default=1)
     price = models.DecimalField(max_digits=10, decimal_places=2)  # Harga saat transaksi
+    cost = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)  # Harga modal saat transaksi (NULL = belum di-backfill)
     subtotal = models.DecimalField(max_digits=10, decimal_places=2)
     notes = models.TextField(blank=True, null=True)  # Catatan khusus item
+    needs_preparation = models.BooleanField(default=True)  # Snapshot product.needs_preparation saat transaksi
+    prep_status = models.CharField(max_length=20, choices=PREP_STATUS_CHOICES, default='pending')  # Progres dapur per item
     created_at = models.DateTimeField(auto_now_add=True)
 
     def save(self, *args, **kwargs):
@@ -231,6 +255,54 @@ class Payment(models.Model):
     class Meta:
         db_table = "payment"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['merchant_order_id'], name='payment_merchant_order_idx'), # Callback Duitku
+            models.Index(fields=['expired_at'], condition=models.Q(status='pending'), name='payment_pending_expiry_idx'), # Sweep expired
+        ]
+
+    def __str__(self):
+        return f"{self.merchant_order_id} - {self.status}"
+
+class TransactionArchive(models.Model):
+    """Arsip transaksi bulanan per cafe (cold storage, gzip JSON)"""
+    cafe = models.ForeignKey(Cafe, on_delete=models.CASCADE, related_name='transaction_archives')
+    period = models.DateField()  # Tanggal 1 bulan yang diarsip (waktu lokal)
+    transaction_count = models.IntegerField(default=0)
+    item_count = models.IntegerField(default=0)
+    total_sales = models.DecimalField(max_digits=14, decimal_places=2, default=0)  # Total transaksi terbayar
+    data = models.BinaryField()  # gzip(JSON) transaksi + items + payments
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "transaction_archive"
+        ordering = ['-period']
+        unique_together = [['cafe', 'period']]
+
+    def __str__(self):
+        return f"{self.cafe_id} - {self.period:%Y-%m} ({self.transaction_count} trx)"
+
+
+class OutboxEvent(models.Model):
+    """Update Firebase RTDB yang menunggu dikirim (transactional outbox, lihat api/outbox.py)"""
+    cafe = models.ForeignKey(Cafe, on_delete=models.CASCADE, related_name='outbox_events')
+    updates = models.JSONField(encoder=DjangoJSONEncoder)  # {path relatif cafes/<cafe_id>/: value}
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)  # Retry berikutnya (backoff)
+    last_error = models.TextField(blank=True, default='')
+    dispatched_at = models.DateTimeField(blank=True, null=True)
+    failed_at = models.DateTimeField(blank=True, null=True)  # Dead letter: gagal OUTBOX_MAX_ATTEMPTS kali, tidak dikirim lagi
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "outbox_event"
+        indexes = [
+            models.Index(fields=['cafe', 'id'],
+                         condition=models.Q(dispatched_at__isnull=True, failed_at__isnull=True),
+                         name='outbox_pending_idx'), # Dispatcher: antrian per cafe
+            models.Index(fields=['dispatched_at'], condition=models.Q(dispatched_at__isnull=False),
+                         name='outbox_dispatched_idx'), # Purge
+        ]
 
     def __str__(self):
-        return f"{self.merchant_order_id} - {self.status}"
\ No newline at end of file
+        state = 'sent' if self.dispatched_at else 'failed' if self.failed_at else 'pending'
+        return f"{self.cafe_id} - #{self.id} ({state})"
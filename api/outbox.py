@@ -0,0 +1,270 @@
+import json
+import logging
+import random
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Min
+from django.utils import timezone
+
+from api.models import OutboxEvent
+
+# Transactional outbox ke Firebase Realtime Database.
+# enqueue() menulis satu baris OutboxEvent di transaksi DB yang sama dengan checkout / callback / pembatalan,
+# jadi perubahan yang sudah commit pasti terkirim walau request mati setelah commit.
+# `python manage.py dispatch_outbox` mengirim baris tersebut sebagai satu multi-path update per cafe
+# (berurutan per cafe, retry dengan backoff). Perangkat listen ke cafes/<cafe_id>/ tanpa polling API.
+#
+# Path relatif terhadap cafes/<cafe_id>/:
+#   orders/<transaction_id>   {transaction_number, status, total, updated_at}
+#   payments/<payment_id>     {transaction_id, status, paid_at}
+#   stock/<product_id>        {stock, is_available}
+
+logger = logging.getLogger(__name__)
+
+# Kunci advisory lock Postgres (pg_try_advisory_xact_lock(ADVISORY_LOCK_CLASS, cafe_id)):
+# satu dispatcher per cafe, sehingga urutan kirim sama dengan urutan id
+ADVISORY_LOCK_CLASS = 0x0B0C
+
+
+def order_update(trx, status=None):
+  return {f'orders/{trx.id}': {
+    'transaction_number': trx.transaction_number,
+    'status': status or trx.status,
+    'total': trx.total,
+    'updated_at': timezone.now(),
+  }}
+
+
+def order_status(transaction_id, status):
+  """Update sebagian; dipakai bila objek transaksi tidak dimuat (mis. update massal)."""
+  return {
+    f'orders/{transaction_id}/status': status,
+    f'orders/{transaction_id}/updated_at': timezone.now(),
+  }
+
+
+def order_removed(transaction_id):
+  return {f'orders/{transaction_id}': None}
+
+
+def payment_update(payment_id, transaction_id, status, paid_at=None):
+  return {f'payments/{payment_id}': {'transaction_id': transaction_id, 'status': status, 'paid_at': paid_at}}
+
+
+def stock_updates(products):
+  return {
+    f'stock/{product.id}': {'stock': product.stock, 'is_available': product.is_available}
+    for product in products
+  }
+
+
+def enqueue(cafe_id, *updates):
+  """
+  Gabungkan beberapa dict {path: value} jadi satu baris outbox (satu INSERT).
+  Panggil di dalam transaction.atomic() yang sama dengan perubahan datanya.
+  """
+  if not settings.OUTBOX_ENABLED or cafe_id is None:
+    return None
+  merged = coalesce(updates)
+  if not merged:
+    return None
+  if not connection.in_atomic_block:
+    logger.warning('outbox.enqueue called outside transaction.atomic(); update is not atomic with its data')
+  return OutboxEvent.objects.create(cafe_id=cafe_id, updates=merged)
+
+
+def _merge(merged, path, value):
+  # Path baru menimpa semua turunannya yang sudah ada
+  for existing in [p for p in merged if p.startswith(path + '/')]:
+    del merged[existing]
+
+  # Path baru berada di bawah path yang sudah ada: tulis ke dalam nilai ancestor-nya
+  # (multi-path update Firebase menolak path yang saling ancestor/descendant)
+  parts = path.split('/')
+  for depth in range(len(parts) - 1, 0, -1):
+    ancestor = '/'.join(parts[:depth])
+    if ancestor not in merged:
+      continue
+    node = merged[ancestor] if isinstance(merged[ancestor], dict) else {}
+    merged[ancestor] = node
+    for key in parts[depth:-1]:
+      child = node.get(key)
+      node[key] = child if isinstance(child, dict) else {}
+      node = node[key]
+    if value is None:
+      node.pop(parts[-1], None)
+    else:
+      node[parts[-1]] = value
+    return
+
+  merged[path] = value
+
+
+def coalesce(updates_list):
+  """Urutan update -> satu multi-path update yang hasil akhirnya sama (update belakangan menang)."""
+  merged = {}
+  for updates in updates_list:
+    for path, value in updates.items():
+      _merge(merged, path.strip('/'), value)
+  return merged
+
+
+def _backoff(attempts):
+  return min(settings.OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1), settings.OUTBOX_RETRY_MAX_SECONDS)
+
+
+def dispatch_cafe(sink, cafe_id, batch_size):
+  """
+  Kirim baris pending satu cafe (terlama dulu) sebagai satu update.
+  Return jumlah baris terkirim; 0 bila cafe sedang dipegang dispatcher lain, menunggu retry, atau gagal.
+  Bila commit gagal setelah update terkirim, update dikirim ulang: aman karena isinya state, bukan delta.
+  Setelah OUTBOX_MAX_ATTEMPTS kali gagal, baris-baris itu ditandai failed (lihat retry_failed()) dan
+  antrian cafe berjalan lagi.
+  """
+  with transaction.atomic():
+    with connection.cursor() as cursor:
+      cursor.execute('SELECT pg_try_advisory_xact_lock(%s, %s)', [ADVISORY_LOCK_CLASS, cafe_id])
+      if not cursor.fetchone()[0]:
+        return 0
+
+    rows = list(
+      OutboxEvent.objects.filter(cafe_id=cafe_id, dispatched_at__isnull=True, failed_at__isnull=True)
+      .order_by('id').values('id', 'updates', 'available_at', 'attempts')[:batch_size]
+    )
+    now = timezone.now()
+    # Baris terdepan masih backoff: baris sesudahnya juga ditahan supaya urutan tetap terjaga
+    if not rows or rows[0]['available_at'] > now:
+      return 0
+
+    ids = [row['id'] for row in rows]
+    updates = {
+      f'cafes/{cafe_id}/{path}': value
+      for path, value in coalesce(row['updates'] for row in rows).items()
+    }
+    try:
+      sink.update(updates)
+    except Exception as e:
+      attempts = rows[0]['attempts'] + 1
+      failed = attempts >= settings.OUTBOX_MAX_ATTEMPTS
+      log = logger.error if failed else logger.warning
+      log('Outbox dispatch failed for cafe %s (attempt %s%s): %s', cafe_id, attempts,
+          ', giving up' if failed else '', e)
+      OutboxEvent.objects.filter(id__in=ids).update(
+        attempts=F('attempts') + 1,
+        available_at=now + timedelta(seconds=_backoff(attempts)),
+        last_error=str(e)[:1000],
+        failed_at=now if failed else None,
+      )
+      return 0
+
+    OutboxEvent.objects.filter(id__in=ids).update(dispatched_at=now)
+    return len(ids)
+
+
+def dispatch_pending(sink, batch_size=None, max_cafes=100):
+  """
+  Satu putaran: setiap cafe yang punya baris pending dikirim sekali. Return (terkirim, cafe).
+  Cafe dengan baris pending terlama didahulukan, jadi dengan backlog > max_cafes tidak ada cafe yang tertinggal.
+  """
+  batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+  cafe_ids = [
+    row['cafe_id'] for row in
+    OutboxEvent.objects.filter(dispatched_at__isnull=True, failed_at__isnull=True, available_at__lte=timezone.now())
+    .values('cafe_id').annotate(oldest=Min('id')).order_by('oldest')[:max_cafes]
+  ]
+  sent = sum(dispatch_cafe(sink, cafe_id, batch_size) for cafe_id in cafe_ids)
+  return sent, len(cafe_ids)
+
+
+def retry_failed(cafe_id=None):
+  """Kembalikan baris failed ke antrian (mis. setelah masalah sink diperbaiki). Return jumlah baris."""
+  rows = OutboxEvent.objects.filter(dispatched_at__isnull=True, failed_at__isnull=False)
+  if cafe_id is not None:
+    rows = rows.filter(cafe_id=cafe_id)
+  return rows.update(failed_at=None, attempts=0, available_at=timezone.now())
+
+
+def purge_dispatched(batch_size=5000):
+  """Hapus baris terkirim yang lebih tua dari OUTBOX_RETENTION_HOURS, per batch."""
+  cutoff = timezone.now() - timedelta(hours=settings.OUTBOX_RETENTION_HOURS)
+  deleted = 0
+  while True:
+    ids = list(
+      OutboxEvent.objects.filter(dispatched_at__lt=cutoff).values_list('id', flat=True)[:batch_size]
+    )
+    if not ids:
+      return deleted
+    deleted += OutboxEvent.objects.filter(id__in=ids).delete()[0]
+
+
+class FirebaseSink:
+  """Realtime Database lewat firebase_admin (credentials sama dengan api/utils/firebase_auth.py)."""
+
+  def __init__(self, database_url):
+    if not database_url:
+      raise ValueError('FIREBASE_DATABASE_URL is not set')
+    self.database_url = database_url
+
+  def update(self, updates):
+    from firebase_admin import db
+    from api.utils.firebase_auth import initialize_firebase
+
+    app = initialize_firebase()
+    if app is None:
+      raise RuntimeError('Firebase credentials are not available')
+    db.reference('/', app=app, url=self.database_url).update(updates)
+
+
+class FakeSink:
+  """
+  Pengganti Realtime Database untuk lokal / testing: menerapkan multi-path update ke dict in-memory.
+  fail_rate mensimulasikan kegagalan jaringan (retry), dump_path menulis isi tree ke file JSON.
+  """
+
+  def __init__(self, fail_rate=0.0, latency=0.0, dump_path=None):
+    self.fail_rate = fail_rate
+    self.latency = latency
+    self.dump_path = dump_path
+    self.tree = {}
+    self.calls = 0
+    self.failures = 0
+    self.paths = 0
+    self.lock = threading.Lock()
+
+  def update(self, updates):
+    if self.latency:
+      time.sleep(self.latency)
+    with self.lock:
+      self.calls += 1
+      if self.fail_rate and random.random() < self.fail_rate:
+        self.failures += 1
+        raise ConnectionError('fake sink failure')
+      self.paths += len(updates)
+      for path, value in updates.items():
+        self._set(path.strip('/').split('/'), value)
+      if self.dump_path:
+        with open(self.dump_path, 'w') as f:
+          json.dump(self.tree, f, indent=2, sort_keys=True, default=str)
+
+  def _set(self, parts, value):
+    node = self.tree
+    for key in parts[:-1]:
+      child = node.get(key)
+      node[key] = child if isinstance(child, dict) else {}
+      node = node[key]
+    if value is None:
+      node.pop(parts[-1], None)
+    else:
+      node[parts[-1]] = value
+
+  def get(self, path):
+    node = self.tree
+    for key in path.strip('/').split('/'):
+      if not isinstance(node, dict) or key not in node:
+        return None
+      node = node[key]
+    return node
@@ -0,0 +1,228 @@
+import contextvars
+import cProfile
+import io
+import pstats
+import time
+import uuid
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+
+# Profiling per request untuk superuser: kirim header `X-Profile: 1` (simpan) atau `X-Profile: inline`
+# (profil jadi body response). Hasilnya cProfile, daftar SQL + durasi, dan EXPLAIN ANALYZE query
+# paling lambat, disimpan di ring buffer cache (PROFILING_BUFFER_SIZE) -> GET /api/profiles/.
+# Ring buffer butuh cache bersama (SHARED_CACHE): dengan LocMemCache GET /api/profiles/ hampir selalu dilayani
+# instance lain yang buffer-nya kosong, jadi tanpa CACHE_URL profil tidak disimpan (pakai `X-Profile: inline`).
+# Nilai parameter SQL tidak disimpan, hanya SQL dengan placeholder.
+
+HEADER = 'HTTP_X_PROFILE'
+MAX_STATEMENTS = 300
+CPROFILE_LINES = 40
+
+_CACHE_PREFIX = 'profiling'
+_current = contextvars.ContextVar('profiling_request', default=None)
+
+
+class RequestProfile:
+  __slots__ = ('statements', 'total', 'sql_seconds')
+
+  def __init__(self):
+    self.statements = []  # (seconds, alias, sql, params)
+    self.total = 0
+    self.sql_seconds = 0.0
+
+
+def _record_query(execute, sql, params, many, context):
+  profile = _current.get()
+  if profile is None:
+    return execute(sql, params, many, context)
+
+  start = time.perf_counter()
+  try:
+    return execute(sql, params, many, context)
+  finally:
+    seconds = time.perf_counter() - start
+    profile.total += 1
+    profile.sql_seconds += seconds
+    if len(profile.statements) < MAX_STATEMENTS:
+      profile.statements.append((seconds, context['connection'].alias, sql, None if many else params))
+
+
+def _install(sender, connection, **kwargs):
+  if _record_query not in connection.execute_wrappers:
+    connection.execute_wrappers.append(_record_query)
+
+connection_created.connect(_install, dispatch_uid='api.profiling.recorder')
+
+
+def _start():
+  # Koneksi yang sudah terbuka sebelum modul ini di-import belum punya wrapper
+  for connection in connections.all(initialized_only=True):
+    _install(None, connection)
+  recorded = RequestProfile()
+  return recorded, _current.set(recorded)
+
+
+def _profiling_user(request):
+  """User superuser dari JWT request, atau None. Header dari user lain diabaikan diam-diam."""
+  from rest_framework.exceptions import APIException
+  from api.authentication import StatelessJWTAuthentication
+
+  try:
+    result = StatelessJWTAuthentication().authenticate(request)
+  except APIException:
+    return None
+  user = result[0] if result else None
+  return user if user is not None and user.is_superuser else None
+
+
+def _explain(statements):
+  """EXPLAIN ANALYZE untuk SELECT paling lambat; dijalankan lalu di-rollback."""
+  plans = []
+  selects = [s for s in statements if s[2].lstrip().upper().startswith(('SELECT', 'WITH')) and s[3] is not None]
+  for seconds, alias, sql, params in sorted(selects, key=lambda s: s[0], reverse=True)[:settings.PROFILING_EXPLAIN_TOP]:
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+      continue
+    try:
+      with transaction.atomic(using=alias):
+        with connection.cursor() as cursor:
+          cursor.execute(f'EXPLAIN (ANALYZE, BUFFERS) {sql}', params)
+          plan = '\n'.join(row[0] for row in cursor.fetchall())
+        transaction.set_rollback(True, using=alias)
+    except Exception as e:
+      plan = f'EXPLAIN failed: {e}'
+    plans.append({'sql': sql, 'alias': alias, 'duration_ms': seconds * 1000, 'plan': plan})
+  return plans
+
+
+def _cprofile_text(profiler):
+  out = io.StringIO()
+  pstats.Stats(profiler, stream=out).strip_dirs().sort_stats('cumulative').print_stats(CPROFILE_LINES)
+  return out.getvalue()
+
+
+def _build(request, response, user, recorded, seconds, profiler):
+  match = getattr(request, 'resolver_match', None)
+  return {
+    'id': uuid.uuid4().hex,
+    'created_at': timezone.now().isoformat(),
+    'method': request.method,
+    'path': request.path,
+    'view': match.url_name if match and match.url_name else None,
+    'status': response.status_code,
+    'user_id': str(user.id),
+    'duration_ms': seconds * 1000,
+    'sql_count': recorded.total,
+    'sql_ms': recorded.sql_seconds * 1000,
+    'sql': [
+      {'duration_ms': s * 1000, 'alias': alias, 'sql': sql}
+      for s, alias, sql, _ in recorded.statements
+    ],
+    'explain': _explain(recorded.statements),
+    'cprofile': _cprofile_text(profiler) if profiler is not None else None,
+  }
+
+
+def buffer_enabled():
+  return settings.SHARED_CACHE
+
+
+def store(profile):
+  """Simpan ke ring buffer: slot = nomor urut % PROFILING_BUFFER_SIZE. Tanpa cache bersama tidak disimpan."""
+  if not buffer_enabled():
+    return
+  counter = f'{_CACHE_PREFIX}:next'
+  cache.add(counter, 0, timeout=None)
+  try:
+    number = cache.incr(counter)
+  except ValueError:  # counter ter-evict di antara add dan incr
+    cache.set(counter, 1, timeout=None)
+    number = 1
+  slot = number % settings.PROFILING_BUFFER_SIZE
+  cache.set(f'{_CACHE_PREFIX}:slot:{slot}', profile, settings.PROFILING_TTL_SECONDS)
+
+
+def recent():
+  """Semua profil di buffer, terbaru dulu."""
+  keys = [f'{_CACHE_PREFIX}:slot:{slot}' for slot in range(settings.PROFILING_BUFFER_SIZE)]
+  return sorted(cache.get_many(keys).values(), key=lambda profile: profile['created_at'], reverse=True)
+
+
+def get(profile_id):
+  return next((profile for profile in recent() if profile['id'] == profile_id), None)
+
+
+def _respond(response, profile, inline):
+  from api.utils.async_api import json_response
+
+  if inline:
+    response = json_response({'message': 'Profile', 'data': profile})
+    response['X-Profile-Status'] = str(profile['status'])
+  if buffer_enabled():
+    response['X-Profile-Id'] = profile['id']
+  return response
+
+
+class ProfilingMiddleware:
+  """
+  Aktif hanya bila header X-Profile ada dan token JWT milik superuser; selain itu hanya satu lookup header.
+  Pada request ASGI cProfile dilewati (event loop dipakai bersama request lain), SQL tetap dicatat.
+  """
+  sync_capable = True
+  async_capable = True
+
+  def __init__(self, get_response):
+    self.get_response = get_response
+    if iscoroutinefunction(get_response):
+      markcoroutinefunction(self)
+
+  def __call__(self, request):
+    if iscoroutinefunction(self):
+      return self.__acall__(request)
+
+    mode = request.META.get(HEADER)
+    user = _profiling_user(request) if mode and settings.PROFILING_ENABLED else None
+    if user is None:
+      return self.get_response(request)
+
+    recorded, token = _start()
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    try:
+      profiler.enable()
+    except ValueError:  # profiler lain sudah aktif di thread ini
+      profiler = None
+    try:
+      response = self.get_response(request)
+    finally:
+      if profiler is not None:
+        profiler.disable()
+      _current.reset(token)
+    seconds = time.perf_counter() - start
+
+    profile = _build(request, response, user, recorded, seconds, profiler)
+    store(profile)
+    return _respond(response, profile, mode == 'inline')
+
+  async def __acall__(self, request):
+    mode = request.META.get(HEADER)
+    user = await sync_to_async(_profiling_user)(request) if mode and settings.PROFILING_ENABLED else None
+    if user is None:
+      return await self.get_response(request)
+
+    recorded, token = _start()
+    start = time.perf_counter()
+    try:
+      response = await self.get_response(request)
+    finally:
+      _current.reset(token)
+    seconds = time.perf_counter() - start
+
+    profile = await sync_to_async(_build)(request, response, user, recorded, seconds, None)
+    await sync_to_async(store)(profile)
+    return _respond(response, profile, mode == 'inline')
@@ -0,0 +1,158 @@
+import contextvars
+import functools
+import logging
+import os
+import re
+import sys
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+# Budget query per view: @query_budget(n) di bawah @api_view.
+# - QUERY_BUDGET_ENFORCE=True (check_query_budgets, CI lokal): pelanggaran -> QueryBudgetExceeded
+# - QUERY_BUDGET_LOG=True (produksi): pelanggaran dicatat sebagai warning
+# Query dengan bentuk (SQL tanpa nilai parameter) identik yang berulang > max_repeats kali
+# dianggap N+1 dan dilaporkan beserta call site pertamanya di kode aplikasi.
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+THIS_FILE = os.path.abspath(__file__)
+
+# Bentuk query yang sama boleh dijalankan paling banyak N kali per request
+MAX_REPEATS = 3
+
+# Savepoint dari @transaction.atomic bersarang bukan query aplikasi
+IGNORED_PREFIXES = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+_IN_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)+\s*\)')
+_NUMBER = re.compile(r'\b\d+\b')
+
+# Collector aktif (tuple, untuk view bersarang); ikut ter-copy ke thread sync_to_async
+_collectors = contextvars.ContextVar('query_budget_collectors', default=())
+
+
+class QueryBudgetExceeded(Exception):
+  """View menjalankan query melebihi budget-nya"""
+
+
+def query_shape(sql):
+  return _NUMBER.sub('?', _IN_LIST.sub('(...)', sql))
+
+
+def _call_site():
+  frame = sys._getframe(2)
+  while frame is not None:
+    filename = os.path.abspath(frame.f_code.co_filename)
+    if filename.startswith(APP_DIR) and filename != THIS_FILE:
+      return f'{os.path.relpath(filename, settings.BASE_DIR)}:{frame.f_lineno} in {frame.f_code.co_name}'
+    frame = frame.f_back
+  return 'unknown'
+
+
+class QueryCollector:
+  def __init__(self):
+    self.count = 0
+    self.shapes = Counter()
+    self.call_sites = {}
+
+  def record(self, sql):
+    shape = query_shape(sql)
+    self.count += 1
+    self.shapes[shape] += 1
+    # Stack hanya diambil untuk query yang mulai berulang
+    if self.shapes[shape] == 2:
+      self.call_sites[shape] = _call_site()
+
+  def repeated(self, max_repeats):
+    return [
+      (shape, count, self.call_sites.get(shape, 'unknown'))
+      for shape, count in self.shapes.most_common()
+      if count > max_repeats
+    ]
+
+
+def _collect_query(execute, sql, params, many, context):
+  collectors = _collectors.get()
+  if collectors and not sql.lstrip().upper().startswith(IGNORED_PREFIXES):
+    for collector in collectors:
+      collector.record(sql)
+  return execute(sql, params, many, context)
+
+
+def _install(connection):
+  if _collect_query not in connection.execute_wrappers:
+    connection.execute_wrappers.append(_collect_query)
+
+
+def _install_on_connect(sender, connection, **kwargs):
+  _install(connection)
+
+connection_created.connect(_install_on_connect, dispatch_uid='api.query_budget.collector')
+
+
+def detach_collectors():
+  """Query berikutnya di context ini tidak dihitung ke budget view yang sedang berjalan (sub-request batch)."""
+  _collectors.set(())
+
+
+def _report(name, collector, max_queries, max_repeats):
+  problems = []
+  if collector.count > max_queries:
+    problems.append(f'{collector.count} queries (budget {max_queries})')
+  repeated = collector.repeated(max_repeats) if max_repeats is not None else []
+  for shape, count, call_site in repeated:
+    problems.append(f'{count}x at {call_site}: {shape[:200]}')
+  if not problems:
+    return
+
+  message = f'Query budget exceeded in {name}: ' + '; '.join(problems)
+  if settings.QUERY_BUDGET_ENFORCE:
+    raise QueryBudgetExceeded(message)
+  if settings.QUERY_BUDGET_LOG:
+    logger.warning(message)
+
+
+def query_budget(max_queries, max_repeats=MAX_REPEATS):
+  """
+  Batas jumlah query untuk satu view (tidak termasuk savepoint).
+  max_repeats: bentuk query yang sama boleh muncul paling banyak N kali (None = tanpa batas,
+  untuk path yang memang menulis per item).
+  """
+  def decorator(view):
+    name = view.__qualname__
+
+    def start():
+      # Koneksi yang sudah terbuka sebelum modul ini di-import belum punya wrapper
+      for connection in connections.all(initialized_only=True):
+        _install(connection)
+      collector = QueryCollector()
+      return collector, _collectors.set(_collectors.get() + (collector,))
+
+    if iscoroutinefunction(view):
+      @functools.wraps(view)
+      async def wrapper(*args, **kwargs):
+        collector, token = start()
+        try:
+          response = await view(*args, **kwargs)
+        finally:
+          _collectors.reset(token)
+        _report(name, collector, max_queries, max_repeats)
+        return response
+    else:
+      @functools.wraps(view)
+      def wrapper(*args, **kwargs):
+        collector, token = start()
+        try:
+          response = view(*args, **kwargs)
+        finally:
+          _collectors.reset(token)
+        _report(name, collector, max_queries, max_repeats)
+        return response
+
+    wrapper.query_budget = max_queries
+    return wrapper
+  return decorator
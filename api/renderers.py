@@ -0,0 +1,70 @@
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+  import orjson
+except ImportError:  # dependensi opsional: tanpa orjson semua jatuh ke json stdlib + encoder DRF
+  orjson = None
+
+# Renderer & parser JSON cepat (orjson) dengan output yang sama dengan JSONRenderer DRF:
+# compact, UTF-8 tanpa escape, Decimal mentah -> float, datetime UTC -> "...Z", UUID -> str,
+# tipe lain (QuerySet, timedelta, lazy string, ...) lewat JSONEncoder DRF.
+# JSON_BACKEND='json' atau orjson tidak terpasang -> perilaku DRF bawaan.
+
+_ENCODER = JSONEncoder()
+_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS if orjson else 0
+
+
+def enabled():
+  return orjson is not None and settings.JSON_BACKEND == 'orjson'
+
+
+def _default(obj):
+  return _ENCODER.default(obj)
+
+
+def dumps(data):
+  """bytes JSON; dipakai renderer DRF dan response view async."""
+  if enabled():
+    content = orjson.dumps(data, default=_default, option=_OPTIONS)
+  else:
+    content = json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+  # Sama seperti DRF: U+2028/U+2029 valid di JSON tapi tidak di JavaScript
+  return content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+def loads(content):
+  """Parse body JSON (bytes/str); ValueError bila tidak valid."""
+  if enabled():
+    return orjson.loads(content)
+  if isinstance(content, bytes):
+    content = content.decode('utf-8')
+  return json.loads(content)
+
+
+class FastJSONRenderer(JSONRenderer):
+  """JSONRenderer dengan orjson; permintaan indent (browsable API / ?indent) tetap lewat DRF."""
+
+  def render(self, data, accepted_media_type=None, renderer_context=None):
+    if data is None:
+      return b''
+    if not enabled() or self.get_indent(accepted_media_type, renderer_context or {}):
+      return super().render(data, accepted_media_type, renderer_context)
+    return dumps(data)
+
+
+class FastJSONParser(JSONParser):
+  renderer_class = FastJSONRenderer
+
+  def parse(self, stream, media_type=None, parser_context=None):
+    if not enabled():
+      return super().parse(stream, media_type, parser_context)
+    try:
+      return orjson.loads(stream.read())
+    except ValueError as exc:
+      raise ParseError('JSON parse error - %s' % str(exc))
@@ -1,5 +1,11 @@
 from rest_framework import serializers
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.tokens import AccessToken
 from .models import Category, Product, Transaction, TransactionItem, User, Payment
+from . import outbox
+from .stock import adjust_stock
+from collections import Counter
 from decimal import Decimal
 
 class UserSerializer(serializers.ModelSerializer):
@@ -16,6 +22,32 @@ class CreateUserSerializer(serializers.Serializer):
     phone = serializers.CharField(required=False, allow_blank=True)
     password = serializers.CharField()
 
+def add_token_claims(token, user):
+    """Klaim yang dipakai StatelessJWTAuthentication untuk otorisasi & tenant scoping"""
+    token['role'] = user.role
+    token['cafe_id'] = user.cafe_id
+    token['is_superuser'] = user.is_superuser
+    return token
+
+class KasirGoTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        return add_token_claims(super().get_token(user), user)
+
+class KasirGoTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        # Ambil ulang role/cafe saat refresh supaya perubahan role berlaku paling lambat
+        # setelah access token berikutnya (bukan setelah refresh token kadaluarsa)
+        access = AccessToken(data['access'])
+        user = User.objects.filter(id=access['user_id'], is_active=True) \
+            .only('role', 'cafe_id', 'is_superuser').first()
+        if user is None:
+            # User dihapus/dinonaktifkan setelah refresh token diterbitkan
+            raise AuthenticationFailed('User not found or inactive', code='user_inactive')
+        data['access'] = str(add_token_claims(access, user))
+        return data
+
 class CategorySerializer(serializers.ModelSerializer):
   class Meta:
         model = Category
@@ -31,10 +63,38 @@ class ProductSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ['cafe']
 
+class ProductIdField(serializers.PrimaryKeyRelatedField):
+    """
+    Product dari id tanpa query per item. Keberadaan & tenant dicek sekali di _cafe_products().
+    """
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return Product(pk=int(data))
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+def _cafe_products(items_data, cafe_id):
+    """
+    Produk untuk item transaksi dalam satu query, dibatasi ke cafe (tenant).
+    Stok tidak diubah lewat instance ini; perubahan stok memakai delta (api/stock.py).
+    """
+    product_ids = {item_data['product'].id for item_data in items_data}
+    products = Product.objects.filter(cafe_id=cafe_id).in_bulk(product_ids)
+    missing = sorted(product_ids - set(products))
+    if missing:
+        raise serializers.ValidationError({'items': [f'Invalid pk "{pk}" - object does not exist.' for pk in missing]})
+    return products
+
 class TransactionItemSerializer(serializers.ModelSerializer):
+    product = ProductIdField(queryset=Product.objects.all())
+
     class Meta:
         model = TransactionItem
-        fields = ['product', 'product_name', 'quantity', 'price', 'subtotal', 'notes']
+        fields = ['id', 'product', 'product_name', 'quantity', 'price', 'cost', 'subtotal', 'notes',
+                  'needs_preparation', 'prep_status']
+        read_only_fields = ['cost', 'needs_preparation', 'prep_status']
 
 class TransactionSerializer(serializers.ModelSerializer):
     items = TransactionItemSerializer(many=True)
@@ -45,7 +105,7 @@ class TransactionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Transaction
         fields = '__all__'
-        read_only_fields = ['transaction_number', 'cashier', 'cafe']
+        read_only_fields = ['transaction_number', 'cashier', 'cafe', 'stock_restored']
     
     def get_cashier_name(self, obj):
         if obj.cashier:
@@ -55,14 +115,18 @@ class TransactionSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         items_data = validated_data.pop('items')
         
+        # request.user bisa berupa ClaimsUser (tanpa query), jadi pakai id-nya saja
         cashier = self.context['request'].user
-        cafe = cashier.cafe
+        cafe_id = cashier.cafe_id
 
         transaction_subtotal = 0
-        transaction = Transaction.objects.create(cashier=cashier, cafe=cafe, **validated_data)
+        transaction = Transaction.objects.create(cashier_id=cashier.id, cafe_id=cafe_id, **validated_data)
+        products = _cafe_products(items_data, cafe_id)
 
+        items = []
+        deltas = Counter()
         for item_data in items_data:
-            product = Product.objects.get(id=item_data['product'].id, cafe=cafe)
+            product = products[item_data['product'].id]
             quantity = item_data.get('quantity', 1)
             price = product.price
             subtotal = price * quantity
@@ -71,19 +135,23 @@ class TransactionSerializer(serializers.ModelSerializer):
             transaction_subtotal += subtotal
 
             # Buat TransactionItem
-            TransactionItem.objects.create(
+            items.append(TransactionItem(
                 transaction=transaction,
                 product=product,
                 product_name=product.name,
                 quantity=quantity,
                 price=price,
+                cost=product.cost, # Snapshot harga modal untuk laporan margin
                 subtotal=subtotal,
-                notes=item_data.get('notes', '')
-            )
+                notes=item_data.get('notes', ''),
+                needs_preparation=product.needs_preparation # Snapshot untuk KDS
+            ))
 
-            # Update stock
-            product.stock -= quantity
-            product.save()
+            # Update stock (delta, dijumlahkan di database)
+            deltas[product.id] -= quantity
+
+        TransactionItem.objects.bulk_create(items)
+        stocked = adjust_stock(deltas)
 
         # Hitung tax (misal 11% PPN) dan total
         tax_percentage = validated_data.get('tax_percentage', Decimal('0.11'))
@@ -101,6 +169,9 @@ class TransactionSerializer(serializers.ModelSerializer):
         transaction.change_amount = change_amount
         transaction.save()
 
+        # Push ke perangkat lain (Firebase RTDB) ikut transaksi DB yang sama
+        outbox.enqueue(cafe_id, outbox.order_update(transaction), outbox.stock_updates(stocked))
+
         return transaction
 
     
@@ -111,44 +182,67 @@ class TransactionSerializer(serializers.ModelSerializer):
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
         
+        stocked = []
         if items_data is not None:
-            # Kembalikan stock item lama
-            for item in instance.items.all():
-                product = item.product
-                product.stock += item.quantity
-                product.save()
+            # Validasi produk baru dulu, sebelum stok lama dikembalikan
+            products = _cafe_products(items_data, instance.cafe_id)
+
+            # Selisih stok per produk: item lama kembali, item baru berkurang (satu UPDATE di akhir).
+            # Transaksi yang stoknya sudah dikembalikan (batal) tidak memegang stok lagi.
+            deltas = Counter()
+            if not instance.stock_restored:
+                for product_id, quantity in instance.items.values_list('product_id', 'quantity'):
+                    deltas[product_id] += quantity
             instance.items.all().delete()
             
             # Tambahkan item baru & kurangi stock
             transaction_subtotal = 0
+            items = []
             for item_data in items_data:
-                product = Product.objects.get(id=item_data['product'].id, cafe=instance.cafe)
+                product = products[item_data['product'].id]
                 quantity = item_data.get('quantity', 1)
                 subtotal = product.price * quantity
                 transaction_subtotal += subtotal
 
-                TransactionItem.objects.create(
+                items.append(TransactionItem(
                     transaction=instance,
                     product=product,
                     product_name=product.name,
                     quantity=quantity,
                     price=product.price,
+                    cost=product.cost,
                     subtotal=subtotal,
-                    notes=item_data.get('notes', '')
-                )
+                    notes=item_data.get('notes', ''),
+                    needs_preparation=product.needs_preparation
+                ))
+
+                if not instance.stock_restored:
+                    deltas[product.id] -= quantity
 
-                product.stock -= quantity
-                product.save()
+            TransactionItem.objects.bulk_create(items)
+            stocked = adjust_stock(deltas)
             
             instance.subtotal = transaction_subtotal
             instance.total = transaction_subtotal + instance.tax + instance.takeaway_charge - instance.discount
             instance.change_amount = max(0, instance.paid_amount - instance.total)
         
         instance.save()
+        outbox.enqueue(instance.cafe_id, outbox.order_update(instance), outbox.stock_updates(stocked))
         return instance
 
 
-class PaymentSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """
+    Serializer(..., fields=[...]) hanya merender field tersebut (?fields= / ?exclude=, lihat api/utils/sparse.py).
+    """
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class PaymentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     transaction_number = serializers.CharField(source='transaction.transaction_number', read_only=True)
     
     class Meta:
@@ -161,4 +255,16 @@ class PaymentSerializer(serializers.ModelSerializer):
 
 class CreatePaymentSerializer(serializers.Serializer):
     transaction_id = serializers.IntegerField()
-    payment_method = serializers.CharField(default='SP')  # SP = QRIS
\ No newline at end of file
+    payment_method = serializers.CharField(default='SP')  # SP = QRIS
+
+
+class KitchenItemStatusSerializer(serializers.Serializer):
+    """Transisi status dapur untuk banyak item sekaligus (per item id dan/atau semua item order)"""
+    item_ids = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=500)
+    transaction_ids = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=100)
+    prep_status = serializers.ChoiceField(choices=['cooking', 'served'])
+
+    def validate(self, attrs):
+        if not attrs.get('item_ids') and not attrs.get('transaction_ids'):
+            raise serializers.ValidationError('item_ids or transaction_ids is required')
+        return attrs
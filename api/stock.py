@@ -0,0 +1,68 @@
+from collections import namedtuple
+
+from django.db import connection
+from django.utils import timezone
+
+# Perubahan stok berbasis himpunan: satu UPDATE product ... FROM (VALUES ...) untuk banyak produk sekaligus.
+# Delta dijumlahkan di database (stock = stock + delta) sehingga tidak ada lost update antar request,
+# dan is_available mengikuti stok baru seperti Product.save().
+# Modul ini hanya memakai SQL (tanpa import api.models) supaya bisa dipakai dari Transaction.delete().
+
+# Stok terbaru satu produk; cukup untuk outbox.stock_updates()
+StockLevel = namedtuple('StockLevel', ['id', 'stock', 'is_available'])
+
+
+def adjust_stock(deltas):
+  """
+  deltas: {product_id: perubahan stok}. Return [StockLevel] produk yang berubah.
+  Product id yang sudah tidak ada diabaikan.
+  """
+  deltas = sorted((product_id, delta) for product_id, delta in deltas.items() if product_id is not None and delta)
+  if not deltas:
+    return []
+
+  values = ', '.join(['(%s, %s)'] * len(deltas))
+  with connection.cursor() as cursor:
+    cursor.execute(
+      f"""
+      UPDATE product
+      SET stock = product.stock + v.delta::integer,
+          is_available = product.stock + v.delta::integer > 0,
+          updated_at = %s
+      FROM (VALUES {values}) AS v(id, delta)
+      WHERE product.id = v.id
+      RETURNING product.id, product.stock, product.is_available
+      """,
+      [timezone.now(), *(value for pair in deltas for value in pair)]
+    )
+    return [StockLevel(*row) for row in cursor.fetchall()]
+
+
+def restore_stock(transaction_ids):
+  """
+  Kembalikan stok semua item dari transaksi-transaksi ini (batal, expired, void).
+  Transaksi ditandai stock_restored di query yang sama, jadi pemanggilan kedua (atau request lain
+  yang bersamaan) tidak mengembalikan stok dua kali. Item yang produknya sudah dihapus dilewati.
+  Return [StockLevel] untuk outbox.
+  """
+  transaction_ids = list(transaction_ids)
+  if not transaction_ids:
+    return []
+
+  with connection.cursor() as cursor:
+    cursor.execute(
+      """
+      WITH claimed AS (
+        UPDATE "transaction" SET stock_restored = TRUE
+        WHERE id = ANY(%s) AND NOT stock_restored
+        RETURNING id
+      )
+      SELECT product_id, SUM(quantity)
+      FROM transaction_item
+      WHERE transaction_id IN (SELECT id FROM claimed) AND product_id IS NOT NULL
+      GROUP BY product_id
+      """,
+      [transaction_ids]
+    )
+    deltas = dict(cursor.fetchall())
+  return adjust_stock(deltas)
@@ -1,3 +1,582 @@
-from django.test import TestCase
+import json
+import uuid
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import skipUnless
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api import outbox
+from api.db_router import pin_primary, stick_to_primary, use_primary, use_replica
+from api.management.commands.check_query_budgets import Command as QueryBudgetCommand
+from api.management.commands.check_query_plans import Command as QueryPlanCommand
+from api.models import Cafe, Category, OutboxEvent, Payment, Product, Transaction, TransactionArchive, TransactionItem, User
+from api.stock import restore_stock
+from api.utils_archive import archive_month, load_archive
+from api.utils_transaction import cleanup_expired_transactions
+from api.serializer import KasirGoTokenObtainPairSerializer, ProductSerializer
+from api.views import batch
+from api.views.product import PRODUCT_READER
+from api.views.transaction import apply_duitku_status
+
+POSTGRES_ONLY = skipUnless(connection.vendor == 'postgresql', 'Requires PostgreSQL')
+PASSWORD = 'test-password'
+
+
+def create_owner(cafe_name='Kafe Test', **kwargs):
+    """Cafe baru beserta owner-nya."""
+    cafe = Cafe.objects.create(name=cafe_name)
+    suffix = uuid.uuid4().hex[:8]
+    owner = User.objects.create_user(
+        username=f'owner-{suffix}', email=f'owner-{suffix}@kasirgo.test', password=PASSWORD,
+        role='owner', cafe=cafe, **kwargs
+    )
+    return cafe, owner
+
+
+def jwt_client(user):
+    token = KasirGoTokenObtainPairSerializer.get_token(user)
+    return Client(HTTP_HOST='kasirgo.vercel.app', HTTP_AUTHORIZATION=f'Bearer {token.access_token}')
+
+
+def create_transaction(cafe, cashier, status='completed', total=Decimal('20000'), payment_method='cash', **kwargs):
+    return Transaction.objects.create(
+        cafe=cafe, cashier=cashier, subtotal=total, total=total, payment_method=payment_method,
+        paid_amount=total, status=status, **kwargs
+    )
+
+
+def create_product(cafe, name='Kopi Susu', stock=10, price=Decimal('20000'), cost=Decimal('8000')):
+    return Product.objects.create(cafe=cafe, name=name, price=price, cost=cost, stock=stock)
+
+
+def add_item(trx, product, quantity):
+    return TransactionItem.objects.create(
+        transaction=trx, product=product, product_name=product.name, quantity=quantity,
+        price=product.price, cost=product.cost, subtotal=product.price * quantity
+    )
+
+
+def create_payment(trx, status='pending'):
+    return Payment.objects.create(
+        transaction=trx, merchant_order_id=f'{trx.cafe_id}-{trx.transaction_number}-{uuid.uuid4().hex[:6]}',
+        payment_method='SP', amount=trx.total, status=status, expired_at=timezone.now() + timedelta(hours=1)
+    )
+
+
+@POSTGRES_ONLY
+@override_settings(QUERY_BUDGET_ENFORCE=True, DATABASE_REPLICAS=[], OUTBOX_ENABLED=True,
+                   THROTTLE_ENABLED=False, TRANSACTION_CACHE_SECONDS=0)
+class QueryBudgetTests(TestCase):
+    """
+    Setiap endpoint dipanggil dengan data contoh yang sama seperti check_query_budgets.
+    QUERY_BUDGET_ENFORCE=True: view yang melewati @query_budget-nya melempar QueryBudgetExceeded
+    sehingga test gagal.
+    """
+    options = {'transactions': 12, 'items': 3}
+
+    def setUp(self):
+        command = QueryBudgetCommand()
+        self.data = command.seed(self.options)
+        self.token = KasirGoTokenObtainPairSerializer.get_token(self.data['owner'])
+        self.client = Client(HTTP_HOST='kasirgo.vercel.app', HTTP_AUTHORIZATION=f'Bearer {self.token.access_token}')
+        self.cases = command.cases(self.data, self.options)
+
+    def request(self, method, url, body):
+        return self.client.generic(
+            method, url, json.dumps(body) if body is not None else '', content_type='application/json'
+        )
+
+    def test_endpoints_within_budget(self):
+        cases = self.cases + [('POST', reverse('logout'), {'refresh': str(self.token)})]
+        for method, url, body in cases:
+            with self.subTest(f'{method} {url}'):
+                response = self.request(method, url, body)
+                self.assertLess(response.status_code, 500)
+
+    def test_list_transactions_does_not_grow_with_page_size(self):
+        # Items diambil dalam satu query untuk seluruh halaman: jumlah query tidak ikut page_size
+        url = reverse('list_transactions')
+        with CaptureQueriesContext(connection) as small:
+            self.request('GET', url + '?page_size=2', None)
+        with self.assertNumQueries(len(small)):
+            self.request('GET', url + '?page_size=50', None)
+
+
+@POSTGRES_ONLY
+class QueryPlanTests(TestCase):
+    """Query panas (list transaksi, kitchen queue, callback, sweep expiry, katalog) harus memakai index."""
+
+    def test_hot_queries_use_an_index(self):
+        cafe = Cafe.objects.create(name='Query Plan')
+        with connection.cursor() as cursor:
+            # Dataset test kecil: tanpa ini planner selalu memilih seq scan
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+        for name, queryset in QueryPlanCommand().hot_queries(cafe).items():
+            with self.subTest(name):
+                plan = queryset.explain()
+                self.assertNotIn('Seq Scan', plan, plan)
+
+
+@override_settings(DATABASE_REPLICAS=['replica_test'])
+class ReplicaRouterTests(TestCase):
+    """Routing ReplicaRouter dengan replica_test, alias yang me-mirror 'default' selama test."""
+    databases = {'default', 'replica_test'}
+
+    def setUp(self):
+        cache.clear()
+
+    def view(self, user_id, before=None):
+        @use_replica
+        def read(request):
+            if before:
+                before()
+            # Product.objects.exists() benar-benar membaca lewat alias yang dipilih router
+            Product.objects.exists()
+            return Product.objects.all().db
+        return read(SimpleNamespace(user=SimpleNamespace(id=user_id)))
+
+    def test_use_replica_reads_from_replica(self):
+        self.assertEqual(self.view(1), 'replica_test')
+
+    def test_reads_outside_use_replica_go_to_primary(self):
+        self.assertEqual(Product.objects.all().db, 'default')
+
+    def test_writes_go_to_primary(self):
+        @use_replica
+        def write(request):
+            return Cafe.objects.create(name='Replica Router')._state.db
+        self.assertEqual(write(SimpleNamespace(user=SimpleNamespace(id=1))), 'default')
+
+    def test_use_primary_inside_replica_view(self):
+        def check():
+            with use_primary():
+                self.assertEqual(Product.objects.all().db, 'default')
+        self.assertEqual(self.view(1, check), 'replica_test')
+
+    def test_pin_primary_for_rest_of_view(self):
+        self.assertEqual(self.view(1, pin_primary), 'default')
+        # Pin tidak bocor ke request berikutnya
+        self.assertEqual(self.view(1), 'replica_test')
+
+    def test_sticky_user_reads_from_primary(self):
+        stick_to_primary(1)
+        self.assertEqual(self.view(1), 'default')
+        self.assertEqual(self.view(2), 'replica_test')
+
+
+@POSTGRES_ONLY
+@override_settings(THROTTLE_ENABLED=False, TRANSACTION_CACHE_SECONDS=0)
+class BatchTests(TransactionTestCase):
+    """
+    TransactionTestCase: GET dijalankan di thread pool batch dengan koneksi sendiri,
+    jadi data test harus sudah commit.
+    """
+
+    def setUp(self):
+        self.cafe, self.owner = create_owner()
+        self.client = jwt_client(self.owner)
+        self.trx = create_transaction(self.cafe, self.owner)
+
+    def tearDown(self):
+        # Thread pool (dan koneksi DB per thread-nya) ditutup supaya database test bisa di-drop
+        executor, batch._executor = batch._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def post_batch(self, requests):
+        response = self.client.post(reverse('batch_requests'), {'requests': requests}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['data']
+
+    def test_if_none_match_in_sub_request_returns_304(self):
+        path = reverse('get_update_delete_transaction', args=[self.trx.id])
+        first = self.post_batch([{'id': 'trx', 'path': path}])[0]
+        self.assertEqual(first['status'], 200)
+        etag = first['headers']['ETag']
+
+        again = self.post_batch([{'id': 'trx', 'path': path, 'headers': {'If-None-Match': etag}}])[0]
+        self.assertEqual(again['status'], 304)
+        self.assertEqual(again['headers']['ETag'], etag)
+
+    def test_batch_if_none_match_is_not_inherited(self):
+        # If-None-Match milik request batch sendiri tidak boleh ikut ke sub-request
+        path = reverse('get_update_delete_transaction', args=[self.trx.id])
+        etag = self.post_batch([{'path': path}])[0]['headers']['ETag']
+        response = self.client.post(
+            reverse('batch_requests'), {'requests': [{'path': path}]}, content_type='application/json',
+            HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.json()['data'][0]['status'], 200)
+
+
+@POSTGRES_ONLY
+@override_settings(OUTBOX_ENABLED=True, OUTBOX_RETRY_BASE_SECONDS=2, OUTBOX_RETRY_MAX_SECONDS=300,
+                   OUTBOX_MAX_ATTEMPTS=3)
+class OutboxTests(TestCase):
+    """dispatch_pending/dispatch_cafe terhadap FakeSink (tree in-memory)."""
+
+    def setUp(self):
+        self.cafe = Cafe.objects.create(name='Outbox')
+        self.sink = outbox.FakeSink()
+
+    def path(self, cafe, path):
+        return self.sink.get(f'cafes/{cafe.id}/{path}')
+
+    def make_available(self):
+        # Lewati backoff tanpa menunggu
+        OutboxEvent.objects.update(available_at=timezone.now() - timedelta(seconds=1))
+
+    def test_rows_are_coalesced_into_one_update(self):
+        outbox.enqueue(self.cafe.id, {'orders/1': {'status': 'pending', 'total': 10}})
+        outbox.enqueue(self.cafe.id, {'orders/1/status': 'completed'}, {'stock/5': {'stock': 3}})
+        outbox.enqueue(self.cafe.id, {'orders/2': {'status': 'pending'}})
+        outbox.enqueue(self.cafe.id, outbox.order_removed(2))
+
+        self.assertEqual(outbox.dispatch_pending(self.sink), (4, 1))
+        self.assertEqual(self.sink.calls, 1)
+        self.assertEqual(self.path(self.cafe, 'orders/1'), {'status': 'completed', 'total': 10})
+        self.assertEqual(self.path(self.cafe, 'stock/5'), {'stock': 3})
+        self.assertIsNone(self.path(self.cafe, 'orders/2'))
+        self.assertFalse(OutboxEvent.objects.filter(dispatched_at__isnull=True).exists())
+
+    def test_rows_of_one_cafe_are_sent_in_order(self):
+        for status in ('pending', 'processing', 'completed'):
+            outbox.enqueue(self.cafe.id, {'orders/1/status': status})
+
+        seen = []
+        for _ in range(3):
+            self.assertEqual(outbox.dispatch_pending(self.sink, batch_size=1), (1, 1))
+            seen.append(self.path(self.cafe, 'orders/1/status'))
+        self.assertEqual(seen, ['pending', 'processing', 'completed'])
+
+    def test_oldest_pending_cafe_goes_first(self):
+        newer_cafe = Cafe.objects.create(name='Outbox 2')
+        outbox.enqueue(newer_cafe.id, {'orders/1/status': 'pending'})
+        outbox.enqueue(self.cafe.id, {'orders/1/status': 'pending'})
+
+        outbox.dispatch_pending(self.sink, max_cafes=1)
+        self.assertEqual(self.path(newer_cafe, 'orders/1/status'), 'pending')
+        self.assertIsNone(self.path(self.cafe, 'orders/1/status'))
+
+    def test_failure_backs_off_and_holds_later_rows(self):
+        outbox.enqueue(self.cafe.id, {'orders/1/status': 'pending'})
+        self.sink.fail_rate = 1.0
+
+        before = timezone.now()
+        self.assertEqual(outbox.dispatch_pending(self.sink), (0, 1))
+        row = OutboxEvent.objects.get()
+        self.assertEqual(row.attempts, 1)
+        self.assertIn('fake sink failure', row.last_error)
+        self.assertGreaterEqual(row.available_at, before + timedelta(seconds=2))
+
+        # Baris baru ikut menunggu di belakang baris yang sedang backoff
+        self.sink.fail_rate = 0
+        outbox.enqueue(self.cafe.id, {'orders/1/status': 'completed'})
+        self.assertEqual(outbox.dispatch_cafe(self.sink, self.cafe.id, 500), 0)
+        self.assertEqual(self.sink.calls, 1)
+
+        self.make_available()
+        self.assertEqual(outbox.dispatch_pending(self.sink), (2, 1))
+        self.assertEqual(self.path(self.cafe, 'orders/1/status'), 'completed')
+
+    def test_backoff_doubles_up_to_the_cap(self):
+        self.assertEqual([outbox._backoff(n) for n in (1, 2, 3, 4)], [2, 4, 8, 16])
+        self.assertEqual(outbox._backoff(12), 300)
+
+    def test_rows_fail_after_max_attempts_and_unblock_the_cafe(self):
+        outbox.enqueue(self.cafe.id, {'orders/1/status': 'pending'})
+        self.sink.fail_rate = 1.0
+        for _ in range(3):
+            self.make_available()
+            outbox.dispatch_pending(self.sink)
+        self.assertIsNotNone(OutboxEvent.objects.get().failed_at)
+
+        self.sink.fail_rate = 0
+        outbox.enqueue(self.cafe.id, {'orders/2/status': 'pending'})
+        self.assertEqual(outbox.dispatch_pending(self.sink), (1, 1))
+        self.assertIsNone(self.path(self.cafe, 'orders/1'))
+        self.assertEqual(self.path(self.cafe, 'orders/2/status'), 'pending')
+
+        self.assertEqual(outbox.retry_failed(self.cafe.id), 1)
+        self.assertEqual(outbox.dispatch_pending(self.sink), (1, 1))
+        self.assertEqual(self.path(self.cafe, 'orders/1/status'), 'pending')
+
+
+@POSTGRES_ONLY
+class DuitkuStatusTests(TestCase):
+    """apply_duitku_status (cek status realtime) vs callback yang datang lebih dulu."""
+
+    def setUp(self):
+        self.cafe, self.owner = create_owner()
+        self.trx = create_transaction(self.cafe, self.owner, status='pending', payment_method='qris')
+        self.payment = create_payment(self.trx)
+
+    def test_callback_won_returns_its_result_with_transaction_loaded(self):
+        stale = Payment.objects.select_related('transaction').get(id=self.payment.id)
+        # Callback sukses masuk setelah view membaca payment
+        Payment.objects.filter(id=self.payment.id).update(status='success')
+        Transaction.objects.filter(id=self.trx.id).update(status='completed')
+
+        payment = apply_duitku_status(stale, {'statusCode': '02', 'statusMessage': 'Cancelled'})
+        self.assertEqual(payment.status, 'success')
+        with self.assertNumQueries(0):
+            # View async men-serialize transaction_number; lazy load di sana melempar SynchronousOnlyOperation
+            self.assertEqual(payment.transaction.status, 'completed')
+
+    def test_pending_payment_gets_the_gateway_result(self):
+        stale = Payment.objects.select_related('transaction').get(id=self.payment.id)
+        payment = apply_duitku_status(stale, {'statusCode': '00', 'statusMessage': 'SUCCESS'})
+        self.assertEqual(payment.status, 'success')
+        self.trx.refresh_from_db()
+        self.assertEqual(self.trx.status, 'completed')
+
+
+@POSTGRES_ONLY
+class StockRestoreTests(TestCase):
+    """restore_stock(): stok transaksi batal/expired/void kembali tepat sekali."""
+
+    def setUp(self):
+        self.cafe, self.owner = create_owner()
+        self.coffee = create_product(self.cafe, 'Kopi Susu', stock=10)
+        self.tea = create_product(self.cafe, 'Teh', stock=5)
+        self.trx = create_transaction(self.cafe, self.owner, status='pending', payment_method='qris')
+        add_item(self.trx, self.coffee, 2)
+        add_item(self.trx, self.tea, 1)
+
+    def stock(self, product):
+        product.refresh_from_db()
+        return product.stock
+
+    def test_second_restore_is_a_no_op(self):
+        restored = restore_stock([self.trx.id])
+        self.assertEqual({level.id: level.stock for level in restored}, {self.coffee.id: 12, self.tea.id: 6})
+
+        self.assertEqual(restore_stock([self.trx.id]), [])
+        self.assertEqual(self.stock(self.coffee), 12)
+        self.assertEqual(self.stock(self.tea), 6)
+
+    def test_expiry_then_cancel_restores_once(self):
+        payment = create_payment(self.trx)
+        Payment.objects.filter(id=payment.id).update(expired_at=timezone.now() - timedelta(minutes=1))
+        # Instance yang dibaca request pembatalan sebelum sweep expiry berjalan
+        stale = Transaction.objects.get(id=self.trx.id)
+
+        self.assertEqual(cleanup_expired_transactions(self.cafe.id), 1)
+        self.assertEqual(self.stock(self.coffee), 12)
+
+        # save() penuh dari instance lama tidak boleh menghapus klaim stock_restored
+        stale.notes = 'dibatalkan kasir'
+        stale.save()
+        self.assertTrue(Transaction.objects.get(id=self.trx.id).stock_restored)
+
+        self.assertEqual(restore_stock([stale.id]), [])
+        self.assertEqual(self.stock(self.coffee), 12)
+        self.assertEqual(self.stock(self.tea), 6)
+
+    def test_cancel_endpoint_after_expiry_keeps_stock(self):
+        payment = create_payment(self.trx)
+        Payment.objects.filter(id=payment.id).update(expired_at=timezone.now() - timedelta(minutes=1))
+        cleanup_expired_transactions(self.cafe.id)
+
+        response = jwt_client(self.owner).post(reverse('cancel_transaction', args=[self.trx.id]))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.stock(self.coffee), 12)
+
+    def test_items_of_deleted_products_are_skipped(self):
+        self.tea.delete()
+        restored = restore_stock([self.trx.id])
+        self.assertEqual([(level.id, level.stock) for level in restored], [(self.coffee.id, 12)])
+        self.assertTrue(Transaction.objects.get(id=self.trx.id).stock_restored)
+
+
+@POSTGRES_ONLY
+@override_settings(DATABASE_REPLICAS=[], TRANSACTION_CACHE_SECONDS=0)
+class ArchiveMonthTests(TestCase):
+    """archive_month() dua kali untuk bulan yang sama menggabung isi arsip, tidak menimpanya."""
+
+    PERIOD = date(2025, 1, 1)
+    REPORT_RANGE = {'start_date': '2025-01-01', 'end_date': '2025-01-31'}
+
+    def setUp(self):
+        self.cafe, self.owner = create_owner()
+        self.coffee = create_product(self.cafe, 'Kopi Susu', price=Decimal('20000'), cost=Decimal('8000'))
+        self.tea = create_product(self.cafe, 'Teh', price=Decimal('10000'), cost=Decimal('3000'))
+
+    def create_sale(self, product, quantity, day):
+        trx = create_transaction(self.cafe, self.owner, total=product.price * quantity)
+        add_item(trx, product, quantity)
+        created_at = timezone.make_aware(datetime(2025, 1, day, 12))
+        Transaction.objects.filter(id=trx.id).update(created_at=created_at)
+        return trx
+
+    def test_second_archive_merges_with_the_first(self):
+        first = self.create_sale(self.coffee, 2, day=5)
+        self.assertIsNotNone(archive_month(self.cafe.id, self.PERIOD))
+
+        # Transaksi bulan yang sama yang baru final setelah arsip pertama dibuat
+        second = self.create_sale(self.tea, 3, day=20)
+        archive = archive_month(self.cafe.id, self.PERIOD)
+
+        self.assertEqual(TransactionArchive.objects.filter(cafe=self.cafe).count(), 1)
+        self.assertEqual(archive.transaction_count, 2)
+        self.assertEqual(archive.item_count, 2)
+        self.assertEqual(archive.total_sales, Decimal('70000'))
+        self.assertEqual([trx['id'] for trx in load_archive(archive)], [first.id, second.id])
+        self.assertFalse(Transaction.objects.filter(cafe=self.cafe).exists())
+
+        client = jwt_client(self.owner)
+        margin = client.get(reverse('get_margin_report'), self.REPORT_RANGE).json()['data']
+        self.assertEqual(Decimal(str(margin['summary']['revenue'])), Decimal('70000'))
+        self.assertEqual(Decimal(str(margin['summary']['cogs'])), Decimal('25000'))
+        self.assertEqual(margin['summary']['items_sold'], 5)
+        self.assertEqual(
+            {row['product_name']: row['quantity'] for row in margin['products']},
+            {'Kopi Susu': 2, 'Teh': 3}
+        )
+
+        cogs = client.get(reverse('get_cogs_report'), self.REPORT_RANGE).json()['data']
+        self.assertEqual(
+            [(row['date'], Decimal(str(row['cogs']))) for row in cogs],
+            [('2025-01-05', Decimal('16000')), ('2025-01-20', Decimal('9000'))]
+        )
+
+
+@POSTGRES_ONLY
+@override_settings(THROTTLE_ENABLED=False)
+class TokenRefreshTests(TestCase):
+    """KasirGoTokenRefreshSerializer mengambil ulang user; user non-aktif tidak bisa refresh."""
+
+    def setUp(self):
+        self.cafe, self.owner = create_owner()
+        self.refresh = str(KasirGoTokenObtainPairSerializer.get_token(self.owner))
+        self.client = Client(HTTP_HOST='kasirgo.vercel.app')
+
+    def post_refresh(self):
+        return self.client.post(reverse('token_refresh'), {'refresh': self.refresh}, content_type='application/json')
+
+    def test_refresh_carries_current_role(self):
+        User.objects.filter(id=self.owner.id).update(role='staff')
+        response = self.post_refresh()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(AccessToken(response.json()['access'])['role'], 'staff')
+
+    def test_deactivated_user_cannot_refresh(self):
+        User.objects.filter(id=self.owner.id).update(is_active=False)
+        response = self.post_refresh()
+        self.assertEqual(response.status_code, 401)
+        self.assertNotIn('access', response.json())
+
+
+@override_settings(METRICS_TOKEN='rahasia-metrics')
+class MetricsAuthTests(TestCase):
+    """GET /metrics hanya dengan Authorization: Bearer <METRICS_TOKEN>."""
+
+    def get(self, **headers):
+        return Client(HTTP_HOST='kasirgo.vercel.app').get(reverse('metrics'), **headers)
+
+    def test_missing_token(self):
+        self.assertEqual(self.get().status_code, 401)
+
+    def test_wrong_token(self):
+        self.assertEqual(self.get(HTTP_AUTHORIZATION='Bearer salah').status_code, 401)
+
+    def test_non_ascii_token(self):
+        # Dulu compare_digest(str non-ASCII) melempar TypeError -> 500
+        self.assertEqual(self.get(HTTP_AUTHORIZATION='Bearer rahasia-métrics').status_code, 401)
+
+    def test_correct_token(self):
+        response = self.get(HTTP_AUTHORIZATION='Bearer rahasia-metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('kasirgo_http_request_duration_seconds', response.content.decode())
+
+    @override_settings(METRICS_TOKEN='')
+    def test_disabled_without_token_setting(self):
+        self.assertEqual(self.get(HTTP_AUTHORIZATION='Bearer rahasia-metrics').status_code, 404)
+
+
+@POSTGRES_ONLY
+@override_settings(SHARED_CACHE=True, TRANSACTION_CACHE_SECONDS=60, DATABASE_REPLICAS=[], THROTTLE_ENABLED=False)
+class ExpiredTransactionCacheTests(TestCase):
+    """Pembatalan oleh cleanup_expired_transactions() harus terlihat di detail yang di-cache / ETag."""
+
+    def setUp(self):
+        cache.clear()
+        self.cafe, self.owner = create_owner()
+        # Transaksi final yang masih punya pembayaran QRIS pending (sudah masuk cache detail)
+        self.trx = create_transaction(self.cafe, self.owner, payment_method='qris')
+        payment = create_payment(self.trx)
+        Payment.objects.filter(id=payment.id).update(expired_at=timezone.now() - timedelta(minutes=1))
+        self.client = jwt_client(self.owner)
+        self.url = reverse('get_update_delete_transaction', args=[self.trx.id])
+
+    def test_cancelled_by_expiry_invalidates_cached_detail(self):
+        before = self.client.get(self.url)
+        self.assertEqual(before.json()['data']['status'], 'completed')
+
+        self.assertEqual(cleanup_expired_transactions(self.cafe.id), 1)
+        self.assertGreater(Transaction.objects.get(id=self.trx.id).updated_at, self.trx.updated_at)
+        self.assertEqual(Payment.objects.get(transaction=self.trx).status, 'expired')
+
+        after = self.client.get(self.url)
+        self.assertEqual(after.json()['data']['status'], 'cancelled')
+        self.assertNotEqual(after.json()['data']['updated_at'], before.json()['data']['updated_at'])
+
+    def test_etag_from_before_expiry_is_not_revalidated(self):
+        etag = self.client.get(self.url)['ETag']
+        cleanup_expired_transactions(self.cafe.id)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['status'], 'cancelled')
+
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+
+@POSTGRES_ONLY
+@override_settings(DATABASE_REPLICAS=[], THROTTLE_ENABLED=False)
+class SparseFieldsTests(TestCase):
+    """ValuesReader / ?fields= harus sama dengan output ProductSerializer (fields='__all__')."""
+
+    def setUp(self):
+        self.cafe, self.owner = create_owner()
+        category = Category.objects.create(cafe=self.cafe, name='Minuman')
+        self.product = create_product(self.cafe, 'Kopi Susu', price=Decimal('20000.50'))
+        Product.objects.filter(id=self.product.id).update(category=category, sku='KS-01')
+        self.product = Product.objects.select_related('category').get(id=self.product.id)
+        self.client = jwt_client(self.owner)
+
+    def serialized(self):
+        return json.loads(json.dumps(ProductSerializer(self.product).data))
+
+    def test_reader_matches_serializer(self):
+        rows = PRODUCT_READER.read(Product.objects.filter(id=self.product.id))
+        self.assertEqual(json.loads(json.dumps(rows[0])), self.serialized())
+
+    def test_fields_param_matches_serializer_keys(self):
+        response = self.client.get(reverse('get_all_products'), {'fields': 'price,name,category_name,updated_at,id'})
+        self.assertEqual(response.status_code, 200)
+        row = response.json()['data'][0]
+        # Urutan mengikuti daftar field, bukan urutan di query string
+        self.assertEqual(list(row), [name for name in PRODUCT_READER.fields if name in row])
+        full = self.serialized()
+        self.assertEqual(row, {name: full[name] for name in ('id', 'name', 'category_name', 'price', 'updated_at')})
+
+    def test_exclude_param(self):
+        row = self.client.get(reverse('get_all_products'), {'exclude': 'cost,description'}).json()['data'][0]
+        full = self.serialized()
+        self.assertEqual(row, {name: value for name, value in full.items() if name not in ('cost', 'description')})
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get(reverse('get_all_products'), {'fields': 'name,rahasia'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(response.json()), ['message'])
+        self.assertIn('rahasia', response.json()['message'])
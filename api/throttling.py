@@ -0,0 +1,187 @@
+import math
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+# Rate limit per cafe & per user (token bucket) + load shedding berdasarkan prioritas endpoint.
+# Kelas prioritas per URL name (THROTTLE_PRIORITIES): 'high' (checkout, callback), 'normal' (default),
+# 'low' (laporan, export). Saat worker jenuh (request sync yang sedang berjalan > THROTTLE_SHED_INFLIGHT[kelas])
+# request kelas rendah ditolak duluan dengan 429 + Retry-After, sehingga checkout tetap punya thread & koneksi DB.
+# Shedding (THROTTLE_SHEDDING) hanya untuk server threaded/ASGI: hitungan in-flight per proses, dan worker
+# yang melayani satu request sekaligus (Vercel, gunicorn sync) tidak pernah jenuh menurut hitungan itu.
+# Bucket disimpan di Django cache (THROTTLE_BACKEND='cache', bersama antar worker bila cache-nya Redis) atau
+# in-process ('local'). Versi cache memakai get/set biasa: race antar worker bisa meloloskan sedikit lebih dari
+# rate-nya, cukup untuk membendung loop polling yang kebablasan.
+
+_CACHE_PREFIX = 'throttle'
+
+_inflight = 0
+_inflight_lock = threading.Lock()
+
+
+def inflight():
+  """Request view sync yang sedang berjalan di proses ini (thread worker terpakai)."""
+  return _inflight
+
+
+class InflightMiddleware:
+  """
+  Hitung request yang sedang memakai thread worker. View async (long-poll, SSE) tidak dihitung
+  karena tidak memegang thread; di ASGI view sync tetap dihitung (jalan di thread pool).
+  """
+  sync_capable = True
+  async_capable = True
+
+  def __init__(self, get_response):
+    if not settings.THROTTLE_SHEDDING:
+      # Tanpa shedding hitungan ini tidak dipakai; Django melewati middleware ini
+      raise MiddlewareNotUsed
+    self.get_response = get_response
+    if iscoroutinefunction(get_response):
+      markcoroutinefunction(self)
+
+  def _enter(self, request, view_func):
+    global _inflight
+    if iscoroutinefunction(view_func):
+      return
+    with _inflight_lock:
+      _inflight += 1
+    request._counted_inflight = True
+
+  def _exit(self, request):
+    global _inflight
+    if request.__dict__.pop('_counted_inflight', False):
+      with _inflight_lock:
+        _inflight -= 1
+
+  def __call__(self, request):
+    if iscoroutinefunction(self):
+      return self.__acall__(request)
+    try:
+      return self.get_response(request)
+    finally:
+      self._exit(request)
+
+  async def __acall__(self, request):
+    try:
+      return await self.get_response(request)
+    finally:
+      self._exit(request)
+
+  def process_view(self, request, view_func, view_args, view_kwargs):
+    self._enter(request, view_func)
+    return None
+
+
+def priority(url_name):
+  return settings.THROTTLE_PRIORITIES.get(url_name, 'normal')
+
+
+class LocalBuckets:
+  """Token bucket in-process; state = (token, waktu update terakhir)."""
+
+  def __init__(self):
+    self.lock = threading.Lock()
+    self.buckets = {}
+
+  def take(self, keys):
+    """keys: [(key, rate, burst)]. Ambil satu token dari semua bucket, atau return detik tunggu."""
+    with self.lock:
+      states = {key: self.buckets.get(key) for key, _, _ in keys}
+      wait, updated = _take(keys, states, time.monotonic())
+      if not wait:
+        self.buckets.update(updated)
+      return wait
+
+
+class CacheBuckets:
+  """Token bucket di Django cache (satu get_many + satu set_many per request)."""
+
+  def take(self, keys):
+    cache_keys = {key: f'{_CACHE_PREFIX}:{key}' for key, _, _ in keys}
+    found = cache.get_many(cache_keys.values())
+    states = {key: found.get(cache_key) for key, cache_key in cache_keys.items()}
+    wait, updated = _take(keys, states, time.time())
+    if not wait:
+      # Bucket penuh lagi setelah burst/rate detik; sesudah itu key boleh hilang
+      timeout = max(math.ceil(burst / rate) for _, rate, burst in keys) + 1
+      cache.set_many({cache_keys[key]: state for key, state in updated.items()}, timeout)
+    return wait
+
+
+def _take(keys, states, now):
+  updated = {}
+  wait = 0.0
+  for key, rate, burst in keys:
+    tokens, last = states.get(key) or (burst, now)
+    tokens = min(burst, tokens + (now - last) * rate)
+    if tokens < 1:
+      wait = max(wait, (1 - tokens) / rate)
+    updated[key] = (tokens - 1, now)
+  return wait, updated
+
+
+_buckets = None
+_buckets_lock = threading.Lock()
+
+
+def buckets():
+  global _buckets
+  if _buckets is None:
+    with _buckets_lock:
+      if _buckets is None:
+        _buckets = CacheBuckets() if settings.THROTTLE_BACKEND == 'cache' else LocalBuckets()
+  return _buckets
+
+
+def check(request, user):
+  """
+  Return None bila request boleh lanjut, atau (pesan, detik Retry-After).
+  Urutan: load shedding (tanpa I/O) dulu, baru token bucket user & cafe.
+  """
+  if not settings.THROTTLE_ENABLED:
+    return None
+  match = getattr(request, 'resolver_match', None)
+  level = priority(match.url_name if match else None)
+
+  limit = settings.THROTTLE_SHED_INFLIGHT.get(level) if settings.THROTTLE_SHEDDING else None
+  if limit is not None and inflight() > limit:
+    return 'Server is busy, please retry shortly.', settings.THROTTLE_SHED_RETRY_AFTER
+
+  if user is None or not getattr(user, 'is_authenticated', False):
+    return None
+  rates = settings.THROTTLE_RATES.get(level) or {}
+  keys = []
+  if rates.get('user'):
+    keys.append((f'{level}:user:{user.id}', *rates['user']))
+  if rates.get('cafe') and getattr(user, 'cafe_id', None) is not None:
+    keys.append((f'{level}:cafe:{user.cafe_id}', *rates['cafe']))
+  if not keys:
+    return None
+
+  wait = buckets().take(keys)
+  if wait:
+    return 'Request was throttled.', math.ceil(wait)
+  return None
+
+
+async def acheck(request, user):
+  if settings.THROTTLE_ENABLED and settings.THROTTLE_BACKEND == 'cache':
+    return await sync_to_async(check)(request, user)
+  return check(request, user)
+
+
+class PriorityRateThrottle(BaseThrottle):
+  """DEFAULT_THROTTLE_CLASSES untuk view DRF; view async memanggil check() dari async_api_view."""
+
+  def allow_request(self, request, view):
+    self.result = check(request, request.user)
+    return self.result is None
+
+  def wait(self):
+    return self.result[1]
@@ -0,0 +1,66 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from api import renderers
+
+# Cache representasi transaksi yang sudah final (completed/cancelled) untuk detail GET & list_transactions.
+# Transaksi final hampir tidak pernah berubah; perubahan yang jarang (PATCH, DELETE, callback Duitku yang
+# terlambat, arsip bulanan) memanggil invalidate(). TTL TRANSACTION_CACHE_SECONDS membatasi sisa race
+# (reader lama mengisi cache tepat setelah invalidasi). 0 = cache mati.
+# Butuh cache bersama (SHARED_CACHE): dengan LocMemCache invalidasi hanya terjadi di satu proses,
+# instance lain tetap menyajikan versi lama, jadi tanpa CACHE_URL cache ini tidak dipakai.
+# Yang disimpan selalu representasi lengkap (semua TRANSACTION_FIELDS); ?fields= diproyeksikan dari situ.
+
+FINAL_STATUSES = ('completed', 'cancelled')
+
+# Naikkan bila bentuk representasi berubah supaya entry lama tidak terbaca
+_VERSION = 2
+
+
+def enabled():
+  return bool(settings.TRANSACTION_CACHE_SECONDS) and settings.SHARED_CACHE
+
+
+def _key(cafe_id, trx_id):
+  return f'trx:{_VERSION}:{cafe_id}:{trx_id}'
+
+
+def get_many(cafe_id, ids):
+  """{id: representasi} untuk transaksi yang ada di cache."""
+  if not enabled() or not ids:
+    return {}
+  keys = {_key(cafe_id, trx_id): trx_id for trx_id in ids}
+  return {keys[key]: row for key, row in cache.get_many(keys).items()}
+
+
+def get(cafe_id, trx_id):
+  return get_many(cafe_id, [trx_id]).get(trx_id)
+
+
+def store(cafe_id, rows):
+  """Simpan representasi lengkap; hanya yang statusnya final."""
+  if not enabled():
+    return
+  final = {_key(cafe_id, row['id']): row for row in rows if row['status'] in FINAL_STATUSES}
+  if final:
+    cache.set_many(final, settings.TRANSACTION_CACHE_SECONDS)
+
+
+def invalidate(cafe_id, *ids):
+  """
+  Hapus sekarang dan sekali lagi setelah commit: request lain bisa mengisi ulang
+  versi lama selama transaksi DB pengubahnya belum commit.
+  """
+  keys = [_key(cafe_id, trx_id) for trx_id in ids]
+  if not keys:
+    return
+  cache.delete_many(keys)
+  transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def etag(data):
+  """ETag kuat dari isi representasi (setelah proyeksi ?fields=)."""
+  return '"%s"' % hashlib.md5(renderers.dumps(data), usedforsecurity=False).hexdigest()
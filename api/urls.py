@@ -1,44 +1,72 @@
 from django.urls import path
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from .views import get_all_users, get_update_delete_user, create_user, change_password, create_category, \
-                   get_all_categories, get_update_delete_category, search_products, create_product, get_all_products, \
-                   get_update_delete_product, create_transaction, get_update_delete_transaction, \
-                   list_transactions, LogoutView, create_payment, payment_callback, get_payment_status, \
-                   cancel_transaction, FirebaseTokenView
+from api.utils.lazy import lazy_view
 
+# View di-resolve lewat dotted path supaya modulnya baru di-import saat dipakai
 urlpatterns = [
 
   # User endpoints
-  path('users/', get_all_users, name='get_all_users'),
-  path('user/<uuid:user_id>/', get_update_delete_user, name='get_update_delete_user'),
-  path('user/<uuid:user_id>/change-password/', change_password, name='change_password'),
-  path('users/create/', create_user, name='create_user'),
+  path('users/', lazy_view('api.views.auth.get_all_users'), name='get_all_users'),
+  path('user/<uuid:user_id>/', lazy_view('api.views.auth.get_update_delete_user'), name='get_update_delete_user'),
+  path('user/<uuid:user_id>/change-password/', lazy_view('api.views.auth.change_password'), name='change_password'),
+  path('users/create/', lazy_view('api.views.auth.create_user'), name='create_user'),
 
   # Category endpoints
-  path('categories/', get_all_categories, name='get_all_categories'),
-  path('category/<int:category_id>/', get_update_delete_category, name='get_update_delete_category'),
-  path('category/create/', create_category, name='create_category'),
+  path('categories/', lazy_view('api.views.product.get_all_categories'), name='get_all_categories'),
+  path('category/<int:category_id>/', lazy_view('api.views.product.get_update_delete_category'), name='get_update_delete_category'),
+  path('category/create/', lazy_view('api.views.product.create_category'), name='create_category'),
 
   # Product endpoints
-  path('products/', get_all_products, name='get_all_products'),
-  path('products/search/', search_products, name='search_products'),
-  path('product/<int:product_id>/', get_update_delete_product, name='get_update_delete_product'),
-  path('product/create/', create_product, name='create_product'),
+  path('products/', lazy_view('api.views.product.get_all_products'), name='get_all_products'),
+  path('products/search/', lazy_view('api.views.product.search_products'), name='search_products'),
+  path('product/<int:product_id>/', lazy_view('api.views.product.get_update_delete_product'), name='get_update_delete_product'),
+  path('product/create/', lazy_view('api.views.product.create_product'), name='create_product'),
 
   # Transaction endpoints
-  path('transaction/', list_transactions, name='list_transactions'),
-  path('transaction/<int:transaction_id>/', get_update_delete_transaction, name='get_update_delete_transaction'),
-  path('transaction/create/', create_transaction, name='create_transaction'),
-  path('transaction/<int:transaction_id>/cancel/', cancel_transaction, name='cancel_transaction'),
+  path('transaction/', lazy_view('api.views.transaction.list_transactions'), name='list_transactions'),
+  path('transaction/<int:transaction_id>/', lazy_view('api.views.transaction.get_update_delete_transaction'), name='get_update_delete_transaction'),
+  path('transaction/create/', lazy_view('api.views.transaction.create_transaction'), name='create_transaction'),
+  path('transaction/export/', lazy_view('api.views.report.export_transactions'), name='export_transactions'),
+  path('transaction/<int:transaction_id>/cancel/', lazy_view('api.views.transaction.cancel_transaction'), name='cancel_transaction'),
 
   # JWT endpoints
-  path('auth/login/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
-  path('auth/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
-  path('auth/logout/', LogoutView.as_view(), name='logout'),
-  path('auth/firebase-token/', FirebaseTokenView.as_view(), name='firebase_token'),
+  path('auth/login/', lazy_view('rest_framework_simplejwt.views.TokenObtainPairView'), name='token_obtain_pair'),
+  path('auth/refresh/', lazy_view('rest_framework_simplejwt.views.TokenRefreshView'), name='token_refresh'),
+  path('auth/logout/', lazy_view('api.views.auth.LogoutView'), name='logout'),
+  path('auth/firebase-token/', lazy_view('api.views.auth.FirebaseTokenView'), name='firebase_token'),
 
   # Payment endpoints (Duitku)
-  path('payment/create/', create_payment, name='create_payment'),
-  path('payment/callback/', payment_callback, name='payment_callback'),
-  path('payment/status/<int:payment_id>/', get_payment_status, name='get_payment_status'),
+  path('payment/create/', lazy_view('api.views.transaction.create_payment'), name='create_payment'),
+  path('payment/callback/', lazy_view('api.views.transaction.payment_callback'), name='payment_callback'),
+  path('payment/status/<int:payment_id>/', lazy_view('api.views.transaction.get_payment_status'), name='get_payment_status'),
+
+  # Batch: beberapa request API dalam satu round trip
+  path('batch/', lazy_view('api.views.batch.batch_requests'), name='batch_requests'),
+
+  # Dashboard endpoint
+  path('dashboard/', lazy_view('api.views.dashboard.get_dashboard'), name='get_dashboard'),
+
+  # Async (ASGI) endpoints: versi non-blocking dari endpoint yang menunggu gateway
+  path('async/payment/create/', lazy_view('api.views.async_io.create_payment_async', is_async=True), name='create_payment_async'),
+  path('async/payment/status/<int:payment_id>/', lazy_view('api.views.async_io.get_payment_status_async', is_async=True), name='get_payment_status_async'),
+  path('async/auth/firebase-token/', lazy_view('api.views.async_io.firebase_token_async', is_async=True), name='firebase_token_async'),
+  path('async/product/<int:product_id>/image/', lazy_view('api.views.async_io.upload_product_image_async', is_async=True), name='upload_product_image_async'),
+
+  # Event pembayaran & transaksi (SSE / long-poll)
+  path('events/', lazy_view('api.views.events.get_events'), name='get_events'),
+  path('async/events/', lazy_view('api.views.events.events_poll', is_async=True), name='events_poll'),
+  path('async/events/stream/', lazy_view('api.views.events.events_stream', is_async=True), name='events_stream'),
+
+  # Kitchen display (KDS) endpoints
+  path('kitchen/queue/', lazy_view('api.views.kitchen.kitchen_queue'), name='kitchen_queue'),
+  path('kitchen/items/status/', lazy_view('api.views.kitchen.update_kitchen_items'), name='update_kitchen_items'),
+  path('async/kitchen/queue/', lazy_view('api.views.kitchen.kitchen_queue_poll', is_async=True), name='kitchen_queue_poll'),
+  path('async/kitchen/queue/stream/', lazy_view('api.views.kitchen.kitchen_queue_stream', is_async=True), name='kitchen_queue_stream'),
+
+  # Profiling (superuser): hasil request dengan header X-Profile
+  path('profiles/', lazy_view('api.views.profiling.list_profiles'), name='list_profiles'),
+  path('profiles/<str:profile_id>/', lazy_view('api.views.profiling.get_profile'), name='get_profile'),
+
+  # Report endpoints
+  path('reports/margin/', lazy_view('api.views.report.get_margin_report'), name='get_margin_report'),
+  path('reports/cogs/', lazy_view('api.views.report.get_cogs_report'), name='get_cogs_report'),
 ]
\ No newline at end of file
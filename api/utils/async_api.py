@@ -0,0 +1,75 @@
+import functools
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, HttpResponseBase
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from api import renderers, throttling
+
+# DRF belum mendukung view async, jadi view ASGI memakai helper ringan ini:
+# autentikasi JWT yang sama, parsing body JSON/multipart, dan response JSON seperti renderer DRF (api/renderers.py).
+
+def json_response(data, status_code=status.HTTP_200_OK):
+  return HttpResponse(renderers.dumps(data), status=status_code, content_type='application/json')
+
+async def authenticate(request):
+  """
+  Autentikasi JWT seperti DEFAULT_AUTHENTICATION_CLASSES.
+  Token dengan klaim role/cafe_id tidak menyentuh database; token lama di-load di thread.
+  """
+  from api.authentication import StatelessJWTAuthentication
+
+  result = await sync_to_async(StatelessJWTAuthentication().authenticate)(request)
+  return result[0] if result else None
+
+def parse_body(request):
+  if request.content_type == 'application/json':
+    try:
+      return renderers.loads(request.body or b'{}')
+    except ValueError:
+      return None
+  return request.POST
+
+def async_api_view(methods, allow_any=False):
+  """
+  Pengganti @api_view untuk view `async def`.
+  Mengisi request.user dan request.data; view boleh return dict (200), (dict, status),
+  atau HttpResponse langsung (mis. StreamingHttpResponse untuk SSE).
+  """
+  def decorator(view):
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+      if request.method not in methods:
+        return json_response({'detail': f'Method "{request.method}" not allowed.'}, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+      try:
+        user = await authenticate(request)
+      except APIException as e:
+        return json_response({'detail': e.detail}, e.status_code)
+      if user is None and not allow_any:
+        return json_response({'detail': 'Authentication credentials were not provided.'}, status.HTTP_401_UNAUTHORIZED)
+      if user is not None:
+        request.user = user
+
+      throttled = await throttling.acheck(request, user)
+      if throttled is not None:
+        message, retry_after = throttled
+        response = json_response({'detail': message}, status.HTTP_429_TOO_MANY_REQUESTS)
+        response['Retry-After'] = str(retry_after)
+        return response
+
+      request.data = parse_body(request)
+      if request.data is None:
+        return json_response({'detail': 'JSON parse error'}, status.HTTP_400_BAD_REQUEST)
+
+      result = await view(request, *args, **kwargs)
+      if isinstance(result, HttpResponseBase):
+        return result
+      if isinstance(result, tuple):
+        return json_response(*result)
+      return json_response(result)
+
+    wrapper.csrf_exempt = True
+    return wrapper
+  return decorator
@@ -0,0 +1,61 @@
+import json
+import os
+import statistics
+import subprocess
+from datetime import datetime
+
+from django.conf import settings
+
+# Helper bersama untuk command bench_*: percentile latency dan hasil yang disimpan
+# di bench_results/ (tidak di-commit) supaya run sebelum/sesudah perubahan bisa dibandingkan.
+
+RESULTS_DIR = os.path.join(settings.BASE_DIR, 'bench_results')
+
+
+def percentile(values, pct):
+  ordered = sorted(values)
+  index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+  return ordered[index]
+
+
+def summarize(latencies, elapsed, errors=0):
+  """Ringkasan satu skenario; latencies dalam detik, hasil dalam ms."""
+  if not latencies:
+    return {'requests': 0, 'errors': errors, 'rps': 0.0}
+  return {
+    'requests': len(latencies),
+    'errors': errors,
+    'rps': len(latencies) / elapsed if elapsed else 0.0,
+    'mean_ms': statistics.mean(latencies) * 1000,
+    'p50_ms': percentile(latencies, 50) * 1000,
+    'p95_ms': percentile(latencies, 95) * 1000,
+    'p99_ms': percentile(latencies, 99) * 1000,
+    'max_ms': max(latencies) * 1000,
+  }
+
+
+def git_revision():
+  try:
+    result = subprocess.run(
+      ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+      capture_output=True, text=True, timeout=5
+    )
+  except (OSError, subprocess.SubprocessError):
+    return None
+  return result.stdout.strip() or None
+
+
+def save_results(name, label, results):
+  """Simpan ke bench_results/<name>-<timestamp>[-label].json, return path-nya."""
+  os.makedirs(RESULTS_DIR, exist_ok=True)
+  stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+  filename = f'{name}-{stamp}' + (f'-{label}' if label else '') + '.json'
+  path = os.path.join(RESULTS_DIR, filename)
+  with open(path, 'w') as f:
+    json.dump({'name': name, 'label': label, 'revision': git_revision(), 'created_at': stamp, **results}, f, indent=2)
+  return path
+
+
+def load_results(path):
+  with open(path) as f:
+    return json.load(f)
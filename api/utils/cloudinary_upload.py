@@ -0,0 +1,53 @@
+import hashlib
+import os
+import time
+from django.conf import settings
+
+# Upload langsung ke Cloudinary Upload API lewat httpx (async), tanpa SDK cloudinary yang blocking.
+# Penamaan mengikuti MediaCloudinaryStorage: folder '<media prefix>/<upload_to>', use_filename,
+# tag 'media', dan nama file di database = public_id.
+
+UPLOAD_TIMEOUT_SECONDS = 60
+MEDIA_TAG = 'media'
+
+class CloudinaryUploadError(Exception):
+  """Upload ke Cloudinary gagal"""
+
+def _media_prefix():
+  return settings.MEDIA_URL.strip('/')
+
+def _sign(params):
+  api_secret = settings.CLOUDINARY_STORAGE['API_SECRET']
+  to_sign = '&'.join(f'{key}={params[key]}' for key in sorted(params))
+  return hashlib.sha1(f'{to_sign}{api_secret}'.encode()).hexdigest()
+
+async def aupload_image(uploaded_file, upload_to):
+  """
+  Upload gambar (UploadedFile) ke Cloudinary.
+  Return nama yang bisa langsung di-assign ke ImageField (public_id).
+  """
+  import httpx
+
+  storage = settings.CLOUDINARY_STORAGE
+  params = {
+    'folder': os.path.join(_media_prefix(), upload_to.strip('/')),
+    'tags': MEDIA_TAG,
+    'timestamp': int(time.time()),
+    'use_filename': 'true',
+  }
+  data = {**params, 'api_key': storage['API_KEY'], 'signature': _sign(params)}
+
+  uploaded_file.seek(0)
+  files = {'file': (uploaded_file.name, uploaded_file.read(), uploaded_file.content_type)}
+  url = f"https://api.cloudinary.com/v1_1/{storage['CLOUD_NAME']}/image/upload"
+
+  try:
+    async with httpx.AsyncClient(timeout=UPLOAD_TIMEOUT_SECONDS) as client:
+      response = await client.post(url, data=data, files=files)
+      body = response.json()
+  except (httpx.HTTPError, ValueError) as e:
+    raise CloudinaryUploadError(f'Upload failed: {str(e)}')
+
+  if response.status_code != 200:
+    raise CloudinaryUploadError(body.get('error', {}).get('message', 'Upload failed'))
+  return body['public_id']
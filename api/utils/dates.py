@@ -0,0 +1,47 @@
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+
+
+def local_bounds(start, end):
+  """
+  Half-open range [start, end) sebagai datetime aware di timezone lokal (Asia/Jakarta).
+  """
+  tz = timezone.get_default_timezone()
+  return (
+    timezone.make_aware(datetime.combine(start, time.min), tz),
+    timezone.make_aware(datetime.combine(end, time.min), tz),
+  )
+
+
+def parse_date_param(value, name):
+  if not value or not isinstance(value, str):
+    return value or None
+  try:
+    parsed = parse_date(value)
+  except ValueError:
+    parsed = None
+  if parsed is None:
+    raise ValidationError({name: 'Invalid date, expected YYYY-MM-DD'})
+  return parsed
+
+
+def filter_created_between(queryset, start_date=None, end_date=None, field='created_at'):
+  """
+  Filter tanggal inklusif (YYYY-MM-DD) sebagai range half-open di Asia/Jakarta:
+  created_at >= start 00:00 AND created_at < (end + 1 hari) 00:00.
+  Berbeda dengan created_at__date, kolom tidak dibungkus cast sehingga index tetap terpakai.
+  """
+  start_date = parse_date_param(start_date, 'start_date')
+  end_date = parse_date_param(end_date, 'end_date')
+
+  if start_date:
+    start, _ = local_bounds(start_date, start_date)
+    queryset = queryset.filter(**{f'{field}__gte': start})
+  if end_date:
+    _, end = local_bounds(end_date, end_date + timedelta(days=1))
+    queryset = queryset.filter(**{f'{field}__lt': end})
+
+  return queryset
@@ -0,0 +1,106 @@
+import asyncio
+import hashlib
+import time
+import weakref
+from django.conf import settings
+from api import metrics
+
+# `requests` / `httpx` di-import saat request pertama ke Duitku, bukan saat cold start
+
+TIMEOUT_SECONDS = 30
+
+# Satu AsyncClient (connection pool + keep-alive) per event loop
+_async_clients = weakref.WeakKeyDictionary()
+
+class DuitkuError(Exception):
+  """Gagal menghubungi Duitku (timeout, koneksi, dsb)"""
+
+def base_url():
+  if settings.DUITKU_BASE_URL:
+    return settings.DUITKU_BASE_URL.rstrip('/')
+  return "https://sandbox.duitku.com" if settings.DUITKU_IS_SANDBOX else "https://passport.duitku.com"
+
+def signature(*parts):
+  return hashlib.md5(''.join(str(part) for part in parts).encode()).hexdigest()
+
+def _post(path, payload):
+  import requests
+
+  start = time.perf_counter()
+  try:
+    response = requests.post(
+      f"{base_url()}{path}",
+      json=payload,
+      headers={"Content-Type": "application/json"},
+      timeout=TIMEOUT_SECONDS
+    )
+    result = response.status_code, response.json()
+  except (requests.exceptions.RequestException, ValueError) as e:
+    metrics.observe_outbound('duitku', path, time.perf_counter() - start, error=True)
+    raise DuitkuError(f'Connection Failed: {str(e)}')
+
+  metrics.observe_outbound('duitku', path, time.perf_counter() - start)
+  return result
+
+def _async_client():
+  import httpx
+
+  loop = asyncio.get_running_loop()
+  client = _async_clients.get(loop)
+  if client is None or client.is_closed:
+    client = httpx.AsyncClient(
+      timeout=TIMEOUT_SECONDS,
+      limits=httpx.Limits(max_connections=None, max_keepalive_connections=100)
+    )
+    _async_clients[loop] = client
+  return client
+
+async def _apost(path, payload):
+  import httpx
+
+  start = time.perf_counter()
+  try:
+    response = await _async_client().post(
+      f"{base_url()}{path}",
+      json=payload,
+      headers={"Content-Type": "application/json"}
+    )
+    result = response.status_code, response.json()
+  except (httpx.HTTPError, ValueError) as e:
+    metrics.observe_outbound('duitku', path, time.perf_counter() - start, error=True)
+    raise DuitkuError(f'Connection Failed: {str(e)}')
+
+  metrics.observe_outbound('duitku', path, time.perf_counter() - start)
+  return result
+
+def _status_payload(merchant_order_id):
+  merchant_code = settings.DUITKU_MERCHANT_CODE
+  return {
+    "merchantCode": merchant_code,
+    "merchantOrderId": merchant_order_id,
+    "signature": signature(merchant_code, merchant_order_id, settings.DUITKU_API_KEY)
+  }
+
+def request_inquiry(payload):
+  """
+  POST /webapi/api/merchant/v2/inquiry
+  Return (http_status, response_json).
+  """
+  return _post("/webapi/api/merchant/v2/inquiry", payload)
+
+def request_transaction_status(merchant_order_id):
+  """
+  POST /webapi/api/merchant/transactionStatus
+  Return response_json.
+  """
+  _, data = _post("/webapi/api/merchant/transactionStatus", _status_payload(merchant_order_id))
+  return data
+
+async def arequest_inquiry(payload):
+  """Versi async request_inquiry (httpx), untuk view ASGI."""
+  return await _apost("/webapi/api/merchant/v2/inquiry", payload)
+
+async def arequest_transaction_status(merchant_order_id):
+  """Versi async request_transaction_status (httpx), untuk view ASGI."""
+  _, data = await _apost("/webapi/api/merchant/transactionStatus", _status_payload(merchant_order_id))
+  return data
@@ -0,0 +1,174 @@
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib import error as urlerror, parse, request as urlrequest
+
+from api.utils.duitku import signature
+
+# Pengganti Duitku untuk load test lokal (jangan dipakai di produksi).
+# Mendukung /inquiry dan /transactionStatus, lalu mengirim callback ke app seperti Duitku:
+# latency, error rate, dan timing callback bisa diatur.
+
+INQUIRY_PATH = '/webapi/api/merchant/v2/inquiry'
+STATUS_PATH = '/webapi/api/merchant/transactionStatus'
+
+
+class DuitkuStub:
+  def __init__(self, callback_url, merchant_code, api_key, host='127.0.0.1', port=8765,
+               latency_ms=50, jitter_ms=20, error_rate=0.0, fail_rate=0.0, drop_callback_rate=0.0,
+               callback_delay_ms=1500, callback_jitter_ms=500, seed=None):
+    self.callback_url = callback_url
+    self.merchant_code = merchant_code
+    self.api_key = api_key
+    self.host = host
+    self.port = port
+    self.latency_ms = latency_ms
+    self.jitter_ms = jitter_ms
+    self.error_rate = error_rate
+    self.fail_rate = fail_rate
+    self.drop_callback_rate = drop_callback_rate
+    self.callback_delay_ms = callback_delay_ms
+    self.callback_jitter_ms = callback_jitter_ms
+
+    self.rng = random.Random(seed)
+    self.lock = threading.Lock()
+    self.orders = {}  # merchant_order_id -> {'amount', 'result', 'settle_at'}
+    self.stats = {
+      'inquiries': 0, 'inquiry_errors': 0, 'status_checks': 0,
+      'callbacks_sent': 0, 'callbacks_failed': 0, 'callbacks_dropped': 0,
+    }
+    self.server = None
+
+  @property
+  def url(self):
+    return f'http://{self.host}:{self.server.server_port if self.server else self.port}'
+
+  def count(self, key):
+    with self.lock:
+      self.stats[key] += 1
+
+  def chance(self, rate):
+    with self.lock:
+      return self.rng.random() < rate
+
+  def delay(self, base_ms, jitter_ms):
+    with self.lock:
+      return max(0.0, base_ms + self.rng.uniform(-jitter_ms, jitter_ms)) / 1000
+
+  def inquiry(self, payload):
+    self.count('inquiries')
+    if self.chance(self.error_rate):
+      self.count('inquiry_errors')
+      if self.chance(0.5):
+        return 500, {'Message': 'Stub: internal server error'}
+      return 400, {'Message': 'Stub: payment channel not available'}
+
+    merchant_order_id = payload.get('merchantOrderId')
+    amount = payload.get('paymentAmount')
+    result = '02' if self.chance(self.fail_rate) else '00'
+    settle_in = self.delay(self.callback_delay_ms, self.callback_jitter_ms)
+    with self.lock:
+      self.orders[merchant_order_id] = {'amount': amount, 'result': result, 'settle_at': time.monotonic() + settle_in}
+
+    if self.chance(self.drop_callback_rate):
+      # Callback hilang: app hanya tahu lewat polling transactionStatus
+      self.count('callbacks_dropped')
+    else:
+      timer = threading.Timer(settle_in, self.send_callback, args=(merchant_order_id, amount, result))
+      timer.daemon = True
+      timer.start()
+
+    reference = f'STUB{uuid.uuid4().hex[:12].upper()}'
+    return 200, {
+      'merchantCode': self.merchant_code,
+      'reference': reference,
+      'paymentUrl': f'{self.url}/pay/{reference}',
+      'vaNumber': '' if payload.get('paymentMethod') == 'SP' else f'7007{self.rng.randrange(10 ** 11):011d}',
+      'qrString': f'00020101021226STUB{reference}' if payload.get('paymentMethod') == 'SP' else '',
+      'amount': str(amount),
+      'statusCode': '00',
+      'statusMessage': 'SUCCESS',
+    }
+
+  def transaction_status(self, payload):
+    self.count('status_checks')
+    merchant_order_id = payload.get('merchantOrderId')
+    with self.lock:
+      order = self.orders.get(merchant_order_id)
+    if order is None:
+      return 400, {'Message': 'Stub: order not found'}
+
+    settled = time.monotonic() >= order['settle_at']
+    return 200, {
+      'merchantOrderId': merchant_order_id,
+      'reference': '',
+      'amount': str(order['amount']),
+      'statusCode': order['result'] if settled else '01',
+      'statusMessage': 'SUCCESS' if settled and order['result'] == '00' else 'PROCESS' if not settled else 'FAILED',
+    }
+
+  def send_callback(self, merchant_order_id, amount, result):
+    # Duitku mengirim callback sebagai form-urlencoded
+    body = parse.urlencode({
+      'merchantCode': self.merchant_code,
+      'amount': amount,
+      'merchantOrderId': merchant_order_id,
+      'resultCode': result,
+      'reference': f'STUB-{merchant_order_id}',
+      'signature': signature(self.merchant_code, amount, merchant_order_id, self.api_key),
+    }).encode()
+    req = urlrequest.Request(self.callback_url, data=body, method='POST',
+                             headers={'Content-Type': 'application/x-www-form-urlencoded'})
+    try:
+      with urlrequest.urlopen(req, timeout=30) as response:
+        response.read()
+      self.count('callbacks_sent')
+    except (urlerror.URLError, OSError):
+      self.count('callbacks_failed')
+
+  def handler(self):
+    stub = self
+
+    class Handler(BaseHTTPRequestHandler):
+      def do_POST(self):
+        try:
+          payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+        except ValueError:
+          payload = None
+
+        time.sleep(stub.delay(stub.latency_ms, stub.jitter_ms))
+        if payload is None:
+          status_code, data = 400, {'Message': 'Stub: invalid JSON'}
+        elif self.path == INQUIRY_PATH:
+          status_code, data = stub.inquiry(payload)
+        elif self.path == STATUS_PATH:
+          status_code, data = stub.transaction_status(payload)
+        else:
+          status_code, data = 404, {'Message': 'Stub: unknown endpoint'}
+
+        body = json.dumps(data).encode()
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+      def log_message(self, format, *args):
+        pass
+
+    return Handler
+
+  def start(self):
+    """Jalankan server di thread background; return URL untuk DUITKU_BASE_URL."""
+    self.server = ThreadingHTTPServer((self.host, self.port), self.handler())
+    self.server.daemon_threads = True
+    threading.Thread(target=self.server.serve_forever, daemon=True).start()
+    return self.url
+
+  def stop(self):
+    if self.server is not None:
+      self.server.shutdown()
+      self.server.server_close()
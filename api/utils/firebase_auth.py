@@ -1,58 +1,124 @@
-
 import os
 import json
-import firebase_admin
-from firebase_admin import credentials, auth
+import hashlib
+import logging
+import threading
+import time
 from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from datetime import timedelta
+
+# Credentials: env FIREBASE_SERVICE_ACCOUNT (Vercel) atau 'serviceAccountKey.json' di project root
+# firebase_admin di-import saat token pertama diminta, bukan saat cold start
+logger = logging.getLogger(__name__)
+
+# Custom token Firebase berlaku 1 jam; cache sampai sedikit sebelum kadaluarsa
+TOKEN_LIFETIME_SECONDS = 3600
+TOKEN_REFRESH_MARGIN_SECONDS = 300
+
+_app = None
+_init_lock = threading.Lock()
+# Setelah inisialisasi gagal (credentials belum terbaca, error sementara), coba lagi setelah jeda ini
+INIT_RETRY_SECONDS = 30
+_retry_at = 0.0
+
+def _load_credentials():
+  from firebase_admin import credentials
+
+  # 1. Try Environment Variable (For Vercel)
+  firebase_json = os.getenv('FIREBASE_SERVICE_ACCOUNT')
+  if firebase_json:
+    try:
+      return credentials.Certificate(json.loads(firebase_json)), 'environment variable'
+    except Exception:
+      logger.exception('Failed to load FIREBASE_SERVICE_ACCOUNT content')
+
+  # 2. Try Local File
+  cred_path = os.path.join(settings.BASE_DIR, 'serviceAccountKey.json')
+  if os.path.exists(cred_path):
+    return credentials.Certificate(cred_path), cred_path
 
-# Initialize Firebase App
-# Ensure 'serviceAccountKey.json' is in your project root or specified path
-LOG_TAG = "[FirebaseAuth]"
+  return None, None
 
 def initialize_firebase():
-  try:
-    if not firebase_admin._apps:
-      # 1. Try Environment Variable (For Vercel)
-      firebase_json = os.getenv('FIREBASE_SERVICE_ACCOUNT')
-      
-      if firebase_json:
-          try:
-              cred_dict = json.loads(firebase_json)
-              cred = credentials.Certificate(cred_dict)
-              firebase_admin.initialize_app(cred)
-              print(f"{LOG_TAG} Initialized successfully using Environment Variable.")
-              return
-          except Exception as e:
-              print(f"{LOG_TAG} Failed to load env var content: {e}")
-
-      # 2. Try Local File
-      base_dir = settings.BASE_DIR
-      cred_path = os.path.join(base_dir, 'serviceAccountKey.json')
-      
-      if os.path.exists(cred_path):
-        cred = credentials.Certificate(cred_path)
-        firebase_admin.initialize_app(cred)
-        print(f"{LOG_TAG} Initialized successfully using {cred_path}")
+  """
+  Inisialisasi Firebase Admin SDK sekali per proses (lazy, thread-safe).
+  Return app Firebase, atau None bila credentials tidak tersedia. Kegagalan tidak disimpan
+  permanen: percobaan berikutnya dilakukan setelah INIT_RETRY_SECONDS.
+  """
+  global _app, _retry_at
+  if _app is not None:
+    return _app
+
+  with _init_lock:
+    if _app is not None or time.monotonic() < _retry_at:
+      return _app
+
+    import firebase_admin
+
+    try:
+      if firebase_admin._apps:
+        _app = firebase_admin.get_app()
       else:
-        print(f"{LOG_TAG} Warning: serviceAccountKey.json not found. Set FIREBASE_SERVICE_ACCOUNT env var or add file.")
-  except Exception as e:
-    print(f"{LOG_TAG} Initialization error: {str(e)}")
-    import traceback
-    traceback.print_exc()
+        cred, source = _load_credentials()
+        if cred is None:
+          logger.warning('serviceAccountKey.json not found. Set FIREBASE_SERVICE_ACCOUNT env var or add file.')
+        else:
+          _app = firebase_admin.initialize_app(cred)
+          logger.info('Firebase initialized using %s', source)
+    except Exception:
+      logger.exception('Firebase initialization error')
+
+    if _app is None:
+      _retry_at = time.monotonic() + INIT_RETRY_SECONDS
+    return _app
+
+def _token_cache_key(uid, additional_claims):
+  claims = json.dumps(additional_claims or {}, sort_keys=True, default=str)
+  return 'firebase:token:' + hashlib.sha256(f'{uid}:{claims}'.encode()).hexdigest()
+
+def mint_custom_token(user_id, additional_claims=None):
+  """
+  Custom token untuk user_id + claims, di-cache per (user, claims) sampai
+  TOKEN_REFRESH_MARGIN_SECONDS sebelum kadaluarsa. POS dan KDS dari login yang
+  sama mendapat token yang sama.
+  Return {'token': ..., 'expires_at': ...} atau None bila gagal.
+  """
+  # User ID must be a string
+  uid = str(user_id)
+  key = _token_cache_key(uid, additional_claims)
+
+  cached = cache.get(key)
+  if cached is not None:
+    return cached
+
+  app = initialize_firebase()
+  if app is None:
+    return None
+
+  from firebase_admin import auth
+
+  try:
+    custom_token = auth.create_custom_token(uid, additional_claims, app=app)
+  except Exception:
+    logger.exception('Error minting token for %s', uid)
+    return None
+
+  # In newer python SDK, create_custom_token returns bytes, we decode to string
+  if isinstance(custom_token, bytes):
+    custom_token = custom_token.decode('utf-8')
+
+  minted = {
+    'token': custom_token,
+    'expires_at': timezone.now() + timedelta(seconds=TOKEN_LIFETIME_SECONDS),
+  }
+  cache.set(key, minted, TOKEN_LIFETIME_SECONDS - TOKEN_REFRESH_MARGIN_SECONDS)
+  return minted
 
 def create_custom_token(user_id, additional_claims=None):
   """
   Mint a custom token for the given user_id.
   """
-  initialize_firebase()
-  try:
-    # User ID must be a string
-    uid = str(user_id)
-    custom_token = auth.create_custom_token(uid, additional_claims)
-    # In newer python SDK, create_custom_token returns bytes, we decode to string
-    if isinstance(custom_token, bytes):
-      return custom_token.decode('utf-8')
-    return custom_token
-  except Exception as e:
-    print(f"{LOG_TAG} Error minting token: {str(e)}")
-    return None
\ No newline at end of file
+  minted = mint_custom_token(user_id, additional_claims)
+  return minted['token'] if minted else None
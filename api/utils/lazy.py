@@ -0,0 +1,30 @@
+from django.utils.module_loading import import_string
+
+def lazy_view(dotted_path, is_async=False):
+  """
+  URL callback yang baru meng-import view-nya saat request pertama.
+  Cold start serverless tidak perlu memuat semua modul view (dan dependensinya).
+  Class-based view otomatis di-.as_view().
+  View `async def` harus ditandai is_async=True supaya Django memanggilnya sebagai coroutine.
+  """
+  view = None
+
+  def resolve():
+    nonlocal view
+    if view is None:
+      target = import_string(dotted_path)
+      view = target.as_view() if isinstance(target, type) else target
+    return view
+
+  if is_async:
+    async def wrapper(request, *args, **kwargs):
+      return await resolve()(request, *args, **kwargs)
+  else:
+    def wrapper(request, *args, **kwargs):
+      return resolve()(request, *args, **kwargs)
+
+  # Semua view API adalah view DRF yang sudah csrf_exempt; middleware CSRF
+  # memeriksa atribut ini pada callback hasil resolve (wrapper ini)
+  wrapper.csrf_exempt = True
+  wrapper.view_path = dotted_path
+  return wrapper
@@ -0,0 +1,131 @@
+from operator import itemgetter
+
+from django.db import models
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+# Sparse fieldset untuk endpoint baca: ?fields=id,name,price atau ?exclude=description,cost.
+# Field yang dipilih diturunkan ke SQL (.values_list() / .only() / kolom SELECT) sehingga kolom lain tidak diambil.
+# ValuesReader = jalur baca tanpa ModelSerializer: output sama dengan ModelSerializer fields='__all__'
+# (Decimal -> string, datetime -> waktu lokal ISO 8601, file -> URL), tanpa objek model & field per baris.
+
+
+def parse_fieldset(request, available, default=None):
+  """
+  Field yang diminta, urut sesuai `available`. Tanpa parameter -> `default` (atau semua field).
+  Field yang tidak dikenal -> 400.
+  """
+  requested = request.GET.get('fields')
+  excluded = request.GET.get('exclude')
+  if not requested and not excluded:
+    return list(default if default is not None else available)
+
+  requested = [name.strip() for name in requested.split(',') if name.strip()] if requested else None
+  excluded = [name.strip() for name in excluded.split(',') if name.strip()] if excluded else []
+  unknown = sorted(set(requested or ()).union(excluded) - set(available))
+  if unknown:
+    raise ValidationError({'message': f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(available)}"})
+
+  selected = [name for name in available if (requested is None or name in requested) and name not in excluded]
+  if not selected:
+    raise ValidationError({'message': 'No fields selected'})
+  return selected
+
+
+def only_fields(queryset, fields, related=None):
+  """
+  .only() untuk field model yang diminta. related: {nama field serializer: lookup relasi}
+  (mis. {'transaction_number': 'transaction__transaction_number'}) -> ikut select_related.
+  """
+  concrete = {field.name for field in queryset.model._meta.concrete_fields}
+  columns = [name for name in fields if name in concrete]
+  for name in fields:
+    if related and name in related:
+      columns.append(related[name])
+      queryset = queryset.select_related(related[name].rsplit('__', 1)[0])
+  return queryset.only(*columns)
+
+
+def _decimal(value):
+  # DecimalField DRF (COERCE_DECIMAL_TO_STRING): kolom numeric sudah ber-skala, cukup format tanpa eksponen
+  return None if value is None else f'{value:f}'
+
+
+def _datetime(value):
+  if value is None:
+    return None
+  value = timezone.localtime(value).isoformat()
+  return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+
+def _date(value):
+  return None if value is None else value.isoformat()
+
+
+def _file_url(field):
+  storage = field.storage
+
+  def url(name):
+    return storage.url(name) if name else None
+  return url
+
+
+def converter(field):
+  if isinstance(field, models.DecimalField):
+    return _decimal
+  if isinstance(field, models.DateTimeField):
+    return _datetime
+  if isinstance(field, models.DateField):
+    return _date
+  if isinstance(field, models.FileField):
+    return _file_url(field)
+  return None
+
+
+class ValuesReader:
+  """
+  Baca model sebagai list dict lewat satu values_list() berisi kolom yang diminta saja.
+  extra: field turunan setelah id, seperti declared field serializer:
+    {'category_name': 'category__name'} atau {'cashier_name': (('cashier__first_name', 'cashier__last_name'), fungsi)}
+  fields: batasi & urutkan field (default: id, extra, kolom biasa, lalu FK sebagai id).
+  """
+
+  def __init__(self, model, extra=None, fields=None):
+    pk = model._meta.pk.name
+    concrete = {field.name: field for field in model._meta.concrete_fields}
+    self.specs = {}  # nama -> (lookups, fungsi gabung atau None, converter atau None)
+    for name, field in concrete.items():
+      self.specs[name] = ((name,), None, None if field.is_relation else converter(field))
+    for name, spec in (extra or {}).items():
+      lookups, combine = ((spec,), None) if isinstance(spec, str) else spec
+      self.specs[name] = (tuple(lookups), combine, None)
+
+    if fields is None:
+      plain = [name for name, field in concrete.items() if not field.is_relation and name != pk]
+      relations = [name for name, field in concrete.items() if field.is_relation]
+      fields = [pk, *(extra or {}), *plain, *relations]
+    self.fields = list(fields)
+
+  def _getters(self, names):
+    lookups = []
+    for name in names:
+      for lookup in self.specs[name][0]:
+        if lookup not in lookups:
+          lookups.append(lookup)
+
+    getters = []
+    for name in names:
+      spec_lookups, combine, convert = self.specs[name]
+      positions = [lookups.index(lookup) for lookup in spec_lookups]
+      if combine is not None:
+        get = (lambda positions, combine: lambda row: combine(*(row[i] for i in positions)))(positions, combine)
+      elif convert is not None:
+        get = (lambda i, convert: lambda row: convert(row[i]))(positions[0], convert)
+      else:
+        get = itemgetter(positions[0])
+      getters.append((name, get))
+    return lookups, getters
+
+  def read(self, queryset, names=None):
+    lookups, getters = self._getters(names or self.fields)
+    return [{name: get(row) for name, get in getters} for row in queryset.values_list(*lookups)]
@@ -0,0 +1,160 @@
+import gzip
+import json
+from datetime import date
+from decimal import Decimal
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction as db_transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from api import transaction_cache
+from api.models import Transaction, TransactionItem, Payment, TransactionArchive
+from api.utils.dates import local_bounds, parse_date_param
+
+ARCHIVE_VERSION = 1
+TERMINAL_STATUSES = ['completed', 'cancelled']
+PAID_STATUSES = ['processing', 'completed']
+
+TRANSACTION_FIELDS = [
+  'id', 'transaction_number', 'cashier_id', 'customer_name', 'order_type', 'subtotal', 'tax',
+  'discount', 'takeaway_charge', 'total', 'payment_method', 'paid_amount', 'change_amount',
+  'status', 'notes', 'created_at', 'updated_at',
+]
+ITEM_FIELDS = ['transaction_id', 'product_id', 'product_name', 'quantity', 'price', 'cost', 'subtotal', 'notes']
+PAYMENT_FIELDS = [
+  'transaction_id', 'merchant_order_id', 'reference', 'payment_method', 'amount', 'status',
+  'status_code', 'paid_at', 'created_at',
+]
+DECIMAL_FIELDS = {'subtotal', 'tax', 'discount', 'takeaway_charge', 'total', 'paid_amount', 'change_amount', 'price', 'cost', 'amount'}
+DATETIME_FIELDS = {'created_at', 'updated_at', 'paid_at'}
+
+
+def month_start(value):
+  return value.replace(day=1)
+
+
+def next_month(period):
+  return date(period.year + (period.month == 12), period.month % 12 + 1, 1)
+
+
+def build_archive(cafe_id, period):
+  """
+  Kumpulkan transaksi satu bulan milik cafe menjadi dict siap diarsip.
+  Return None bila bulan tersebut masih punya transaksi yang belum final.
+  """
+  start, end = local_bounds(period, next_month(period))
+  transactions = Transaction.objects.filter(cafe_id=cafe_id, created_at__gte=start, created_at__lt=end)
+
+  if transactions.exclude(status__in=TERMINAL_STATUSES).exists():
+    return None
+
+  trx_rows = list(transactions.order_by('created_at').values(*TRANSACTION_FIELDS))
+  trx_ids = [row['id'] for row in trx_rows]
+  by_id = {row['id']: dict(row, items=[], payments=[]) for row in trx_rows}
+
+  for item in TransactionItem.objects.filter(transaction_id__in=trx_ids).order_by('id').values(*ITEM_FIELDS):
+    by_id[item.pop('transaction_id')]['items'].append(item)
+  for payment in Payment.objects.filter(transaction_id__in=trx_ids).order_by('id').values(*PAYMENT_FIELDS):
+    by_id[payment.pop('transaction_id')]['payments'].append(payment)
+
+  return {
+    'version': ARCHIVE_VERSION,
+    'cafe_id': cafe_id,
+    'period': period,
+    'transactions': list(by_id.values()),
+  }
+
+
+@db_transaction.atomic
+def archive_month(cafe_id, period):
+  """
+  Pindahkan transaksi satu bulan ke TransactionArchive lalu hapus dari tabel hot.
+  Penghapusan memakai QuerySet.delete() sehingga stok TIDAK dikembalikan.
+  Bila bulan itu sudah punya arsip (transaksi yang baru final setelah arsip pertama dibuat),
+  transaksi baru digabung ke isi arsip lama, tidak menimpanya.
+  """
+  payload = build_archive(cafe_id, period)
+  if payload is None or not payload['transactions']:
+    return None
+
+  # Bentuk JSON (Decimal/datetime jadi string) supaya sama dengan isi arsip lama
+  transactions = json.loads(json.dumps(payload['transactions'], cls=DjangoJSONEncoder))
+  trx_ids = [trx['id'] for trx in transactions]
+
+  # Dikunci sampai commit; dua proses yang sama-sama membuat arsip baru gagal di unique (cafe, period)
+  # dan seluruh blok di-rollback, jadi tidak ada transaksi yang terhapus tanpa tersimpan
+  archive = TransactionArchive.objects.select_for_update().filter(cafe_id=cafe_id, period=period).first()
+  if archive is None:
+    archive = TransactionArchive(cafe_id=cafe_id, period=period)
+  else:
+    new_ids = set(trx_ids)
+    archived = [trx for trx in _payload(archive)['transactions'] if trx['id'] not in new_ids]
+    transactions = sorted(archived + transactions, key=lambda trx: parse_datetime(trx['created_at']))
+
+  paid = [trx for trx in transactions if trx['status'] in PAID_STATUSES]
+  archive.transaction_count = len(transactions)
+  archive.item_count = sum(len(trx['items']) for trx in transactions)
+  archive.total_sales = sum((Decimal(trx['total']) for trx in paid), Decimal('0.00'))
+  payload['transactions'] = transactions
+  archive.data = gzip.compress(json.dumps(payload, cls=DjangoJSONEncoder).encode('utf-8'))
+  archive.save()
+
+  Transaction.objects.filter(id__in=trx_ids).delete()
+  transaction_cache.invalidate(cafe_id, *trx_ids)
+  return archive
+
+
+def _payload(archive):
+  return json.loads(gzip.decompress(bytes(archive.data)))
+
+
+def _restore_types(row):
+  for key, value in row.items():
+    if value is None:
+      continue
+    if key in DECIMAL_FIELDS:
+      row[key] = Decimal(value)
+    elif key in DATETIME_FIELDS:
+      row[key] = parse_datetime(value)
+  return row
+
+
+def load_archive(archive):
+  """
+  Decompress arsip dan kembalikan list transaksi (Decimal & datetime dipulihkan).
+  """
+  transactions = _payload(archive)['transactions']
+  for trx in transactions:
+    _restore_types(trx)
+    for item in trx['items']:
+      _restore_types(item)
+    for payment in trx['payments']:
+      _restore_types(payment)
+  return transactions
+
+
+def archived_transactions(cafe_id, start_date=None, end_date=None, statuses=None):
+  """
+  Iterasi transaksi dari arsip cafe dalam rentang tanggal lokal [start_date, end_date].
+  """
+  start_date = parse_date_param(start_date, 'start_date')
+  end_date = parse_date_param(end_date, 'end_date')
+
+  archives = TransactionArchive.objects.filter(cafe_id=cafe_id).order_by('period')
+  if start_date:
+    archives = archives.filter(period__gte=month_start(start_date))
+  if end_date:
+    archives = archives.filter(period__lte=end_date)
+
+  for archive in archives:
+    for trx in load_archive(archive):
+      local_date = timezone.localtime(trx['created_at']).date()
+      if start_date and local_date < start_date:
+        continue
+      if end_date and local_date > end_date:
+        continue
+      if statuses and trx['status'] not in statuses:
+        continue
+      yield trx
+
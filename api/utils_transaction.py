@@ -1,16 +1,12 @@
+from django.db import transaction as db_transaction
 from django.utils import timezone
 from api.models import Transaction, Payment
+from api import events, outbox, transaction_cache
+from api.db_router import use_primary, pin_primary
+from api.stock import restore_stock
 
-def restore_stock(transaction):
-  """
-  Helper untuk mengembalikan stok produk saat transaksi dibatalkan.
-  """
-  for item in transaction.items.all():
-    product = item.product
-    product.stock += item.quantity
-    product.save()
-
-def cleanup_expired_transactions(cafe):
+@use_primary() # Hasil read dipakai untuk menulis, jadi selalu dari primary
+def cleanup_expired_transactions(cafe_id):
   """
   Cari pembayaran yang statusnya pending DAN sudah lewat waktu expirednya.
   Restore stock dan set status jadi cancelled/expired.
@@ -23,25 +19,39 @@ def cleanup_expired_transactions(cafe):
   )
   
   # Filter by cafe strictly to enforce multi-tenancy
-  query = query.filter(transaction__cafe=cafe)
+  query = query.filter(transaction__cafe_id=cafe_id)
   
   expired_payments_qs = query
   
   if expired_payments_qs.exists():
-    # Ambil transaksi yang terkait
-    expired_trx_ids = list(expired_payments_qs.values_list('transaction_id', flat=True))
-    expired_transactions = Transaction.objects.filter(id__in=expired_trx_ids)
+    # Pembatalan + outbox dalam satu transaksi DB (BEGIN hanya bila memang ada yang expired)
+    with db_transaction.atomic():
+      # Ambil transaksi yang terkait
+      expired = list(expired_payments_qs.values_list('id', 'transaction_id'))
+      expired_trx_ids = [trx_id for _, trx_id in expired]
+      expired_transactions = list(Transaction.objects.filter(id__in=expired_trx_ids).exclude(status='cancelled'))
     
-    # 1. Restore Stock for EACH transaction
-    for trx in expired_transactions:
-      if trx.status != 'cancelled':
-        restore_stock(trx)
+      # 1. Restore stock semua transaksi sekaligus (satu UPDATE, dijumlahkan per produk)
+      pushed = [outbox.stock_updates(restore_stock(trx.id for trx in expired_transactions))]
+      for trx in expired_transactions:
+        pushed.append(outbox.order_update(trx, 'cancelled'))
+        events.publish_transaction(cafe_id, trx.id, 'cancelled')
     
-    # 2. Update status Payment jadi 'expired'
-    expired_payments_qs.update(status='expired')
+      # 2. Update status Payment jadi 'expired'
+      # (QuerySet.update() tidak menyentuh auto_now, updated_at diisi manual)
+      expired_payments_qs.update(status='expired', updated_at=now)
     
-    # 3. Update status Transaction jadi 'cancelled'
-    Transaction.objects.filter(id__in=expired_trx_ids).update(status='cancelled')
+      # 3. Update status Transaction jadi 'cancelled'
+      Transaction.objects.filter(id__in=expired_trx_ids).update(status='cancelled', updated_at=now)
+      transaction_cache.invalidate(cafe_id, *expired_trx_ids)
+
+      for payment_id, trx_id in expired:
+        pushed.append(outbox.payment_update(payment_id, trx_id, 'expired'))
+        events.publish_payment(cafe_id, payment_id, trx_id, 'expired')
+      outbox.enqueue(cafe_id, *pushed)
+
+    # Replica belum tentu melihat pembatalan ini, sisa request baca dari primary
+    pin_primary()
     
     return len(expired_trx_ids)
   return 0
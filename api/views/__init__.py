@@ -1,9 +0,0 @@
-from .auth import LogoutView, get_all_users, create_user, change_password, get_update_delete_user, FirebaseTokenView
-from .product import (
-    get_all_categories, create_category, get_update_delete_category,
-    create_product, search_products, get_all_products, get_update_delete_product
-)
-from .transaction import (
-    create_transaction, get_update_delete_transaction, list_transactions,
-    create_payment, payment_callback, get_payment_status, cancel_transaction
-)
@@ -0,0 +1,156 @@
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework import serializers, status
+from rest_framework.exceptions import ValidationError
+import logging
+
+from api.models import Transaction, Payment, Product
+from api.serializer import PaymentSerializer, CreatePaymentSerializer, ProductSerializer
+from api.utils import duitku
+from api.utils.async_api import async_api_view
+from api.query_budget import query_budget
+from api.utils.cloudinary_upload import aupload_image, CloudinaryUploadError
+from api.utils.firebase_auth import mint_custom_token
+from api.utils.sparse import only_fields, parse_fieldset
+from api.views.auth import firebase_claims
+from api.views.transaction import build_duitku_inquiry, build_duitku_payment, apply_duitku_status, PAYMENT_RELATED
+
+# Versi async (ASGI) dari endpoint yang menunggu I/O eksternal (Duitku, Firebase, Cloudinary).
+# Selama menunggu gateway, worker tetap melayani request lain; endpoint sync tetap tersedia.
+
+logger = logging.getLogger(__name__)
+
+
+@async_api_view(['POST'])
+@query_budget(3)
+async def create_payment_async(request):
+  """
+  Membuat pembayaran baru via Duitku (async)
+  POST /api/async/payment/create/
+  """
+  serializer = CreatePaymentSerializer(data=request.data)
+  if not serializer.is_valid():
+    return serializer.errors, status.HTTP_400_BAD_REQUEST
+  data = serializer.validated_data
+
+  try:
+    trx = await Transaction.objects.aget(id=data['transaction_id'], cafe_id=request.user.cafe_id)
+  except Transaction.DoesNotExist:
+    return {'message': 'Transaction not found'}, status.HTTP_404_NOT_FOUND
+
+  # Check existing
+  if await Payment.objects.filter(transaction=trx, status='success').aexists():
+    return {'message': 'Transaction already paid'}, status.HTTP_400_BAD_REQUEST
+
+  payment_method = data.get('payment_method', 'SP')
+  try:
+    # Tidak ada transaksi DB yang terbuka selama menunggu Duitku
+    merchant_order_id, amount, payload = build_duitku_inquiry(trx, payment_method)
+    status_code, response_data = await duitku.arequest_inquiry(payload)
+    payment = build_duitku_payment(trx, payment_method, merchant_order_id, amount, status_code, response_data)
+    await payment.asave()
+  except Exception as e:
+    return {
+      'message': 'Failed to create payment',
+      'error': str(e)
+    }, status.HTTP_400_BAD_REQUEST
+
+  return {
+    'message': 'Payment created successfully',
+    'data': {
+      'payment_id': payment.id,
+      'transaction_id': trx.id,
+      'merchant_order_id': payment.merchant_order_id,
+      'payment_url': payment.payment_url,
+      'amount': payment.amount,
+      'qr_string': payment.qr_string,
+      'va_number': payment.va_number,
+    }
+  }, status.HTTP_201_CREATED
+
+
+@async_api_view(['GET'])
+@query_budget(7)
+async def get_payment_status_async(request, payment_id):
+  """
+  Cek status pembayaran (async)
+  GET /api/async/payment/status/<payment_id>/?realtime=true
+  """
+  check_realtime = request.GET.get('realtime', 'false').lower() == 'true'
+  try:
+    fields = parse_fieldset(request, list(PaymentSerializer().fields))
+  except ValidationError as e:
+    return e.detail, status.HTTP_400_BAD_REQUEST
+
+  payments = Payment.objects.filter(id=payment_id, transaction__cafe_id=request.user.cafe_id)
+  if check_realtime:
+    payments = payments.select_related('transaction')
+  else:
+    payments = only_fields(payments, fields, PAYMENT_RELATED)
+  try:
+    payment = await payments.aget()
+  except Payment.DoesNotExist:
+    return {'message': 'Payment not found'}, status.HTTP_404_NOT_FOUND
+
+  if check_realtime and payment.status == 'pending':
+    try:
+      response_data = await duitku.arequest_transaction_status(payment.merchant_order_id)
+      # Tulis status, stok, outbox & event dalam satu transaksi DB (tidak bisa di ORM async)
+      payment = await sync_to_async(apply_duitku_status)(payment, response_data)
+    except duitku.DuitkuError:
+      pass
+
+  return {
+    'message': 'Success',
+    'data': PaymentSerializer(payment, fields=fields).data
+  }
+
+
+@async_api_view(['POST'])
+@query_budget(0)
+async def firebase_token_async(request):
+  """
+  Generate Custom Firebase Token (async)
+  POST /api/async/auth/firebase-token/
+  """
+  mint = sync_to_async(mint_custom_token, thread_sensitive=False)
+  minted = await mint(request.user.id, firebase_claims(request.user.role, request.user.cafe_id))
+  if minted:
+    return minted
+
+  logger.error('Firebase token generation failed for user %s', request.user.id)
+  return {'error': 'Failed to generate token'}, status.HTTP_500_INTERNAL_SERVER_ERROR
+
+
+@async_api_view(['POST'])
+@query_budget(2)
+async def upload_product_image_async(request, product_id):
+  """
+  Upload gambar produk ke Cloudinary (async)
+  POST /api/async/product/<product_id>/image/ (multipart, field: image)
+  """
+  if request.user.role != 'owner' and not request.user.is_superuser:
+    return {'message': 'You do not have permission'}, status.HTTP_403_FORBIDDEN
+
+  try:
+    product = await Product.objects.select_related('category') \
+                                   .aget(id=product_id, cafe_id=request.user.cafe_id)
+  except Product.DoesNotExist:
+    return {'message': 'Product not found'}, status.HTTP_404_NOT_FOUND
+
+  try:
+    image = serializers.ImageField().run_validation(request.FILES.get('image'))
+  except (serializers.ValidationError, DjangoValidationError) as e:
+    return {'message': 'Invalid image', 'errors': {'image': getattr(e, 'detail', e.messages)}}, status.HTTP_400_BAD_REQUEST
+
+  try:
+    product.image.name = await aupload_image(image, Product._meta.get_field('image').upload_to)
+  except CloudinaryUploadError as e:
+    return {'message': 'Failed to upload image', 'error': str(e)}, status.HTTP_502_BAD_GATEWAY
+
+  await product.asave(update_fields=['image', 'updated_at'])
+
+  return {
+    'message': 'Product image has been updated',
+    'data': ProductSerializer(product).data
+  }
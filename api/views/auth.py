@@ -8,12 +8,23 @@ from rest_framework_simplejwt.exceptions import TokenError, InvalidToken
 
 from django.db import connection, transaction
 from django.contrib.auth.hashers import make_password, check_password
+import logging
 import uuid
 
 # Import models & serializers from parent 'api' package
 from api.serializer import CreateUserSerializer
 from api.models import User
-from api.utils.firebase_auth import create_custom_token
+from api.utils.firebase_auth import mint_custom_token
+from api.authentication import invalidate_cached_user
+from api.query_budget import query_budget
+
+logger = logging.getLogger(__name__)
+
+def firebase_claims(role, cafe_id):
+  return {
+    'role': role,
+    'cafe_id': str(cafe_id) if cafe_id else None
+  }
 
 class LogoutView(APIView):
   """
@@ -23,6 +34,7 @@ class LogoutView(APIView):
     "refresh": "refresh_token_here"
   }
   """
+  @query_budget(5)
   def post(self, request):
     refresh_token = request.data.get("refresh")
     if not refresh_token:
@@ -44,31 +56,20 @@ class FirebaseTokenView(APIView):
   """
   Generate Custom Firebase Token for authenticated users.
   POST /api/auth/firebase-token/
+  Token di-cache per (user, role, cafe_id) sampai sesaat sebelum kadaluarsa.
   """
 
+  @query_budget(0)
   def post(self, request):
-    user = request.user
-    print(f"[FirebaseTokenView] Request from User: {user.username} (ID: {user.id})")
-    
-    claims = {
-      'role': user.role,
-      'cafe_id': str(user.cafe.id) if user.cafe else None
-    }
-    print(f"[FirebaseTokenView] Generating token with claims: {claims}")
-    
-    try:
-      token = create_custom_token(user.id, claims)
-      if token:
-        print(f"[FirebaseTokenView] Token generated successfully for {user.username}")
-        return Response({'token': token}, status=status.HTTP_200_OK)
-      else:
-        print(f"[FirebaseTokenView] Token generation FAILED (None returned)")
-        return Response({'error': 'Failed to generate token'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-    except Exception as e:
-      print(f"[FirebaseTokenView] EXCEPTION: {e}")
-      return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-      
+    minted = mint_custom_token(request.user.id, firebase_claims(request.user.role, request.user.cafe_id))
+    if minted:
+      return Response(minted, status=status.HTTP_200_OK)
+
+    logger.error('Firebase token generation failed for user %s', request.user.id)
+    return Response({'error': 'Failed to generate token'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 @api_view(['GET'])
+@query_budget(1)
 def get_all_users(request):
   """
   Mendapatkan semua user (Admin Only)
@@ -82,9 +83,9 @@ def get_all_users(request):
   # Filter by Cafe for Multi-Tenancy (Future Phase 2 scope, but scoped user list is good)
   # For now, admin sees all users in their cafe
   with connection.cursor() as cursor:
-    if request.user.cafe:
+    if request.user.cafe_id:
       cursor.execute("SELECT id, username, email, first_name, last_name, role, phone, is_active, date_joined, last_login FROM users \
-                    WHERE cafe_id = %s ORDER BY date_joined DESC", [request.user.cafe.id])
+                    WHERE cafe_id = %s ORDER BY date_joined DESC", [request.user.cafe_id])
     elif request.user.is_superuser:
       # Super admin fallback
       cursor.execute("SELECT id, username, email, first_name, last_name, role, phone, is_active, date_joined, last_login, cafe_id FROM users \
@@ -101,6 +102,7 @@ def get_all_users(request):
 @api_view(['POST'])
 @transaction.atomic
 @permission_classes([AllowAny])
+@query_budget(5)
 def create_user(request):
   """
   Membuat user baru
@@ -143,8 +145,8 @@ def create_user(request):
     
     if request.user and request.user.is_authenticated:
       # Add Staff Mode: Inherit Cafe
-      if request.user.cafe:
-        cafe_id = request.user.cafe.id
+      if request.user.cafe_id:
+        cafe_id = request.user.cafe_id
     else:
       # Signup Mode (New Owner)
       cafe_name = data.get('cafe_name')
@@ -179,6 +181,7 @@ def create_user(request):
 
 @api_view(['POST'])
 @transaction.atomic
+@query_budget(2)
 def change_password(request, user_id):
   """
   Change password dengan verifikasi password lama
@@ -231,12 +234,14 @@ def change_password(request, user_id):
       SET password = %s, updated_at = NOW()
       WHERE id = %s
     """, [new_hashed_password, user_id])
+  invalidate_cached_user(user_id)
   
   return Response({
     'message': 'Password berhasil diubah'
   }, status=status.HTTP_200_OK)
 
 @api_view(['GET', 'PATCH', 'DELETE'])
+@query_budget(2)
 def get_update_delete_user(request, user_id):
   """
   Mendapatkan, mengupdate, atau menghapus user berdasarkan ID
@@ -250,9 +255,9 @@ def get_update_delete_user(request, user_id):
 
     with connection.cursor() as cursor:
       # Secure: Filter by ID AND Cafe (unless global admin logic changes)
-      if request.user.cafe:
+      if request.user.cafe_id:
         cursor.execute("SELECT username, email, first_name, last_name, role, phone, is_active, date_joined, last_login, cafe_id \
-          FROM users WHERE id = %s AND cafe_id = %s", (user_id, request.user.cafe.id))
+          FROM users WHERE id = %s AND cafe_id = %s", (user_id, request.user.cafe_id))
       elif request.user.is_superuser:
         cursor.execute("SELECT username, email, first_name, last_name, role, phone, is_active, date_joined, last_login, cafe_id \
           FROM users WHERE id = %s", (user_id,))
@@ -320,8 +325,8 @@ def get_update_delete_user(request, user_id):
         """
 
     with connection.cursor() as cursor:
-      if request.user.cafe:
-        cursor.execute("SELECT id FROM users WHERE id = %s AND cafe_id = %s", [user_id, request.user.cafe.id])
+      if request.user.cafe_id:
+        cursor.execute("SELECT id FROM users WHERE id = %s AND cafe_id = %s", [user_id, request.user.cafe_id])
       elif request.user.is_superuser:
         cursor.execute("SELECT id FROM users WHERE id = %s", [user_id])
       else:
@@ -336,6 +341,7 @@ def get_update_delete_user(request, user_id):
 
       columns = [col[0] for col in cursor.description]
       user_data = dict(zip(columns, cursor.fetchone()))
+    invalidate_cached_user(user_id)
 
     return Response({
         'message': 'User has been updated',
@@ -344,8 +350,8 @@ def get_update_delete_user(request, user_id):
   
   elif request.method == 'DELETE':
     with connection.cursor() as cursor:
-      if request.user.cafe:
-        cursor.execute("SELECT id FROM users WHERE id = %s AND cafe_id = %s", [user_id, request.user.cafe.id])
+      if request.user.cafe_id:
+        cursor.execute("SELECT id FROM users WHERE id = %s AND cafe_id = %s", [user_id, request.user.cafe_id])
       elif request.user.is_superuser:
         cursor.execute("SELECT id FROM users WHERE id = %s", [user_id])
       else:
@@ -357,6 +363,7 @@ def get_update_delete_user(request, user_id):
         }, status = status.HTTP_404_NOT_FOUND)
       
       cursor.execute("DELETE FROM users WHERE id = %s", [user_id])
+    invalidate_cached_user(user_id)
     
     return Response({
       'message': 'User has been deleted'
@@ -0,0 +1,227 @@
+import contextvars
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import close_old_connections
+from django.urls import Resolver404, resolve
+from rest_framework import status
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+
+from api import renderers
+from api.db_router import SAFE_METHODS, reset_routing, stick_to_primary
+from api.query_budget import detach_collectors, query_budget
+
+# Batch: beberapa request API dalam satu round trip (cold start aplikasi mobile).
+# Autentikasi JWT sekali di request batch; sub-request memakai user yang sama (_force_auth_user DRF)
+# dan tetap melewati permission, throttle & query budget view masing-masing, tapi tidak melewati middleware.
+# Sub-request baca (dan PARALLEL_VIEWS) yang berurutan dijalankan paralel di thread pool; sub-request tulis
+# dijalankan sendiri sesuai urutan, sehingga read sesudahnya melihat hasil tulisnya.
+
+logger = logging.getLogger(__name__)
+
+METHODS = ('GET', 'POST', 'PATCH', 'PUT', 'DELETE')
+# POST tanpa efek samping di database: aman dijalankan paralel dengan read
+PARALLEL_VIEWS = {'firebase_token'}
+# Header response sub-request yang ikut dikembalikan
+RETURNED_HEADERS = ('ETag', 'Retry-After', 'Location')
+# Header request asli yang tidak diwariskan ke sub-request (If-* milik request batch, bukan sub-request)
+DROPPED_META = ('HTTP_AUTHORIZATION', 'HTTP_COOKIE', 'HTTP_IF_', 'CONTENT_', 'SCRIPT_URL', 'REDIRECT_URL', 'wsgi.input')
+# Header dari `headers` sub-request yang diabaikan; If-None-Match/If-Match dkk. tetap diteruskan
+DROPPED_HEADERS = ('HTTP_AUTHORIZATION', 'HTTP_COOKIE', 'HTTP_HOST')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def executor():
+  global _executor
+  if _executor is None:
+    with _executor_lock:
+      if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.BATCH_MAX_WORKERS, thread_name_prefix='batch')
+  return _executor
+
+
+class SubRequestError(Exception):
+  def __init__(self, message, status_code=status.HTTP_400_BAD_REQUEST):
+    super().__init__(message)
+    self.status_code = status_code
+
+
+def _prepare(spec):
+  """Validasi satu sub-request -> (method, path, query, match, body, headers)."""
+  if not isinstance(spec, dict):
+    raise SubRequestError('Each request must be an object')
+  method = str(spec.get('method', 'GET')).upper()
+  if method not in METHODS:
+    raise SubRequestError(f'Method {method} is not allowed', status.HTTP_405_METHOD_NOT_ALLOWED)
+  url = urlsplit(str(spec.get('path', '')))
+  if not url.path.startswith('/api/'):
+    raise SubRequestError('path must start with /api/')
+  headers = spec.get('headers') or {}
+  if not isinstance(headers, dict):
+    raise SubRequestError('headers must be an object')
+
+  try:
+    match = resolve(url.path)
+  except Resolver404:
+    raise SubRequestError('Not found', status.HTTP_404_NOT_FOUND)
+  if match.url_name == 'batch_requests':
+    raise SubRequestError('Batch requests cannot be nested')
+  if iscoroutinefunction(match.func):
+    # View async (long-poll, SSE, gateway) butuh event loop; panggil langsung
+    raise SubRequestError('Async endpoints cannot be batched')
+  return method, url.path, url.query, match, spec.get('body'), headers
+
+
+def _build_request(request, method, path, query, body, headers):
+  content = renderers.dumps(body) if body is not None else b''
+  environ = {key: value for key, value in request.META.items() if not key.startswith(DROPPED_META)}
+  for name, value in headers.items():
+    key = 'HTTP_' + str(name).upper().replace('-', '_')
+    if key not in DROPPED_HEADERS:
+      environ[key] = str(value)
+  environ.update({
+    'REQUEST_METHOD': method,
+    'PATH_INFO': path,
+    'QUERY_STRING': query,
+    'wsgi.url_scheme': request.scheme,
+    'wsgi.input': io.BytesIO(content),
+    'CONTENT_LENGTH': str(len(content)),
+    'CONTENT_TYPE': 'application/json' if content else '',
+  })
+  sub = WSGIRequest(environ)
+  sub._force_auth_user = request.user
+  sub._force_auth_token = request.auth
+  return sub
+
+
+def _body(response):
+  if isinstance(response, Response):
+    return response.data
+  if response.streaming:
+    response.close()
+    raise SubRequestError('Streaming responses cannot be batched', status.HTTP_501_NOT_IMPLEMENTED)
+  if not response.content:
+    return None
+  if response.get('Content-Type', '').startswith('application/json'):
+    return renderers.loads(response.content)
+  return response.content.decode(response.charset)
+
+
+def _sub_context():
+  """
+  Salinan context request batch untuk satu sub-request: metrics & profiling tetap mencatat SQL-nya,
+  tapi replica routing & query budget milik view sub-request itu sendiri.
+  Dibuat di thread request; satu Context tidak bisa dijalankan di dua thread sekaligus.
+  """
+  context = contextvars.copy_context()
+  context.run(detach_collectors)
+  context.run(reset_routing)
+  return context
+
+
+def _run(request, prepared, context):
+  method, path, query, match, body, headers = prepared
+  sub = _build_request(request, method, path, query, body, headers)
+  sub.resolver_match = match
+  response = context.run(match.func, sub, *match.args, **match.kwargs)
+  return response.status_code, {name: response[name] for name in RETURNED_HEADERS if response.has_header(name)}, \
+    _body(response)
+
+
+def _run_in_thread(request, prepared, context):
+  # Thread pool: koneksi DB per thread, dirawat seperti di awal/akhir request Django
+  close_old_connections()
+  try:
+    return _run(request, prepared, context)
+  finally:
+    close_old_connections()
+
+
+def _result(spec, index, outcome):
+  key = spec.get('id', index) if isinstance(spec, dict) else index
+  if isinstance(outcome, SubRequestError):
+    return {'id': key, 'status': outcome.status_code, 'headers': {}, 'body': {'message': str(outcome)}}
+  if isinstance(outcome, Exception):
+    logger.error('Batch sub-request %s failed', key, exc_info=outcome)
+    return {'id': key, 'status': status.HTTP_500_INTERNAL_SERVER_ERROR, 'headers': {},
+            'body': {'message': 'Internal server error'}}
+  status_code, headers, body = outcome
+  return {'id': key, 'status': status_code, 'headers': headers, 'body': body}
+
+
+@api_view(['POST'])
+@query_budget(0)
+def batch_requests(request):
+  """
+  Jalankan beberapa request API sekaligus
+  POST /api/batch/
+  Body: {
+    "requests": [
+      {"id": "products", "method": "GET", "path": "/api/products/?fields=id,name,price"},
+      {"id": "token", "method": "POST", "path": "/api/auth/firebase-token/"},
+      {"method": "PATCH", "path": "/api/transaction/12/", "body": {...}, "headers": {"If-None-Match": "..."}}
+    ]
+  }
+  Response: data = [{"id", "status", "headers", "body"}] sesuai urutan requests.
+  """
+  specs = request.data.get('requests') if isinstance(request.data, dict) else None
+  if not isinstance(specs, list) or not specs:
+    return Response({'message': 'requests must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+  if len(specs) > settings.BATCH_MAX_REQUESTS:
+    return Response({'message': f'At most {settings.BATCH_MAX_REQUESTS} requests per batch'},
+                    status=status.HTTP_400_BAD_REQUEST)
+
+  # Sticky replica ditandai di sini hanya bila ada sub-request tulis yang berhasil
+  request._request.replica_sticky_handled = True
+
+  outcomes = [None] * len(specs)
+  prepared = {}
+  for index, spec in enumerate(specs):
+    try:
+      prepared[index] = _prepare(spec)
+    except SubRequestError as e:
+      outcomes[index] = e
+
+  parallel = []
+
+  def flush():
+    futures = {
+      index: executor().submit(_run_in_thread, request, prepared[index], _sub_context()) for index in parallel
+    }
+    for index, future in futures.items():
+      try:
+        outcomes[index] = future.result()
+      except Exception as e:
+        outcomes[index] = e
+    parallel.clear()
+
+  for index in sorted(prepared):
+    method, match = prepared[index][0], prepared[index][3]
+    if method in SAFE_METHODS or match.url_name in PARALLEL_VIEWS:
+      parallel.append(index)
+      continue
+
+    # Tulis: tunggu read sebelumnya, jalankan sendiri, lalu read berikutnya ke primary
+    flush()
+    try:
+      outcomes[index] = _run(request, prepared[index], _sub_context())
+    except Exception as e:
+      outcomes[index] = e
+      continue
+    if outcomes[index][0] < 400 and settings.DATABASE_REPLICAS:
+      stick_to_primary(request.user.id)
+  flush()
+
+  return Response({
+    'message': 'Success',
+    'data': [_result(spec, index, outcome) for index, (spec, outcome) in enumerate(zip(specs, outcomes))]
+  }, status=status.HTTP_200_OK)
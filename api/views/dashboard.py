@@ -0,0 +1,105 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from rest_framework import status
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum, Value, DecimalField
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from api.models import Product, Transaction, Payment
+from api.utils.dates import local_bounds
+from api.utils_transaction import cleanup_expired_transactions
+from api.db_router import use_replica
+from api.query_budget import query_budget
+
+PAID_STATUSES = ['processing', 'completed']
+LOW_STOCK_LIMIT = 20
+
+MONEY = DecimalField(max_digits=14, decimal_places=2)
+ZERO = Value(Decimal('0.00'), output_field=MONEY)
+
+
+def _build_dashboard(cafe_id, low_stock_threshold):
+  """
+  Ringkasan home screen owner dalam jumlah query yang tetap:
+  1 agregat transaksi, 1 agregat pembayaran, 1 agregat produk, 1 daftar stok menipis.
+  """
+  today = timezone.localdate()
+  today_start, tomorrow_start = local_bounds(today, today + timedelta(days=1))
+  is_today = Q(created_at__gte=today_start, created_at__lt=tomorrow_start)
+  is_paid = Q(status__in=PAID_STATUSES)
+
+  transactions = Transaction.objects.filter(cafe_id=cafe_id).filter(
+    is_today | Q(status__in=['pending', 'processing'])
+  ).aggregate(
+    sales_total=Coalesce(Sum('total', filter=is_today & is_paid), ZERO),
+    transaction_count=Count('id', filter=is_today & is_paid),
+    cancelled_count=Count('id', filter=is_today & Q(status='cancelled')),
+    open_orders=Count('id', filter=Q(status='pending')),
+    kitchen_queue=Count('id', filter=Q(status='processing')),
+  )
+
+  payments = Payment.objects.filter(transaction__cafe_id=cafe_id, status='pending').aggregate(
+    count=Count('id'),
+    amount=Coalesce(Sum('amount'), ZERO),
+  )
+
+  products = Product.objects.filter(cafe_id=cafe_id).aggregate(
+    total=Count('id'),
+    out_of_stock=Count('id', filter=Q(stock__lte=0)),
+    low_stock=Count('id', filter=Q(stock__gt=0, stock__lte=low_stock_threshold)),
+  )
+  low_stock_products = list(
+    Product.objects.filter(cafe_id=cafe_id, stock__lte=low_stock_threshold)
+      .order_by('stock', 'name')
+      .values('id', 'name', 'stock', 'is_available')[:LOW_STOCK_LIMIT]
+  )
+
+  return {
+    'date': today,
+    'today': {
+      'sales_total': transactions['sales_total'],
+      'transaction_count': transactions['transaction_count'],
+      'cancelled_count': transactions['cancelled_count'],
+    },
+    'open_orders': transactions['open_orders'],
+    'kitchen_queue': transactions['kitchen_queue'],
+    'pending_payments': payments,
+    'products': dict(products, low_stock_threshold=low_stock_threshold),
+    'low_stock_products': low_stock_products,
+    'generated_at': timezone.now(),
+  }
+
+
+@api_view(['GET'])
+@use_replica
+@query_budget(5)
+def get_dashboard(request):
+  """
+  Ringkasan home screen (penjualan hari ini, stok menipis, pembayaran pending, antrian dapur)
+  GET /api/dashboard/?low_stock=5
+  Di-cache per cafe selama DASHBOARD_CACHE_SECONDS.
+  """
+  if not request.user.cafe_id:
+    return Response({'message': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
+
+  try:
+    low_stock_threshold = int(request.GET.get('low_stock', 5))
+  except ValueError:
+    return Response({'message': 'low_stock must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+
+  cache_key = f'dashboard:{request.user.cafe_id}:{low_stock_threshold}'
+  data = cache.get(cache_key)
+
+  if data is None:
+    # Pastikan stok & pembayaran pending akurat sebelum diringkas
+    cleanup_expired_transactions(request.user.cafe_id)
+    data = _build_dashboard(request.user.cafe_id, low_stock_threshold)
+    cache.set(cache_key, data, settings.DASHBOARD_CACHE_SECONDS)
+
+  return Response({'message': 'Success', 'data': data}, status=status.HTTP_200_OK)
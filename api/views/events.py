@@ -0,0 +1,119 @@
+import asyncio
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework import status
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+
+from api import events, renderers
+from api.query_budget import query_budget
+from api.utils.async_api import async_api_view
+
+# Stream event pembayaran & status transaksi per cafe, pengganti polling get_payment_status.
+# Tidak ada query database: event dibaca dari broker (api/events.py).
+
+
+def _last_id(value):
+  try:
+    return int(value)
+  except (TypeError, ValueError):
+    return None
+
+
+def _filter(request):
+  """?types=payment.success,payment.failed dan/atau ?transaction_id=<id> (terminal yang menunggu satu order)"""
+  types = {t for t in request.GET.get('types', '').split(',') if t}
+  transaction_id = request.GET.get('transaction_id')
+  transaction_id = int(transaction_id) if transaction_id and transaction_id.isdigit() else None
+
+  def accept(event):
+    if types and event['type'] not in types:
+      return False
+    return transaction_id is None or event['data'].get('transaction_id') == transaction_id
+  return accept
+
+
+@api_view(['GET'])
+@query_budget(0)
+def get_events(request):
+  """
+  Event setelah `since`, langsung dijawab (fallback WSGI)
+  GET /api/events/?since=<id>
+  """
+  broker = events.broker()
+  since = _last_id(request.GET.get('since'))
+  if since is None:
+    # Tanpa `since`: hanya kembalikan posisi terakhir sebagai titik awal
+    since = broker.latest(request.user.cafe_id)
+  accept = _filter(request)
+  found = broker.since(request.user.cafe_id, since)
+  return Response({
+    'message': 'Success',
+    'data': {
+      'last_id': found[-1]['id'] if found else since,
+      'events': [event for event in found if accept(event)],
+    }
+  }, status=status.HTTP_200_OK)
+
+
+@async_api_view(['GET'])
+async def events_poll(request):
+  """
+  Long-poll event (ASGI)
+  GET /api/async/events/?since=<id>
+  Menunggu hingga EVENTS_LONG_POLL_SECONDS bila belum ada event baru.
+  """
+  broker = events.broker()
+  since = _last_id(request.GET.get('since'))
+  if since is None:
+    since = await broker.alatest(request.user.cafe_id)
+  accept = _filter(request)
+  found = await broker.wait(request.user.cafe_id, since, settings.EVENTS_LONG_POLL_SECONDS)
+  return {
+    'message': 'Success',
+    'data': {
+      'last_id': found[-1]['id'] if found else since,
+      'events': [event for event in found if accept(event)],
+    }
+  }
+
+
+async def _event_stream(cafe_id, last_id, accept):
+  broker = events.broker()
+  if last_id is None:
+    last_id = await broker.alatest(cafe_id)
+  loop = asyncio.get_running_loop()
+  deadline = loop.time() + settings.EVENTS_STREAM_SECONDS
+
+  yield 'retry: 1000\n\n'
+  while loop.time() < deadline:
+    found = await broker.wait(cafe_id, last_id, min(15, max(deadline - loop.time(), 0)))
+    if not found:
+      # Heartbeat supaya proxy tidak menutup koneksi idle
+      yield ': ping\n\n'
+      continue
+    for event in found:
+      last_id = event['id']
+      if accept(event):
+        # Encoder yang sama dengan response REST & stream dapur (Decimal, datetime)
+        payload = renderers.dumps(event['data']).decode()
+        yield f"id: {event['id']}\nevent: {event['type']}\ndata: {payload}\n\n"
+
+
+@async_api_view(['GET'])
+async def events_stream(request):
+  """
+  Server-Sent Events pembayaran & transaksi (ASGI)
+  GET /api/async/events/stream/
+  Event: payment.success, payment.failed, payment.expired, payment.cancelled, transaction.status.
+  Koneksi ditutup setelah EVENTS_STREAM_SECONDS; EventSource menyambung lagi dengan Last-Event-ID.
+  """
+  last_id = _last_id(request.headers.get('Last-Event-ID') or request.GET.get('since'))
+  response = StreamingHttpResponse(
+    _event_stream(request.user.cafe_id, last_id, _filter(request)),
+    content_type='text/event-stream'
+  )
+  response['Cache-Control'] = 'no-cache'
+  response['X-Accel-Buffering'] = 'no'
+  return response
@@ -0,0 +1,214 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, Exists, F, Max, OuterRef, Q, Value, When
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+
+from api import events, outbox, renderers
+from api.models import Transaction, TransactionItem
+from api.query_budget import query_budget
+from api.serializer import KitchenItemStatusSerializer
+from api.utils.async_api import async_api_view
+
+# Antrian dapur (KDS): hanya item yang perlu disiapkan dari order berstatus processing.
+# Aksi dapur hanya mengubah prep_status item & status order; tidak pernah menyentuh stok atau menulis ulang item.
+# Semua query memakai partial index trx_kitchen_queue_idx (status='processing').
+# Long-poll & SSE hanya menjalankan query versi (count + max(updated_at), index-only) per tick;
+# antrian lengkap baru diambil saat versinya berubah.
+
+MAX_ORDERS = 200
+# Status asal yang boleh pindah ke status tujuan (maju saja)
+PREP_TRANSITIONS = {
+  'cooking': ['pending'],
+  'served': ['pending', 'cooking'],
+}
+ORDER_FIELDS = ('id', 'transaction_number', 'order_type', 'customer_name', 'notes', 'created_at', 'updated_at')
+ITEM_FIELDS = ('id', 'transaction_id', 'product_id', 'product_name', 'quantity', 'notes', 'prep_status')
+
+
+def _open_orders(cafe_id):
+  return Transaction.objects.filter(cafe_id=cafe_id, status='processing')
+
+
+def _version(aggregate):
+  last = aggregate['last']
+  return f"{aggregate['count']}-{int(last.timestamp() * 1000000) if last else 0}"
+
+
+def queue_version(cafe_id):
+  """Berubah setiap ada order masuk/keluar antrian atau order di antrian di-update."""
+  return _version(_open_orders(cafe_id).aggregate(count=Count('*'), last=Max('updated_at')))
+
+
+async def aqueue_version(cafe_id):
+  return _version(await _open_orders(cafe_id).aaggregate(count=Count('*'), last=Max('updated_at')))
+
+
+def kitchen_queue_data(cafe_id):
+  """Order terbuka (terlama dulu) beserta item yang perlu disiapkan; 2 query."""
+  orders = list(_open_orders(cafe_id).order_by('created_at').values(*ORDER_FIELDS)[:MAX_ORDERS])
+  by_id = {order['id']: {**order, 'items': []} for order in orders}
+
+  items = TransactionItem.objects.filter(
+    transaction_id__in=list(by_id), needs_preparation=True
+  ).order_by('id').values(*ITEM_FIELDS)
+  for item in items:
+    by_id[item.pop('transaction_id')]['items'].append(item)
+
+  # Order yang semua itemnya grab & go tidak perlu tampil di dapur
+  return [order for order in by_id.values() if order['items']]
+
+
+@api_view(['GET'])
+@query_budget(3)
+def kitchen_queue(request):
+  """
+  Snapshot antrian dapur
+  GET /api/kitchen/queue/
+  """
+  cafe_id = request.user.cafe_id
+  return Response({
+    'message': 'Success',
+    'data': {'version': queue_version(cafe_id), 'orders': kitchen_queue_data(cafe_id)}
+  }, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@transaction.atomic
+@query_budget(6)
+def update_kitchen_items(request):
+  """
+  Ubah status dapur banyak item sekaligus
+  POST /api/kitchen/items/status/
+  Body: {"prep_status": "cooking"|"served", "item_ids": [...], "transaction_ids": [...]}
+  transaction_ids = semua item dapur dari order tersebut. Order otomatis completed
+  bila semua item dapurnya sudah served.
+  """
+  serializer = KitchenItemStatusSerializer(data=request.data)
+  if not serializer.is_valid():
+    return Response({
+      'message': 'Invalid kitchen update',
+      'errors': serializer.errors
+    }, status=status.HTTP_400_BAD_REQUEST)
+  data = serializer.validated_data
+  target = data['prep_status']
+
+  items = TransactionItem.objects.filter(needs_preparation=True)
+  if data.get('item_ids') and data.get('transaction_ids'):
+    items = items.filter(Q(id__in=data['item_ids']) | Q(transaction_id__in=data['transaction_ids']))
+  elif data.get('item_ids'):
+    items = items.filter(id__in=data['item_ids'])
+  else:
+    items = items.filter(transaction_id__in=data['transaction_ids'])
+
+  # Kunci order yang terlibat (urut id supaya tidak deadlock) agar dua layar dapur yang
+  # menyajikan item terakhir bersamaan tetap menghasilkan tepat satu auto-complete
+  trx_ids = set(items.values_list('transaction_id', flat=True))
+  open_ids = list(
+    Transaction.objects.select_for_update()
+    .filter(id__in=trx_ids, cafe_id=request.user.cafe_id, status='processing')
+    .order_by('id').values_list('id', flat=True)
+  )
+  if not open_ids:
+    return Response({'message': 'No open kitchen orders matched'}, status=status.HTTP_404_NOT_FOUND)
+
+  updated = items.filter(
+    transaction_id__in=open_ids, prep_status__in=PREP_TRANSITIONS[target]
+  ).update(prep_status=target)
+
+  completed = []
+  if target == 'served':
+    unserved = TransactionItem.objects.filter(
+      transaction_id=OuterRef('pk'), needs_preparation=True
+    ).exclude(prep_status='served')
+    completed = list(
+      Transaction.objects.filter(id__in=open_ids).exclude(Exists(unserved)).values_list('id', flat=True)
+    )
+
+  # Satu UPDATE: order selesai -> completed; semua order yang tersentuh dapat updated_at baru
+  # (versi antrian dapur ikut berubah)
+  Transaction.objects.filter(id__in=open_ids).update(
+    updated_at=timezone.now(),
+    status=Case(When(id__in=completed, then=Value('completed')), default=F('status')),
+  )
+
+  outbox.enqueue(request.user.cafe_id, *(outbox.order_status(trx_id, 'completed') for trx_id in completed))
+  for trx_id in completed:
+    events.publish_transaction(request.user.cafe_id, trx_id, 'completed')
+
+  return Response({
+    'message': 'Kitchen items updated',
+    'data': {'updated': updated, 'completed_transactions': completed}
+  }, status=status.HTTP_200_OK)
+
+
+# Long-poll & SSE menjalankan satu query per tick selama koneksi terbuka, jadi tidak memakai @query_budget
+
+@async_api_view(['GET'])
+async def kitchen_queue_poll(request):
+  """
+  Long-poll antrian dapur (ASGI)
+  GET /api/async/kitchen/queue/?version=<versi terakhir>
+  Langsung menjawab bila versi berbeda; kalau tidak, menunggu hingga KITCHEN_LONG_POLL_SECONDS lalu 204.
+  """
+  cafe_id = request.user.cafe_id
+  known = request.GET.get('version')
+  loop = asyncio.get_running_loop()
+  deadline = loop.time() + settings.KITCHEN_LONG_POLL_SECONDS
+
+  while True:
+    version = await aqueue_version(cafe_id)
+    if version != known:
+      orders = await sync_to_async(kitchen_queue_data)(cafe_id)
+      return {'message': 'Success', 'data': {'version': version, 'orders': orders}}
+    if loop.time() >= deadline:
+      response = HttpResponse(status=status.HTTP_204_NO_CONTENT)
+      response['X-Queue-Version'] = version
+      return response
+    await asyncio.sleep(settings.KITCHEN_POLL_INTERVAL)
+
+
+async def _queue_events(cafe_id, known):
+  loop = asyncio.get_running_loop()
+  deadline = loop.time() + settings.KITCHEN_STREAM_SECONDS
+  last_sent = loop.time()
+
+  # Saran jeda reconnect untuk EventSource
+  yield f'retry: {int(settings.KITCHEN_POLL_INTERVAL * 1000)}\n\n'
+  while loop.time() < deadline:
+    version = await aqueue_version(cafe_id)
+    if version != known:
+      known = version
+      orders = await sync_to_async(kitchen_queue_data)(cafe_id)
+      payload = renderers.dumps({'version': version, 'orders': orders}).decode()
+      yield f'id: {version}\nevent: queue\ndata: {payload}\n\n'
+      last_sent = loop.time()
+    elif loop.time() - last_sent >= 15:
+      # Komentar heartbeat supaya proxy tidak menutup koneksi idle
+      yield ': ping\n\n'
+      last_sent = loop.time()
+    await asyncio.sleep(settings.KITCHEN_POLL_INTERVAL)
+
+
+@async_api_view(['GET'])
+async def kitchen_queue_stream(request):
+  """
+  Server-Sent Events antrian dapur (ASGI)
+  GET /api/async/kitchen/queue/stream/
+  Event `queue` berisi antrian lengkap setiap kali berubah. Koneksi ditutup setelah
+  KITCHEN_STREAM_SECONDS; EventSource menyambung lagi dengan Last-Event-ID sehingga
+  antrian yang tidak berubah tidak dikirim ulang.
+  """
+  response = StreamingHttpResponse(
+    _queue_events(request.user.cafe_id, request.headers.get('Last-Event-ID')),
+    content_type='text/event-stream'
+  )
+  response['Cache-Control'] = 'no-cache'
+  response['X-Accel-Buffering'] = 'no'
+  return response
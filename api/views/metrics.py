@@ -0,0 +1,24 @@
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse, Http404
+
+from api import metrics
+
+
+def metrics_view(request):
+  """
+  Metrics Prometheus (per worker)
+  GET /metrics
+  Header: Authorization: Bearer <METRICS_TOKEN>. Tanpa METRICS_TOKEN endpoint ini nonaktif (404).
+  """
+  if not settings.METRICS_TOKEN:
+    raise Http404
+
+  # Bandingkan sebagai bytes: compare_digest pada str non-ASCII melempar TypeError (500, bukan 401)
+  expected = f'Bearer {settings.METRICS_TOKEN}'.encode()
+  provided = request.headers.get('Authorization', '').encode('utf-8', 'surrogateescape')
+  if not hmac.compare_digest(provided, expected):
+    return HttpResponse('Unauthorized\n', status=401, content_type='text/plain')
+
+  return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
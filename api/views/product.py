@@ -8,19 +8,29 @@ from api.models import Product
 from api.serializer import CategorySerializer, ProductSerializer
 
 from api.utils_transaction import cleanup_expired_transactions
+from api.utils.sparse import ValuesReader, parse_fieldset
+from api.db_router import use_replica
+from api.query_budget import query_budget
+
+# Jalur baca produk tanpa ProductSerializer; output sama, kolom mengikuti ?fields= / ?exclude=
+PRODUCT_READER = ValuesReader(Product, extra={'category_name': 'category__name'})
+CATEGORY_COLUMNS = ('id', 'name', 'description', 'created_at', 'updated_at')
 
 @api_view(['GET'])
+@query_budget(1)
 def get_all_categories(request):
   """
   Mendapatkan semua kategori produk
   GET /api/category/
   """
 
+  # Nama kolom hanya dari whitelist CATEGORY_COLUMNS
+  columns = ', '.join(parse_fieldset(request, CATEGORY_COLUMNS))
   with connection.cursor() as cursor:
-    if request.user.cafe:
-      cursor.execute("SELECT id, name, description, created_at, updated_at FROM category WHERE cafe_id = %s ORDER BY created_at DESC", [request.user.cafe.id])
+    if request.user.cafe_id:
+      cursor.execute(f"SELECT {columns} FROM category WHERE cafe_id = %s ORDER BY created_at DESC", [request.user.cafe_id])
     else:
-      cursor.execute("SELECT id, name, description, created_at, updated_at FROM category WHERE cafe_id IS NULL ORDER BY created_at DESC")
+      cursor.execute(f"SELECT {columns} FROM category WHERE cafe_id IS NULL ORDER BY created_at DESC")
         
     rows = cursor.fetchall()
     columns = [col[0] for col in cursor.description]
@@ -29,6 +39,7 @@ def get_all_categories(request):
   return Response({'message:': 'Success', 'data': result}, status=status.HTTP_200_OK)
 
 @api_view(['POST'])
+@query_budget(1)
 def create_category(request):
   """
   Membuat kategori produk baru
@@ -47,7 +58,7 @@ def create_category(request):
   name = data.get('name')
   description = data.get('description')
 
-  cafe_id = request.user.cafe.id if request.user.cafe else None
+  cafe_id = request.user.cafe_id
 
   with connection.cursor() as cursor:
     cursor.execute("""
@@ -65,17 +76,19 @@ def create_category(request):
   }, status=status.HTTP_201_CREATED)
 
 @api_view(['GET', 'PATCH', 'DELETE'])
+@query_budget(3)
 def get_update_delete_category(request, category_id):
   """
   Mendapatkan, mengupdate, atau menghapus kategori produk berdasarkan ID
   """
-  if not request.user.cafe:
+  if not request.user.cafe_id:
     return Response({'message': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
 
   # For reading:
   if request.method == 'GET':
+    columns = ', '.join(parse_fieldset(request, CATEGORY_COLUMNS, default=CATEGORY_COLUMNS[1:]))
     with connection.cursor() as cursor:
-      cursor.execute("SELECT name, description, created_at, updated_at FROM category WHERE id = %s AND cafe_id = %s", [category_id, request.user.cafe.id])
+      cursor.execute(f"SELECT {columns} FROM category WHERE id = %s AND cafe_id = %s", [category_id, request.user.cafe_id])
       row = cursor.fetchone()
       if not row:
         return Response({'message': 'Category not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -109,7 +122,7 @@ def get_update_delete_category(request, category_id):
     updates.append('updated_at = NOW()')
 
     with connection.cursor() as cursor:
-      cursor.execute("SELECT id FROM category WHERE id = %s AND cafe_id = %s", [category_id, request.user.cafe.id])
+      cursor.execute("SELECT id FROM category WHERE id = %s AND cafe_id = %s", [category_id, request.user.cafe_id])
       if not cursor.fetchone():
         return Response({'message': 'Category not found'}, status=status.HTTP_404_NOT_FOUND)
       
@@ -119,7 +132,7 @@ def get_update_delete_category(request, category_id):
         }, status=status.HTTP_400_BAD_REQUEST)
       
       params.append(category_id)
-      params.append(request.user.cafe.id)
+      params.append(request.user.cafe_id)
 
       sql = f"""
               UPDATE category 
@@ -145,13 +158,13 @@ def get_update_delete_category(request, category_id):
       }, status=status.HTTP_403_FORBIDDEN)
     
     with connection.cursor() as cursor:
-      cursor.execute("SELECT id FROM category WHERE id = %s AND cafe_id = %s", [category_id, request.user.cafe.id])
+      cursor.execute("SELECT id FROM category WHERE id = %s AND cafe_id = %s", [category_id, request.user.cafe_id])
       if not cursor.fetchone():
         return Response({'message': 'Category not found'}, status=status.HTTP_404_NOT_FOUND)
       
-      cursor.execute("UPDATE product SET category_id = NULL WHERE category_id = %s AND cafe_id = %s", [category_id, request.user.cafe.id])
+      cursor.execute("UPDATE product SET category_id = NULL WHERE category_id = %s AND cafe_id = %s", [category_id, request.user.cafe_id])
       
-      cursor.execute("DELETE FROM category WHERE id = %s AND cafe_id = %s", [category_id, request.user.cafe.id])
+      cursor.execute("DELETE FROM category WHERE id = %s AND cafe_id = %s", [category_id, request.user.cafe_id])
     
     return Response({
       'message': 'Category has been deleted'
@@ -159,6 +172,7 @@ def get_update_delete_category(request, category_id):
 
 @api_view(['POST'])
 @transaction.atomic
+@query_budget(3)
 def create_product(request):
   """
   Membuat produk baru
@@ -171,7 +185,7 @@ def create_product(request):
   
   serializer = ProductSerializer(data=request.data)
   serializer.is_valid(raise_exception=True)
-  product = serializer.save(cafe=request.user.cafe) # Inject Tenant
+  product = serializer.save(cafe_id=request.user.cafe_id) # Inject Tenant
 
   return Response({
     'message': 'Product has been created',
@@ -179,6 +193,8 @@ def create_product(request):
   }, status=status.HTTP_201_CREATED)
 
 @api_view(['GET'])
+@use_replica
+@query_budget(2)
 def search_products(request):
   """
   Mencari produk berdasarkan berbagai kriteria
@@ -189,9 +205,10 @@ def search_products(request):
   min_price = request.GET.get('min_price', '')
   max_price = request.GET.get('max_price', '')
   is_available = request.GET.get('available', '')
+  fields = parse_fieldset(request, PRODUCT_READER.fields)
   
   # Base Filter: Tenant Isolation
-  products = Product.objects.filter(cafe=request.user.cafe)
+  products = Product.objects.filter(cafe_id=request.user.cafe_id)
   
   if name:
     products = products.filter(Q(name__icontains=name))
@@ -204,46 +221,47 @@ def search_products(request):
   if is_available:
     products = products.filter(is_available=is_available.lower() == 'true')
   
-  # Serialize
-  serializer = ProductSerializer(products, many=True)
+  data = PRODUCT_READER.read(products, fields)
   
   return Response({
     'message': 'Success',
     'count': products.count(),
-    'data': serializer.data
+    'data': data
   })
 
 @api_view(['GET'])
+@use_replica
+@query_budget(2)
 def get_all_products(request):
   """
   Mendapatkan semua produk
   GET /api/products/
   """
+  fields = parse_fieldset(request, PRODUCT_READER.fields)
+
   # Clean up expired transactions first to ensure stock is accurate
-  if request.user.cafe:
-    cleanup_expired_transactions(request.user.cafe)
+  if request.user.cafe_id:
+    cleanup_expired_transactions(request.user.cafe_id)
 
-  products = Product.objects.filter(cafe=request.user.cafe)
-  serializer = ProductSerializer(products, many=True)
+  products = Product.objects.filter(cafe_id=request.user.cafe_id)
 
-  return Response({'message:': 'Success', 'data': serializer.data}, status=status.HTTP_200_OK)
+  return Response({'message:': 'Success', 'data': PRODUCT_READER.read(products, fields)}, status=status.HTTP_200_OK)
 
 
 @api_view(['GET', 'PATCH', 'DELETE'])
+@query_budget(5)
 def get_update_delete_product(request, product_id):
   """
   Mendapatkan, mengupdate, atau menghapus produk berdasarkan ID
   """
 
   if request.method == 'GET':
-    try:
-      product = Product.objects.get(id=product_id, cafe=request.user.cafe)
-    except Product.DoesNotExist:
+    fields = parse_fieldset(request, PRODUCT_READER.fields)
+    rows = PRODUCT_READER.read(Product.objects.filter(id=product_id, cafe_id=request.user.cafe_id), fields)
+    if not rows:
       return Response({ 'message': "Product not found"}, status= status.HTTP_404_NOT_FOUND)
 
-    result = ProductSerializer(product).data
-
-    return Response({'message:': 'Success', 'data': result}, status=status.HTTP_200_OK)
+    return Response({'message:': 'Success', 'data': rows[0]}, status=status.HTTP_200_OK)
   
   elif request.method == 'PATCH':
     if request.user.role != 'owner' and not request.user.is_superuser:
@@ -251,7 +269,7 @@ def get_update_delete_product(request, product_id):
         'message': 'You do not have permission'
       }, status=status.HTTP_403_FORBIDDEN)
     try:
-      product = Product.objects.get(id=product_id, cafe=request.user.cafe)
+      product = Product.objects.get(id=product_id, cafe_id=request.user.cafe_id)
     except Product.DoesNotExist:
       return Response({ 'message': "Product not found"}, status= status.HTTP_404_NOT_FOUND)
 
@@ -270,7 +288,7 @@ def get_update_delete_product(request, product_id):
         'message': 'You do not have permission'
       }, status=status.HTTP_403_FORBIDDEN)
     try:
-      product = Product.objects.get(id=product_id, cafe=request.user.cafe)
+      product = Product.objects.get(id=product_id, cafe_id=request.user.cafe_id)
     except Product.DoesNotExist:
       return Response({ 'message': "Product not found"}, status= status.HTTP_404_NOT_FOUND)
 
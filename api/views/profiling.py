@@ -0,0 +1,46 @@
+from rest_framework import status
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+
+from api import profiling
+from api.query_budget import query_budget
+
+BUFFER_DISABLED = 'Profile storage needs a shared cache (CACHE_URL); use the X-Profile: inline header instead'
+
+
+@api_view(['GET'])
+@query_budget(0)
+def list_profiles(request):
+  """
+  Profil request terbaru dari ring buffer (superuser)
+  GET /api/profiles/
+  """
+  if not request.user.is_superuser:
+    return Response({'message': 'You do not have permission'}, status=status.HTTP_403_FORBIDDEN)
+  if not profiling.buffer_enabled():
+    return Response({'message': BUFFER_DISABLED}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+  summaries = [
+    {key: profile[key] for key in ('id', 'created_at', 'method', 'path', 'view', 'status', 'duration_ms', 'sql_count', 'sql_ms')}
+    for profile in profiling.recent()
+  ]
+  return Response({'message': 'Success', 'data': summaries}, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@query_budget(0)
+def get_profile(request, profile_id):
+  """
+  Detail satu profil: cProfile, SQL, EXPLAIN ANALYZE (superuser)
+  GET /api/profiles/<profile_id>/
+  """
+  if not request.user.is_superuser:
+    return Response({'message': 'You do not have permission'}, status=status.HTTP_403_FORBIDDEN)
+  if not profiling.buffer_enabled():
+    return Response({'message': BUFFER_DISABLED}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+  profile = profiling.get(profile_id)
+  if profile is None:
+    return Response({'message': 'Profile not found'}, status=status.HTTP_404_NOT_FOUND)
+
+  return Response({'message': 'Success', 'data': profile}, status=status.HTTP_200_OK)
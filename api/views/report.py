@@ -0,0 +1,209 @@
+import csv
+from decimal import Decimal
+
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from rest_framework import status
+
+from django.db.models import Sum, Count, F, Q, Value, DecimalField, ExpressionWrapper
+from django.db.models.functions import Coalesce, TruncDate
+from django.http import HttpResponse
+from django.utils import timezone
+
+from api.models import Transaction, TransactionItem
+from api.utils.dates import filter_created_between
+from api.utils_archive import archived_transactions
+from api.db_router import use_replica
+from api.query_budget import query_budget
+
+# Transaksi yang sudah dibayar (masuk dapur atau selesai)
+REPORTED_STATUSES = ['processing', 'completed']
+
+MONEY = DecimalField(max_digits=14, decimal_places=2)
+ZERO = Value(Decimal('0.00'), output_field=MONEY)
+
+REVENUE = Coalesce(Sum('subtotal'), ZERO, output_field=MONEY)
+COGS = Coalesce(
+  Sum(ExpressionWrapper(F('cost') * F('quantity'), output_field=MONEY)),
+  ZERO,
+  output_field=MONEY
+)
+
+
+def _sold_items(request):
+  """
+  Item terjual milik cafe user, difilter dengan start_date / end_date (YYYY-MM-DD).
+  """
+  items = TransactionItem.objects.filter(
+    transaction__cafe_id=request.user.cafe_id,
+    transaction__status__in=REPORTED_STATUSES
+  )
+
+  return filter_created_between(
+    items,
+    request.GET.get('start_date'),
+    request.GET.get('end_date'),
+    field='transaction__created_at'
+  )
+
+
+def _archived_items(request):
+  """
+  Item terjual dari arsip bulanan (cold storage) dalam rentang tanggal yang sama.
+  """
+  for trx in archived_transactions(
+    request.user.cafe_id,
+    request.GET.get('start_date'),
+    request.GET.get('end_date'),
+    statuses=REPORTED_STATUSES
+  ):
+    for item in trx['items']:
+      yield trx, item
+
+
+def _with_margin(row):
+  row['gross_margin'] = row['revenue'] - row['cogs']
+  return row
+
+
+def _add_item(row, item):
+  row['revenue'] += item['subtotal']
+  row['cogs'] += (item['cost'] or 0) * item['quantity']
+
+
+@api_view(['GET'])
+@use_replica
+@query_budget(3)
+def get_margin_report(request):
+  """
+  Laporan gross margin per produk (dihitung di database dari snapshot cost)
+  GET /api/reports/margin/?start_date=2025-12-01&end_date=2025-12-31
+  Revenue = subtotal item (sebelum pajak, diskon, dan takeaway charge).
+  """
+  if request.user.role != 'owner' and not request.user.is_superuser:
+    return Response({
+      'message': 'You do not have permission'
+    }, status=status.HTTP_403_FORBIDDEN)
+
+  items = _sold_items(request)
+
+  summary = items.aggregate(
+    revenue=REVENUE,
+    cogs=COGS,
+    items_sold=Coalesce(Sum('quantity'), 0),
+    uncosted_items=Count('id', filter=Q(cost__isnull=True)),
+  )
+  products = {
+    (row['product_id'], row['product_name']): row for row in items
+      .values('product_id', 'product_name')
+      .annotate(quantity=Sum('quantity'), revenue=REVENUE, cogs=COGS)
+      .order_by()
+  }
+
+  for _, item in _archived_items(request):
+    _add_item(summary, item)
+    summary['items_sold'] += item['quantity']
+    summary['uncosted_items'] += item['cost'] is None
+
+    row = products.setdefault((item['product_id'], item['product_name']), {
+      'product_id': item['product_id'],
+      'product_name': item['product_name'],
+      'quantity': 0,
+      'revenue': Decimal('0.00'),
+      'cogs': Decimal('0.00'),
+    })
+    row['quantity'] += item['quantity']
+    _add_item(row, item)
+
+  _with_margin(summary)
+  summary['margin_percentage'] = (
+    round(summary['gross_margin'] / summary['revenue'] * 100, 2) if summary['revenue'] else Decimal('0.00')
+  )
+
+  products = sorted(
+    (_with_margin(row) for row in products.values()),
+    key=lambda row: row['gross_margin'],
+    reverse=True
+  )
+
+  return Response({
+    'message': 'Success',
+    'data': {
+      'summary': summary,
+      'products': products
+    }
+  }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@use_replica
+@query_budget(2)
+def get_cogs_report(request):
+  """
+  Laporan harga pokok penjualan (COGS) harian
+  GET /api/reports/cogs/?start_date=2025-12-01&end_date=2025-12-31
+  """
+  if request.user.role != 'owner' and not request.user.is_superuser:
+    return Response({
+      'message': 'You do not have permission'
+    }, status=status.HTTP_403_FORBIDDEN)
+
+  days = {
+    row['date']: row for row in _sold_items(request)
+      .annotate(date=TruncDate('transaction__created_at'))
+      .values('date')
+      .annotate(revenue=REVENUE, cogs=COGS)
+      .order_by()
+  }
+
+  for trx, item in _archived_items(request):
+    date = timezone.localtime(trx['created_at']).date()
+    row = days.setdefault(date, {'date': date, 'revenue': Decimal('0.00'), 'cogs': Decimal('0.00')})
+    _add_item(row, item)
+
+  days = [_with_margin(days[date]) for date in sorted(days)]
+
+  return Response({'message': 'Success', 'data': days}, status=status.HTTP_200_OK)
+
+
+EXPORT_COLUMNS = [
+  'transaction_number', 'created_at', 'customer_name', 'order_type', 'status', 'payment_method',
+  'subtotal', 'tax', 'discount', 'takeaway_charge', 'total',
+]
+
+
+@api_view(['GET'])
+@use_replica
+@query_budget(2)
+def export_transactions(request):
+  """
+  Export transaksi ke CSV (termasuk transaksi yang sudah diarsip)
+  GET /api/transaction/export/?start_date=2025-01-01&end_date=2025-12-31
+  """
+  if request.user.role != 'owner' and not request.user.is_superuser:
+    return Response({
+      'message': 'You do not have permission'
+    }, status=status.HTTP_403_FORBIDDEN)
+
+  start_date = request.GET.get('start_date')
+  end_date = request.GET.get('end_date')
+
+  transactions = filter_created_between(Transaction.objects.filter(cafe_id=request.user.cafe_id), start_date, end_date)
+
+  response = HttpResponse(content_type='text/csv')
+  response['Content-Disposition'] = 'attachment; filename="transactions.csv"'
+
+  writer = csv.writer(response)
+  writer.writerow(EXPORT_COLUMNS)
+
+  def write(row):
+    row['created_at'] = timezone.localtime(row['created_at']).isoformat()
+    writer.writerow([row[column] for column in EXPORT_COLUMNS])
+
+  # Arsip berisi bulan-bulan lama, jadi ditulis lebih dulu (urut kronologis)
+  for trx in archived_transactions(request.user.cafe_id, start_date, end_date):
+    write(trx)
+  for row in transactions.order_by('created_at').values(*EXPORT_COLUMNS).iterator():
+    write(row)
+
+  return response
@@ -7,24 +7,61 @@ from django.db.models import Q
 from django.utils import timezone
 from datetime import timedelta
 from django.conf import settings
+from django.utils.cache import get_conditional_response
 from django.views.decorators.csrf import csrf_exempt
-import hashlib
-import requests
-from api.utils_transaction import restore_stock, cleanup_expired_transactions
+from api import events, outbox, transaction_cache
+from api.utils import duitku
+from api.utils_transaction import cleanup_expired_transactions
+from api.stock import restore_stock
+from api.utils.dates import filter_created_between
 
-from api.models import Transaction, Payment
+from api.models import Transaction, TransactionItem, Payment
 from api.serializer import TransactionSerializer, PaymentSerializer, CreatePaymentSerializer
-
-
-@transaction.atomic
-def process_duitku_payment(trx, payment_method):
+from api.utils.sparse import ValuesReader, only_fields, parse_fieldset
+from api.db_router import use_replica
+from api.query_budget import query_budget
+
+# Jalur baca transaksi tanpa TransactionSerializer (output sama): satu query transaksi + satu query items
+def _cashier_name(first_name, last_name):
+  return None if first_name is None else f"{first_name} {last_name}".strip()
+
+TRANSACTION_READER = ValuesReader(Transaction, extra={
+  'cashier_name': (('cashier__first_name', 'cashier__last_name'), _cashier_name),
+})
+ITEM_READER = ValuesReader(TransactionItem, fields=[
+  'id', 'product', 'product_name', 'quantity', 'price', 'cost', 'subtotal', 'notes', 'needs_preparation', 'prep_status',
+])
+TRANSACTION_FIELDS = ['id', 'items', *TRANSACTION_READER.fields[1:]]
+PAYMENT_RELATED = {'transaction_number': 'transaction__transaction_number'}
+
+
+def transaction_rows(queryset, fields):
+  """Transaksi sebagai dict; `items` hanya di-query bila diminta."""
+  names = [name for name in fields if name != 'items']
+  if 'items' not in fields:
+    return TRANSACTION_READER.read(queryset, names)
+
+  rows = TRANSACTION_READER.read(queryset, names if 'id' in names else ['id', *names])
+  by_id = {}
+  for row in rows:
+    row['items'] = []
+    by_id[row['id']] = row
+  if by_id:
+    items = TransactionItem.objects.filter(transaction_id__in=list(by_id)).order_by('id')
+    for item in ITEM_READER.read(items, ITEM_READER.fields + ['transaction']):
+      by_id[item.pop('transaction')]['items'].append(item)
+
+  # Urutan key mengikuti `fields`
+  return [{name: row[name] for name in fields} for row in rows]
+
+
+def build_duitku_inquiry(trx, payment_method):
   """
-  Helper to process Duitku payment for a transaction.
-  Returns the created Payment object or raises Exception.
+  Payload inquiry Duitku untuk transaksi.
+  Return (merchant_order_id, amount, payload); raise Exception bila belum dikonfigurasi.
   """
   merchant_code = settings.DUITKU_MERCHANT_CODE
   api_key = settings.DUITKU_API_KEY
-  is_sandbox = settings.DUITKU_IS_SANDBOX
   callback_url = settings.DUITKU_CALLBACK_URL
   return_url = settings.DUITKU_RETURN_URL
   
@@ -32,15 +69,11 @@ def process_duitku_payment(trx, payment_method):
     raise Exception('Duitku Merchant Code not configured')
 
   # Generate unique merchant order ID
-  merchant_order_id = f"{trx.cafe.id}-{trx.transaction_number}-{timezone.now().strftime('%H%M%S')}"
+  merchant_order_id = f"{trx.cafe_id}-{trx.transaction_number}-{timezone.now().strftime('%H%M%S')}"
   amount = int(trx.total)
   
   # Generate signature
-  signature = hashlib.md5(f"{merchant_code}{merchant_order_id}{amount}{api_key}".encode()).hexdigest()
-  
-  # Prepare request to Duitku
-  base_url = "https://sandbox.duitku.com" if is_sandbox else "https://passport.duitku.com"
-  endpoint = f"{base_url}/webapi/api/merchant/v2/inquiry"
+  signature = duitku.signature(merchant_code, merchant_order_id, amount, api_key)
   
   customer_name = trx.customer_name or "Customer"
   customer_email = "customer@kasirgo.com"
@@ -72,41 +105,111 @@ def process_duitku_payment(trx, payment_method):
     "signature": signature,
     "expiryPeriod": 60 
   }
-  
-  headers = {"Content-Type": "application/json"}
-  
-  try:
-    response = requests.post(endpoint, json=payload, headers=headers, timeout=30)
-    response_data = response.json()
+  return merchant_order_id, amount, payload
+
+
+def build_duitku_payment(trx, payment_method, merchant_order_id, amount, status_code, response_data):
+  """
+  Payment (belum disimpan) dari response inquiry Duitku.
+  Raise Exception bila Duitku menolak.
+  """
+  if status_code == 200 and response_data.get('statusCode') == '00':
+    # Success
+    expired_at = timezone.now() + timedelta(minutes=60)
     
-    if response.status_code == 200 and response_data.get('statusCode') == '00':
-      # Success
-      expired_at = timezone.now() + timedelta(minutes=60)
-      
-      payment = Payment.objects.create(
-        transaction=trx,
-        merchant_order_id=merchant_order_id,
-        reference=response_data.get('reference') or None,
-        payment_url=response_data.get('paymentUrl') or None,
-        va_number=response_data.get('vaNumber') or None,
-        qr_string=response_data.get('qrString') or None,
-        payment_method=payment_method,
-        amount=amount,
-        status='pending',
-        status_code=response_data.get('statusCode'),
-        status_message=response_data.get('statusMessage'),
-        expired_at=expired_at
+    return Payment(
+      transaction=trx,
+      merchant_order_id=merchant_order_id,
+      reference=response_data.get('reference') or None,
+      payment_url=response_data.get('paymentUrl') or None,
+      va_number=response_data.get('vaNumber') or None,
+      qr_string=response_data.get('qrString') or None,
+      payment_method=payment_method,
+      amount=amount,
+      status='pending',
+      status_code=response_data.get('statusCode'),
+      status_message=response_data.get('statusMessage'),
+      expired_at=expired_at
+    )
+  else:
+    raise Exception(response_data.get('Message', 'Unknown Duitku Error'))
+
+
+@transaction.atomic
+def process_duitku_payment(trx, payment_method):
+  """
+  Helper to process Duitku payment for a transaction.
+  Returns the created Payment object or raises Exception.
+  """
+  merchant_order_id, amount, payload = build_duitku_inquiry(trx, payment_method)
+  status_code, response_data = duitku.request_inquiry(payload)
+
+  payment = build_duitku_payment(trx, payment_method, merchant_order_id, amount, status_code, response_data)
+  payment.save()
+  return payment
+
+
+def save_payment_result(payment, payment_status):
+  """
+  Simpan hasil pembayaran Duitku beserta efeknya dalam satu transaksi DB (callback & cek status realtime):
+  - success: transaksi 'processing' bila ada item dapur, selain itu 'completed'
+  - failed/cancelled/expired: transaksi dibatalkan & stok dikembalikan (sekali saja, lihat restore_stock)
+  lalu invalidasi cache transaksi, outbox Firebase & event. 'pending' hanya menyimpan payment.
+  Field lain (status_code, callback_data, ...) diisi pemanggil sebelum memanggil ini.
+  """
+  trx = payment.transaction
+  with transaction.atomic():
+    payment.status = payment_status
+    restored = []
+    if payment_status == 'success':
+      payment.paid_at = timezone.now()
+      has_kitchen_product = trx.items.filter(needs_preparation=True).exists()
+      trx.status = 'processing' if has_kitchen_product else 'completed'
+      trx.save(update_fields=['status', 'updated_at'])
+    elif payment_status != 'pending' and trx.status != 'cancelled':
+      restored = restore_stock([trx.id])
+      trx.stock_restored = True # Sudah ditulis restore_stock(); hanya menyamakan instance
+      trx.status = 'cancelled'
+      trx.save(update_fields=['status', 'updated_at'])
+    payment.save()
+
+    if payment_status != 'pending':
+      transaction_cache.invalidate(trx.cafe_id, trx.id)
+      outbox.enqueue(
+        trx.cafe_id, outbox.order_update(trx), outbox.stock_updates(restored),
+        outbox.payment_update(payment.id, trx.id, payment.status, payment.paid_at)
       )
-      return payment
-    else:
-      raise Exception(response_data.get('Message', 'Unknown Duitku Error'))
-          
-  except requests.exceptions.RequestException as e:
-    raise Exception(f'Connection Failed: {str(e)}')
+      events.publish_payment(trx.cafe_id, payment.id, trx.id, payment.status)
+      events.publish_transaction(trx.cafe_id, trx.id, trx.status)
+  return payment
+
+
+# statusCode transactionStatus Duitku -> status payment; kode lain = expired
+DUITKU_STATUSES = {'00': 'success', '01': 'pending', '02': 'cancelled'}
+
+
+def apply_duitku_status(payment, response_data):
+  """
+  Terapkan hasil transactionStatus Duitku (cek status realtime, sync & async) dengan efek yang sama
+  seperti payment_callback. Return payment terbaru beserta transaksinya (sudah di-load, aman untuk
+  serializer di view async); pakai itu, bukan objek yang dikirim.
+  Bila payment sudah tidak pending (callback lebih dulu), hasil callback itu yang dikembalikan.
+  """
+  with transaction.atomic():
+    # Kunci baris payment supaya callback yang bersamaan tidak menerapkan hasil yang sama dua kali
+    current = Payment.objects.select_for_update(of=('self',)).select_related('transaction').get(id=payment.id)
+    if current.status != 'pending':
+      return current
+
+    status_code = response_data.get('statusCode')
+    current.status_code = status_code
+    current.status_message = response_data.get('statusMessage')
+    return save_payment_result(current, DUITKU_STATUSES.get(status_code, 'expired'))
 
 
 @api_view(['POST'])
 @transaction.atomic
+@query_budget(10)
 def create_transaction(request):
   """
   Membuat transaksi baru (Atomic with Payment)
@@ -153,27 +256,44 @@ def create_transaction(request):
   }, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['GET', 'PATCH', 'DELETE'])
+@query_budget(8)
 def get_update_delete_transaction(request, transaction_id):
   """
   Mendapatkan, mengupdate, atau menghapus transaksi berdasarkan ID
   """
   if request.method == 'GET':
-    try:
-      transaction = Transaction.objects.get(id=transaction_id, cafe=request.user.cafe)
-    except Transaction.DoesNotExist:
-      return Response({ 'message': "Transaction not found"}, status=status.HTTP_404_NOT_FOUND)
-
-    serializer = TransactionSerializer(transaction)
-    return Response({'message:': 'Success', 'data': serializer.data}, status=status.HTTP_200_OK)
+    fields = parse_fieldset(request, TRANSACTION_FIELDS)
+    row = transaction_cache.get(request.user.cafe_id, transaction_id)
+    if row is None:
+      # Representasi lengkap bisa di-cache (bila final); ?fields= tetap hanya membaca kolom yang diminta
+      full = fields == TRANSACTION_FIELDS
+      rows = transaction_rows(
+        Transaction.objects.filter(id=transaction_id, cafe_id=request.user.cafe_id),
+        TRANSACTION_FIELDS if full else fields
+      )
+      if not rows:
+        return Response({ 'message': "Transaction not found"}, status=status.HTTP_404_NOT_FOUND)
+      row = rows[0]
+      if full:
+        transaction_cache.store(request.user.cafe_id, rows)
+
+    data = {name: row[name] for name in fields}
+    response = Response({'message:': 'Success', 'data': data}, status=status.HTTP_200_OK)
+    # Struk dicetak ulang / riwayat dibuka lagi: klien revalidasi dengan If-None-Match -> 304 tanpa body
+    response['ETag'] = transaction_cache.etag(data)
+    response['Cache-Control'] = 'private, no-cache'
+    return get_conditional_response(request, etag=response['ETag'], response=response) or response
   elif request.method == 'PATCH':
     try:
-      transaction = Transaction.objects.get(id=transaction_id, cafe=request.user.cafe)
+      trx = Transaction.objects.get(id=transaction_id, cafe_id=request.user.cafe_id)
     except Transaction.DoesNotExist:
       return Response({ 'message': "Transaction not found"}, status=status.HTTP_404_NOT_FOUND)
 
-    serializer = TransactionSerializer(transaction, data=request.data, partial=True)
+    serializer = TransactionSerializer(trx, data=request.data, partial=True)
     serializer.is_valid(raise_exception=True)
-    serializer.save()
+    with transaction.atomic():
+      serializer.save()
+      transaction_cache.invalidate(trx.cafe_id, trx.id)
 
     return Response({
       'message': 'Transaction has been updated',
@@ -182,43 +302,49 @@ def get_update_delete_transaction(request, transaction_id):
 
   elif request.method == 'DELETE':    
     try:
-      transaction = Transaction.objects.get(id=transaction_id, cafe=request.user.cafe)
+      trx = Transaction.objects.get(id=transaction_id, cafe_id=request.user.cafe_id)
     except Transaction.DoesNotExist:
       return Response({ 'message': "Transaction not found"}, status=status.HTTP_404_NOT_FOUND)
 
-    transaction.delete()
+    with transaction.atomic():
+      trx.delete()
+      transaction_cache.invalidate(trx.cafe_id, transaction_id)
+      outbox.enqueue(trx.cafe_id, outbox.order_removed(transaction_id), outbox.stock_updates(trx.restored_products))
 
     return Response({
       'message': 'Transaction has been deleted/voided and stock restored',
     }, status=status.HTTP_200_OK)
     
 @api_view(['GET'])
+@use_replica
+@query_budget(5)
 def list_transactions(request):
   """
   Mendapatkan daftar transaksi dengan filter tanggal dan pagination
   GET /api/transaction/?start_date=2025-12-01&end_date=2025-12-07&page=2&page_size=10
   """
+  fields = parse_fieldset(request, TRANSACTION_FIELDS)
+
   # === LAZY UPDATE EXPIRED TRANSACTIONS ===
-  if request.user.cafe:
-    cleanup_expired_transactions(request.user.cafe)
+  if request.user.cafe_id:
+    cleanup_expired_transactions(request.user.cafe_id)
 
   # ========================================
 
   # Base Filter: Tenant Isolation
-  transactions = Transaction.objects.filter(cafe=request.user.cafe)
+  transactions = Transaction.objects.filter(cafe_id=request.user.cafe_id)
 
   page = int(request.GET.get('page', 1))
   page_size = int(request.GET.get('page_size', 10))
   start = (page - 1) * page_size
   end = start + page_size
 
-  # filter by date
-  start_date = request.GET.get('start_date')
-  end_date = request.GET.get('end_date')
-  if start_date:
-    transactions = transactions.filter(created_at__date__gte=start_date)
-  if end_date:
-    transactions = transactions.filter(created_at__date__lte=end_date)
+  # filter by date (range half-open Asia/Jakarta, index-friendly)
+  transactions = filter_created_between(
+    transactions,
+    request.GET.get('start_date'),
+    request.GET.get('end_date')
+  )
       
   # filter by search query
   search_query = request.GET.get('search')
@@ -239,23 +365,39 @@ def list_transactions(request):
       transactions = transactions.filter(status__in=statuses)
 
   # slicing
-  transactions_page = transactions[start:end]
+  page_rows = list(transactions[start:end].values_list('id', 'status'))
   total_page = transactions.count()
 
-  serializer = TransactionSerializer(transactions_page, many=True)
+  # Transaksi final diambil dari cache; sisanya satu query transaksi (+ satu query items)
+  cached = transaction_cache.get_many(
+    request.user.cafe_id, [trx_id for trx_id, trx_status in page_rows if trx_status in transaction_cache.FINAL_STATUSES]
+  )
+  missing = [trx_id for trx_id, _ in page_rows if trx_id not in cached]
+  if missing:
+    full = fields == TRANSACTION_FIELDS
+    fetched = transaction_rows(
+      Transaction.objects.filter(id__in=missing),
+      TRANSACTION_FIELDS if full else fields if 'id' in fields else ['id', *fields]
+    )
+    if full:
+      transaction_cache.store(request.user.cafe_id, fetched)
+    cached.update((row['id'], row) for row in fetched)
+
+  data = [{name: cached[trx_id][name] for name in fields} for trx_id, _ in page_rows if trx_id in cached]
 
   return Response({
     'message': 'Success',
     'total_page': total_page,
     'page': page,
     'page_size': page_size,
-    'data': serializer.data
+    'data': data
   })
 
 
 # ==================== PAYMENT (DUITKU) ENDPOINTS ====================
 @api_view(['POST'])
 @transaction.atomic
+@query_budget(3)
 def create_payment(request):
   """
   Membuat pembayaran baru via Duitku (Manual/Retry)
@@ -266,7 +408,7 @@ def create_payment(request):
   data = serializer.validated_data
   
   try:
-    trx = Transaction.objects.get(id=data['transaction_id'], cafe=request.user.cafe)
+    trx = Transaction.objects.get(id=data['transaction_id'], cafe_id=request.user.cafe_id)
   except Transaction.DoesNotExist:
     return Response({'message': 'Transaction not found'}, status=status.HTTP_404_NOT_FOUND)
   
@@ -298,6 +440,7 @@ def create_payment(request):
 @api_view(['POST'])
 @permission_classes([AllowAny])
 @csrf_exempt
+@query_budget(7)
 def payment_callback(request):
   """
   Webhook callback dari Duitku
@@ -323,9 +466,7 @@ def payment_callback(request):
     # Future: Verify per-cafe Merchant Code
     merchant_code = settings.DUITKU_MERCHANT_CODE
     api_key = settings.DUITKU_API_KEY
-    expected_signature = hashlib.md5(
-      f"{merchant_code}{amount}{merchant_order_id}{api_key}".encode()
-    ).hexdigest()
+    expected_signature = duitku.signature(merchant_code, amount, merchant_order_id, api_key)
     
     if signature != expected_signature:
       return Response({
@@ -339,31 +480,11 @@ def payment_callback(request):
         'message': 'Payment not found'
       }, status=status.HTTP_404_NOT_FOUND)
     
-    # Update payment status
     payment.callback_data = callback_data
     payment.reference = reference or payment.reference
-    
-    if result_code == '00':
-      payment.status = 'success'
-      payment.paid_at = timezone.now()
-      
-      # Check if needs kitchen
-      has_kitchen_product = payment.transaction.items.filter(product__needs_preparation=True).exists()
-      new_status = 'processing' if has_kitchen_product else 'completed'
-      
-      payment.transaction.status = new_status
-      payment.transaction.save()
-    elif result_code == '01':
-      payment.status = 'pending'
-    else:
-      payment.status = 'failed'
-      if payment.transaction.status != 'cancelled':
-        restore_stock(payment.transaction)
-        payment.transaction.status = 'cancelled'
-        payment.transaction.save()
-    
     payment.status_code = result_code
-    payment.save()
+    # Status payment, transaksi, stok & outbox commit bersama
+    save_payment_result(payment, {'00': 'success', '01': 'pending'}.get(result_code, 'failed'))
     
     return Response({
       'message': 'Callback processed successfully'
@@ -377,80 +498,50 @@ def payment_callback(request):
 
 
 @api_view(['GET'])
+@query_budget(7)
 def get_payment_status(request, payment_id):
   """
   Cek status pembayaran
   """
+  check_realtime = request.GET.get('realtime', 'false').lower() == 'true'
+  fields = parse_fieldset(request, list(PaymentSerializer().fields))
+
+  # Securely get payment scoped to user's cafe
+  payments = Payment.objects.filter(id=payment_id, transaction__cafe_id=request.user.cafe_id)
+  if check_realtime:
+    # Status bisa di-update dari Duitku: butuh payment & transaksi lengkap
+    payments = payments.select_related('transaction')
+  else:
+    payments = only_fields(payments, fields, PAYMENT_RELATED)
   try:
-    # Securely get payment scoped to user's cafe
-    payment = Payment.objects.get(id=payment_id, transaction__cafe=request.user.cafe)
-             
+    payment = payments.get()
   except Payment.DoesNotExist:
     return Response({
       'message': 'Payment not found'
     }, status=status.HTTP_404_NOT_FOUND)
   
-  check_realtime = request.GET.get('realtime', 'false').lower() == 'true'
-  
   if check_realtime and payment.status == 'pending':
-    merchant_code = settings.DUITKU_MERCHANT_CODE
-    api_key = settings.DUITKU_API_KEY
-    is_sandbox = settings.DUITKU_IS_SANDBOX
-    
-    signature = hashlib.md5(
-      f"{merchant_code}{payment.merchant_order_id}{api_key}".encode()
-    ).hexdigest()
-    
-    base_url = "https://sandbox.duitku.com" if is_sandbox else "https://passport.duitku.com"
-    endpoint = f"{base_url}/webapi/api/merchant/transactionStatus"
-    
-    payload = {
-      "merchantCode": merchant_code,
-      "merchantOrderId": payment.merchant_order_id,
-      "signature": signature
-    }
-    
     try:
-      response = requests.post(endpoint, json=payload, timeout=30)
-      response_data = response.json()
-      
-      if response_data.get('statusCode') == '00':
-        payment.status = 'success'
-        payment.paid_at = timezone.now()
-        payment.transaction.status = 'completed'
-        payment.transaction.save()
-      elif response_data.get('statusCode') == '01':
-        payment.status = 'pending'
-      elif response_data.get('statusCode') == '02':
-        payment.status = 'cancelled'
-        payment.transaction.status = 'cancelled'
-        payment.transaction.save()
-      else:
-        payment.status = 'expired'
-        payment.transaction.status = 'cancelled'
-        payment.transaction.save()
-      
-      payment.status_code = response_data.get('statusCode')
-      payment.status_message = response_data.get('statusMessage')
-      payment.save()
-        
-    except requests.exceptions.RequestException:
+      response_data = duitku.request_transaction_status(payment.merchant_order_id)
+      payment = apply_duitku_status(payment, response_data)
+    except duitku.DuitkuError:
       pass 
   
   return Response({
     'message': 'Success',
-    'data': PaymentSerializer(payment).data
+    'data': PaymentSerializer(payment, fields=fields).data
   }, status=status.HTTP_200_OK)
 
 
 @api_view(['POST'])
 @transaction.atomic
+@query_budget(7)
 def cancel_transaction(request, transaction_id):
   """
   Membatalkan transaksi secara manual
   """
   try:
-    trx = Transaction.objects.get(id=transaction_id, cafe=request.user.cafe)
+    trx = Transaction.objects.get(id=transaction_id, cafe_id=request.user.cafe_id)
   except Transaction.DoesNotExist:
     return Response({'message': 'Transaction not found'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -461,15 +552,23 @@ def cancel_transaction(request, transaction_id):
     return Response({'message': 'Transaction is already cancelled'}, status=status.HTTP_400_BAD_REQUEST)
 
   # Cancel transaction
-  restore_stock(trx)
+  restored = restore_stock([trx.id])
+  trx.stock_restored = True # Sudah ditulis restore_stock(); hanya menyamakan instance
   trx.status = 'cancelled'
-  trx.save()
+  trx.save(update_fields=['status', 'updated_at'])
 
   # Cancel associated pending payments
   pending_payments = Payment.objects.filter(transaction=trx, status='pending')
-  for payment in pending_payments:
-    payment.status = 'cancelled'
-    payment.save()
+  cancelled_ids = list(pending_payments.values_list('id', flat=True))
+  pending_payments.update(status='cancelled', updated_at=timezone.now())
+
+  outbox.enqueue(
+    trx.cafe_id, outbox.order_update(trx), outbox.stock_updates(restored),
+    *(outbox.payment_update(payment_id, trx.id, 'cancelled') for payment_id in cancelled_ids)
+  )
+  for payment_id in cancelled_ids:
+    events.publish_payment(trx.cafe_id, payment_id, trx.id, 'cancelled')
+  events.publish_transaction(trx.cafe_id, trx.id, 'cancelled')
 
   return Response({
     'message': 'Transaction has been cancelled',
@@ -0,0 +1,11 @@
+"""
+Admin URLconf, loaded on the first request under /admin/.
+
+INSTALLED_APPS uses SimpleAdminConfig, so admin modules are discovered here
+instead of during django.setup() on every cold start.
+"""
+from django.contrib import admin
+
+admin.autodiscover()
+
+urlpatterns = admin.site.get_urls()
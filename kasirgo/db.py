@@ -0,0 +1,42 @@
+"""
+Database connection settings per pooling mode.
+
+DATABASE_POOL_MODE selects how connections are reused:
+
+- ``persistent`` (default): one connection per worker thread, kept for
+  ``conn_max_age`` seconds and health-checked before reuse.
+- ``pool``: psycopg 3 connection pool inside the process (Django's ``pool``
+  option). Good for long-running servers with many threads.
+- ``pgbouncer``: connect through PgBouncer in transaction mode (e.g. Neon's
+  ``-pooler`` host). Server-side cursors and prepared statements are disabled
+  because consecutive transactions may land on different server connections.
+"""
+POOL_MODES = ('persistent', 'pool', 'pgbouncer')
+
+
+def apply_pool_mode(db, mode='persistent', conn_max_age=600,
+                    pool_min_size=1, pool_max_size=4, pool_timeout=10):
+    """
+    Lengkapi settings satu database (hasil dj_database_url atau dict manual)
+    sesuai DATABASE_POOL_MODE. Return dict yang sama.
+    """
+    if mode not in POOL_MODES:
+        raise ValueError(f"DATABASE_POOL_MODE must be one of {', '.join(POOL_MODES)}, got {mode!r}")
+
+    db['CONN_MAX_AGE'] = 0 if mode == 'pool' else conn_max_age
+    db['CONN_HEALTH_CHECKS'] = True
+    options = db.setdefault('OPTIONS', {})
+
+    if mode == 'pool':
+        # Django mengembalikan koneksi ke pool di akhir request; CONN_HEALTH_CHECKS dipakai sebagai check pool
+        options['pool'] = {
+            'min_size': pool_min_size,
+            'max_size': pool_max_size,
+            'timeout': pool_timeout,
+        }
+    elif mode == 'pgbouncer':
+        # Transaction mode: tidak ada state sesi yang bertahan antar transaksi
+        db['DISABLE_SERVER_SIDE_CURSORS'] = True
+        options['prepare_threshold'] = None
+
+    return db
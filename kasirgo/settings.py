@@ -10,9 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import sys
 from pathlib import Path
-from decouple import config
+from decouple import config, Csv
 from datetime import timedelta
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -27,6 +29,9 @@ SECRET_KEY = config('DJANGO_SECRET_KEY')
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = config('DJANGO_DEBUG', default=False, cast=bool)
 
+# manage.py test atau pytest; hanya untuk alias replica_test di bawah
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+
 ALLOWED_HOSTS = [
     '.vercel.app',
     '.now.sh',
@@ -73,7 +78,7 @@ STORAGES = {
 # Application definition
 
 INSTALLED_APPS = [
-    'django.contrib.admin',
+    'django.contrib.admin.apps.SimpleAdminConfig', # Admin autodiscover lazy, lihat kasirgo/admin_urls.py
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -83,11 +88,14 @@ INSTALLED_APPS = [
     'rest_framework',
     'api',
     'corsheaders',
-    'cloudinary_storage',
-    'cloudinary',
+    'cloudinary_storage', # Storage backend dimuat saat media pertama diakses
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware', # Paling atas: ukur seluruh request
+    'api.profiling.ProfilingMiddleware', # Hanya aktif dengan header X-Profile dari superuser
+    'api.compression.CompressionMiddleware', # gzip/brotli sesuai Accept-Encoding
+    'api.throttling.InflightMiddleware', # Jumlah request sync yang berjalan, dasar load shedding (THROTTLE_SHEDDING)
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -96,18 +104,147 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'corsheaders.middleware.CorsMiddleware'
+    'corsheaders.middleware.CorsMiddleware',
+    'api.db_router.ReplicaStickinessMiddleware',
 ]
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.StatelessJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_THROTTLE_CLASSES': (
+        'api.throttling.PriorityRateThrottle',
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'api.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+}
+
+# Serializer JSON (api/renderers.py): 'orjson' (bila terpasang) atau 'json' (JSONRenderer DRF bawaan)
+JSON_BACKEND = config('JSON_BACKEND', default='orjson')
+
+# Kompresi response (api/compression.py): body >= COMPRESSION_MIN_SIZE byte, brotli bila paket Brotli terpasang
+COMPRESSION_ENABLED = config('COMPRESSION_ENABLED', default=True, cast=bool)
+COMPRESSION_MIN_SIZE = config('COMPRESSION_MIN_SIZE', default=1024, cast=int)
+COMPRESSION_GZIP_LEVEL = config('COMPRESSION_GZIP_LEVEL', default=6, cast=int)
+COMPRESSION_BROTLI_QUALITY = config('COMPRESSION_BROTLI_QUALITY', default=5, cast=int)
+
+# Rate limit per user & per cafe + load shedding (api/throttling.py)
+THROTTLE_ENABLED = config('THROTTLE_ENABLED', default=True, cast=bool)
+# 'cache' = bucket di Django cache (Redis -> lintas worker), 'local' = in-process
+THROTTLE_BACKEND = config('THROTTLE_BACKEND', default='cache')
+# Kelas prioritas per URL name; yang tidak disebut = 'normal'
+THROTTLE_PRIORITIES = {
+    'create_transaction': 'high',
+    'cancel_transaction': 'high',
+    'create_payment': 'high',
+    'create_payment_async': 'high',
+    'payment_callback': 'high',
+    'get_payment_status': 'high',
+    'get_payment_status_async': 'high',
+    'token_obtain_pair': 'high',
+    'token_refresh': 'high',
+    'get_margin_report': 'low',
+    'get_cogs_report': 'low',
+    'export_transactions': 'low',
+}
+# Token bucket (token/detik, burst) per kelas; None = tanpa batas
+THROTTLE_RATES = {
+    'high': {'user': (10, 30), 'cafe': (50, 150)},
+    'normal': {'user': (5, 20), 'cafe': (30, 90)},
+    'low': {'user': (0.2, 3), 'cafe': (0.5, 5)},
+}
+# Load shedding memakai hitungan request per proses: hanya berarti bila satu proses melayani beberapa request
+# sekaligus (gunicorn --threads / gthread, ASGI). Di Vercel & worker sync hitungannya selalu ~1, jadi default mati.
+THROTTLE_SHEDDING = config('THROTTLE_SHEDDING', default=False, cast=bool)
+# Tolak kelas ini bila request sync yang sedang berjalan di worker melebihi N (kelas 'high' tidak pernah di-shed)
+THROTTLE_SHED_INFLIGHT = {
+    'low': config('THROTTLE_SHED_LOW_INFLIGHT', default=3, cast=int),
+    'normal': config('THROTTLE_SHED_NORMAL_INFLIGHT', default=6, cast=int),
 }
+THROTTLE_SHED_RETRY_AFTER = config('THROTTLE_SHED_RETRY_AFTER', default=5, cast=int)
+
+# Prometheus /metrics: kosong = endpoint nonaktif. Scrape dengan Authorization: Bearer <token>
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+# Tambahkan label cafe_id untuk N cafe tersibuk (0 = tanpa label cafe)
+METRICS_TOP_CAFES = config('METRICS_TOP_CAFES', default=0, cast=int)
+
+# Query budget per view (api/query_budget.py): ENFORCE -> exception (check_query_budgets / CI lokal),
+# LOG -> warning di produksi
+QUERY_BUDGET_ENFORCE = config('QUERY_BUDGET_ENFORCE', default=False, cast=bool)
+QUERY_BUDGET_LOG = config('QUERY_BUDGET_LOG', default=True, cast=bool)
+
+# Profiling per request (api/profiling.py): superuser + header X-Profile, disimpan di ring buffer cache
+PROFILING_ENABLED = config('PROFILING_ENABLED', default=True, cast=bool)
+PROFILING_BUFFER_SIZE = config('PROFILING_BUFFER_SIZE', default=50, cast=int)
+PROFILING_TTL_SECONDS = config('PROFILING_TTL_SECONDS', default=86400, cast=int)
+PROFILING_EXPLAIN_TOP = config('PROFILING_EXPLAIN_TOP', default=3, cast=int)
+
+# Antrian dapur (api/views/kitchen.py): interval cek versi, batas long-poll, dan umur koneksi SSE (detik)
+KITCHEN_POLL_INTERVAL = config('KITCHEN_POLL_INTERVAL', default=1.0, cast=float)
+KITCHEN_LONG_POLL_SECONDS = config('KITCHEN_LONG_POLL_SECONDS', default=25, cast=int)
+KITCHEN_STREAM_SECONDS = config('KITCHEN_STREAM_SECONDS', default=300, cast=int)
+
+# Event pembayaran/transaksi (api/events.py): 'local' (in-process) atau 'cache' (lintas worker, butuh cache bersama).
+# 'cache' tanpa CACHE_URL jatuh ke 'local' dengan satu warning di log.
+EVENTS_BACKEND = config('EVENTS_BACKEND', default='local')
+EVENTS_BUFFER_SIZE = config('EVENTS_BUFFER_SIZE', default=200, cast=int)
+EVENTS_TTL_SECONDS = config('EVENTS_TTL_SECONDS', default=3600, cast=int)
+EVENTS_POLL_INTERVAL = config('EVENTS_POLL_INTERVAL', default=0.5, cast=float)
+EVENTS_LONG_POLL_SECONDS = config('EVENTS_LONG_POLL_SECONDS', default=25, cast=int)
+EVENTS_STREAM_SECONDS = config('EVENTS_STREAM_SECONDS', default=300, cast=int)
+
+# Outbox Firebase Realtime Database (api/outbox.py); aktifkan setelah `manage.py dispatch_outbox` berjalan
+OUTBOX_ENABLED = config('OUTBOX_ENABLED', default=False, cast=bool)
+FIREBASE_DATABASE_URL = config('FIREBASE_DATABASE_URL', default='')
+OUTBOX_BATCH_SIZE = config('OUTBOX_BATCH_SIZE', default=500, cast=int)
+OUTBOX_RETRY_BASE_SECONDS = config('OUTBOX_RETRY_BASE_SECONDS', default=2, cast=int)
+OUTBOX_RETRY_MAX_SECONDS = config('OUTBOX_RETRY_MAX_SECONDS', default=300, cast=int)
+# Setelah N kali gagal baris outbox ditandai failed (dead letter) supaya tidak menahan antrian cafe selamanya
+OUTBOX_MAX_ATTEMPTS = config('OUTBOX_MAX_ATTEMPTS', default=10, cast=int)
+OUTBOX_RETENTION_HOURS = config('OUTBOX_RETENTION_HOURS', default=24, cast=int)
+
+# Cache Django. CACHE_URL=redis://... (atau memcached://host:port) = cache bersama antar instance/worker.
+# Tanpa CACHE_URL: LocMemCache per proses; invalidasi di satu instance serverless tidak terlihat di instance lain.
+CACHE_URL = config('CACHE_URL', default='')
+if CACHE_URL.startswith(('redis://', 'rediss://')):
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': CACHE_URL}}
+elif CACHE_URL.startswith('memcached://'):
+    CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        'LOCATION': CACHE_URL.removeprefix('memcached://'),
+    }}
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+# True bila isi & invalidasi cache terlihat oleh semua instance
+SHARED_CACHE = bool(CACHE_URL)
+
+if EVENTS_BACKEND not in ('local', 'cache'):
+    raise ImproperlyConfigured(f"EVENTS_BACKEND must be 'local' or 'cache', got {EVENTS_BACKEND!r}")
 
+# Owner dashboard cache (detik, per cafe)
+DASHBOARD_CACHE_SECONDS = config('DASHBOARD_CACHE_SECONDS', default=15, cast=int)
+
+# Cache representasi transaksi completed/cancelled (detik, api/transaction_cache.py); 0 = mati.
+# Hanya aktif dengan cache bersama (CACHE_URL): invalidasi harus sampai ke semua instance.
+TRANSACTION_CACHE_SECONDS = config('TRANSACTION_CACHE_SECONDS', default=0, cast=int)
+
+# Batch endpoint (api/views/batch.py): maksimum sub-request per batch & thread untuk sub-request baca paralel
+BATCH_MAX_REQUESTS = config('BATCH_MAX_REQUESTS', default=10, cast=int)
+BATCH_MAX_WORKERS = config('BATCH_MAX_WORKERS', default=4, cast=int)
+
+# StatelessJWTAuthentication (api/authentication.py) mempercayai klaim access token (role, cafe_id,
+# is_superuser) tanpa query: user yang dinonaktifkan / diganti role-nya tetap diterima dengan hak lama
+# sampai access token-nya kadaluarsa (ACCESS_TOKEN_LIFETIME). Refresh token user non-aktif ditolak (401).
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=15),   # masa berlaku access token
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),      # masa berlaku refresh token
@@ -116,8 +253,13 @@ SIMPLE_JWT = {
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': SECRET_KEY,
     'AUTH_HEADER_TYPES': ('Bearer',),
+    'TOKEN_OBTAIN_SERIALIZER': 'api.serializer.KasirGoTokenObtainPairSerializer', # + klaim role & cafe_id
+    'TOKEN_REFRESH_SERIALIZER': 'api.serializer.KasirGoTokenRefreshSerializer',
 }
 
+# Cache user lengkap untuk StatelessJWTAuthentication (detik); hanya dengan cache bersama (CACHE_URL), 0 = mati
+JWT_USER_CACHE_SECONDS = config('JWT_USER_CACHE_SECONDS', default=60, cast=int)
+
 
 ROOT_URLCONF = 'kasirgo.urls'
 
@@ -143,13 +285,23 @@ WSGI_APPLICATION = 'kasirgo.wsgi.application'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
 import dj_database_url
+from kasirgo.db import apply_pool_mode
+
+# Mode koneksi: persistent (default) | pool (psycopg 3 pool) | pgbouncer (transaction mode, mis. host -pooler Neon)
+# Lihat kasirgo/db.py
+DATABASE_POOL_MODE = config('DATABASE_POOL_MODE', default='persistent')
+DATABASE_POOL_OPTIONS = {
+    'conn_max_age': config('DATABASE_CONN_MAX_AGE', default=600, cast=int),
+    'pool_min_size': config('DATABASE_POOL_MIN_SIZE', default=1, cast=int),
+    'pool_max_size': config('DATABASE_POOL_MAX_SIZE', default=4, cast=int),
+    'pool_timeout': config('DATABASE_POOL_TIMEOUT', default=10, cast=int),
+}
 
 DATABASES = {}
 
 if config('DATABASE_URL', default=None):
     DATABASES['default'] = dj_database_url.config(
         default=config('DATABASE_URL'),
-        conn_max_age=600,
         ssl_require=True
     )
 else:
@@ -161,6 +313,39 @@ else:
         'HOST': config('DB_HOST'),
         'PORT': config('DB_PORT'),
     }
+apply_pool_mode(DATABASES['default'], DATABASE_POOL_MODE, **DATABASE_POOL_OPTIONS)
+
+# Read replicas (opsional), dipisah koma: DATABASE_REPLICA_URLS=postgres://...,postgres://...
+# Untuk emulasi lokal, arahkan ke database lokal kedua (atau DB yang sama).
+# Saat test, replica me-mirror 'default' sehingga tidak perlu database tambahan.
+DATABASE_REPLICAS = []
+for index, replica_url in enumerate(config('DATABASE_REPLICA_URLS', default='', cast=Csv())):
+    alias = f'replica_{index}'
+    DATABASES[alias] = apply_pool_mode(
+        dj_database_url.parse(
+            replica_url,
+            ssl_require=DATABASES['default'].get('OPTIONS', {}).get('sslmode') == 'require'
+        ),
+        DATABASE_POOL_MODE,
+        **DATABASE_POOL_OPTIONS
+    )
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(alias)
+
+# Penanda sticky (read-your-writes) disimpan di cache: harus terlihat oleh instance yang melayani
+# request berikutnya, jadi replica hanya boleh dipakai dengan cache bersama
+if DATABASE_REPLICAS and not SHARED_CACHE:
+    raise ImproperlyConfigured('DATABASE_REPLICA_URLS requires a shared cache: set CACHE_URL (redis:// or memcached://)')
+
+# Saat test: alias replica yang me-mirror 'default' untuk ReplicaRouterTests. Tidak masuk
+# DATABASE_REPLICAS, jadi hanya dipakai test yang meng-override setting tersebut.
+if TESTING:
+    DATABASES['replica_test'] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+
+DATABASE_ROUTERS = ['api.db_router.ReplicaRouter']
+
+# Read-your-writes: setelah user menulis, read-nya tetap ke primary selama N detik
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=5, cast=int)
 
 
 # Password validation
@@ -206,4 +391,6 @@ DUITKU_MERCHANT_CODE = config('DUITKU_MERCHANT_CODE')
 DUITKU_API_KEY = config('DUITKU_API_KEY')
 DUITKU_IS_SANDBOX = config('DUITKU_IS_SANDBOX', cast=bool)
 DUITKU_CALLBACK_URL = config('DUITKU_CALLBACK_URL')
-DUITKU_RETURN_URL = config('DUITKU_RETURN_URL')
\ No newline at end of file
+DUITKU_RETURN_URL = config('DUITKU_RETURN_URL')
+# Override endpoint Duitku, mis. stub lokal dari `manage.py duitku_stub` untuk load test
+DUITKU_BASE_URL = config('DUITKU_BASE_URL', default='')
\ No newline at end of file
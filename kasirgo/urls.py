@@ -14,18 +14,21 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
 from django.urls import path, include
+from django.urls.resolvers import RoutePattern, URLResolver
 from django.conf import settings
 from django.conf.urls.static import static
 
 from django.http import JsonResponse
+from api.utils.lazy import lazy_view
 
 def home(request):
     return JsonResponse({"message": "Welcome to KasirGo Backend API!", "status": "running"})
 
 urlpatterns = [
     path('', home),
-    path('admin/', admin.site.urls),
-    path('api/', include('api.urls'))
+    # Lazy: kasirgo.admin_urls (dan autodiscover admin) baru di-import saat /admin/ diakses
+    URLResolver(RoutePattern('admin/'), 'kasirgo.admin_urls', app_name='admin', namespace='admin'),
+    path('api/', include('api.urls')),
+    path('metrics', lazy_view('api.views.metrics.metrics_view'), name='metrics'),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file